@@ -1,30 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 import calendar
-import json
 from pathlib import Path
 import io
 
 try:
     from kivy.app import App
+    from kivy.clock import Clock
     from kivy.uix.boxlayout import BoxLayout
     from kivy.uix.label import Label
     from kivy.uix.textinput import TextInput
     from kivy.uix.button import Button
     from kivy.uix.popup import Popup
-    from kivy.uix.filechooser import FileChooserIconView
     from kivy.uix.scrollview import ScrollView
     from kivy.uix.gridlayout import GridLayout
     from kivy.uix.checkbox import CheckBox
     from kivy.uix.image import Image
+    from kivy.uix.progressbar import ProgressBar
+    from kivy.uix.recycleboxlayout import RecycleBoxLayout
+    from kivy.uix.recycleview import RecycleView
+    from kivy.uix.recycleview.views import RecycleDataViewBehavior
 except ModuleNotFoundError as exc:  # pragma: no cover - Kivy missing
     raise SystemExit(
         "Kivy no esta instalado. Ejecute 'python -m pip install kivy'"
     ) from exc
 
+from rendicion import GastosLedger, GastosTable, JournalStore, charts, excel_export, pdf_export
+from rendicion.duplicates import DuplicateIndex, hash_archivo
+from rendicion.importer import StreamImport
+from rendicion.model import detalle, money, nombre_doc
+from rendicion.storage import default_path, open_store
 
-DATA_FILE = Path("gastos.json")
+
+# Base SQLite compartida con las apps Streamlit y la linea de comandos (RENDICION_DB);
+# ".json" usa la instantanea + bitacora
+DATA_FILE = Path(default_path())
+# Archivo de versiones anteriores: se importa a la base en la primera ejecucion
+# y luego se renombra con este sufijo
+LEGACY_FILE = Path("gastos.json")
+SUFIJO_MIGRADO = ".migrado"
 # Ruta del logotipo a incluir en el PDF
 LOGO_PATH = r"C:\PY\Logotipo Petorca-01.png"
+# Cada cuantas filas informan su avance los exportes
+PASO_PROGRESO = 200
+
+
+def grafico_png(total, saldo):
+    """PNG del grafico de torta gastos / saldo (None si no hay nada que mostrar).
+
+    Sale del cache de ``rendicion.charts``: sin pyplot, asi que sirve fuera del hilo de Kivy.
+    """
+    try:
+        return charts.pie_png(total, saldo, labels=("Gastos realizados", "Saldo disponible"),
+                              figsize=(3, 3))
+    except ImportError:
+        return None
+
+
+class TrabajosFondo:
+    """Trabajos pesados (exportes, grafico) en hilos, fuera del hilo de la interfaz.
+
+    El resultado (o la excepcion) vuelve al hilo de Kivy con
+    ``Clock.schedule_once``. Mientras un trabajo con un nombre esta en curso, los
+    nuevos pedidos con ese nombre no se encolan: queda pendiente solo el ultimo,
+    que se lanza al terminar el actual (varios refrescos del grafico = un render).
+    """
+
+    def __init__(self, max_workers=2):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rendicion")
+        self.en_curso = set()
+        self.pendientes = {}
+
+    def enviar(self, nombre, funcion, al_terminar=None, al_fallar=None):
+        """Lanza ``funcion()``; devuelve False si quedo pendiente tras la que esta en curso."""
+        if nombre in self.en_curso:
+            self.pendientes[nombre] = (funcion, al_terminar, al_fallar)
+            return False
+        self.en_curso.add(nombre)
+        futuro = self.pool.submit(funcion)
+        futuro.add_done_callback(lambda f: Clock.schedule_once(
+            lambda _dt: self._terminado(nombre, f, al_terminar, al_fallar)))
+        return True
+
+    def _terminado(self, nombre, futuro, al_terminar, al_fallar):
+        self.en_curso.discard(nombre)
+        exc = futuro.exception()
+        if exc is None:
+            if al_terminar is not None:
+                al_terminar(futuro.result())
+        elif al_fallar is not None:
+            al_fallar(exc)
+        if nombre in self.pendientes:
+            self.enviar(nombre, *self.pendientes.pop(nombre))
+
+    @staticmethod
+    def en_hilo_ui(funcion):
+        """Envoltura que, llamada desde un hilo de trabajo, ejecuta ``funcion`` en el de Kivy."""
+        return lambda *args: Clock.schedule_once(lambda _dt: funcion(*args))
+
+    def cerrar(self):
+        """Espera los trabajos en curso (un exporte a medias no se corta al salir)."""
+        self.pendientes.clear()
+        self.pool.shutdown(wait=True)
 
 
 class GastosManager:
@@ -33,22 +110,79 @@ class GastosManager:
     def __init__(self, data_file=DATA_FILE):
         self.data_file = data_file
         self.data = {"fondo_inicial": 0, "gastos": []}
+        self.store = open_store(data_file, clave="kivy")
         self.cargar_datos()
 
     def cargar_datos(self):
-        if self.data_file.exists():
-            with self.data_file.open("r", encoding="utf-8") as f:
-                self.data = json.load(f)
+        self.data = self.store.load()
+        # solo si la rendicion se acaba de crear: borrar todos los gastos no la vuelve a migrar
+        if (getattr(self.store, "nueva", False) and LEGACY_FILE.exists()
+                and Path(self.data_file) != LEGACY_FILE):
+            self._migrar_json()
+            self.data = self.store.load()
+        # Gastos por columnas; cada fila se lee como un diccionario
+        self.data["gastos"] = GastosTable(self.data.get("gastos", []))
+        # Totales acumulados: se actualizan en cada alta/edicion/baja
+        self.ledger = GastosLedger(
+            self.data.get("fondo_inicial", 0),
+            self.data.get("gastos", []),
+            source=lambda: self.data.get("gastos", []),
+        )
+        # Documentos ya rendidos (mismo archivo, o misma fecha + monto + detalle); el
+        # archivo se compara por el ``ref_doc`` guardado, sin leerlo aqui
+        self.duplicados = DuplicateIndex(self.data["gastos"])
+
+    def _migrar_json(self):
+        """Primera ejecucion con la base: importa el gastos.json anterior y lo renombra."""
+        bitacora = Path(str(LEGACY_FILE) + ".log")
+        if bitacora.exists():
+            # quedan operaciones en la bitacora: se aplican sobre la instantanea
+            self.store.import_data(JournalStore(LEGACY_FILE).load())
+        else:
+            # por flujo, gasto a gasto, con las mismas claves que usa esta app
+            with LEGACY_FILE.open("rb") as f:
+                self.store.import_stream(StreamImport(f, normalize=None))
+        for archivo in (LEGACY_FILE, bitacora):
+            try:
+                if archivo.exists():
+                    archivo.replace(str(archivo) + SUFIJO_MIGRADO)
+            except OSError:  # solo informativo: la migracion ya no se repite
+                pass
+
+    def adjuntos_sin_hash(self):
+        """[(idx, ruta)] de los gastos con documento y sin ``ref_doc`` (el sha256 del archivo).
+
+        El hash no se calcula al registrar: ``GastosUI`` lo pide en segundo plano.
+        """
+        return [(i, g["documento"]) for i, g in enumerate(self.data["gastos"])
+                if g.get("documento") and not g.get("ref_doc")]
+
+    def completar_hashes(self, hashes):
+        """Guarda los ``ref_doc`` calculados en segundo plano: [(idx, ruta, hash)].
+
+        Se omiten los gastos que cambiaron de documento mientras tanto. Devuelve las
+        coincidencias de "mismo adjunto" (las demas reglas ya se avisaron al registrar).
+        """
+        gastos = self.data["gastos"]
+        avisos = []
+        for idx, ruta, ref in hashes:
+            if ref and idx < len(gastos) and gastos[idx].get("documento") == ruta \
+                    and not gastos[idx].get("ref_doc"):
+                avisos += [c for c in self.editar_gasto(idx, dict(gastos[idx], ref_doc=ref))
+                           if c.regla == "adjunto"]
+        return avisos
 
     def guardar_datos(self):
-        with self.data_file.open("w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """Consolida lo guardado (en JSON: instantanea atomica y bitacora vacia)."""
+        self.store.compact(self.data)
 
     def establecer_fondo(self, monto):
         self.data["fondo_inicial"] = monto
-        self.guardar_datos()
+        self.ledger.set_fondo(monto)
+        self.store.append({"op": "set_fondo", "monto": monto}, self.data)
 
     def agregar_gasto(self, monto, descripcion, documento, fecha=None):
+        """Registra el gasto; devuelve las coincidencias con gastos ya registrados."""
         gasto = {
             "fecha": (fecha or date.today()).isoformat(),
             "monto": monto,
@@ -56,149 +190,76 @@ class GastosManager:
             "documento": documento,
         }
         self.data.setdefault("gastos", []).append(gasto)
-        self.guardar_datos()
+        self.ledger.add(gasto)
+        self.store.append({"op": "add", "gasto": gasto}, self.data)
+        return self.duplicados.add(gasto)
+
+    def editar_gasto(self, idx, gasto):
+        anterior = dict(self.data["gastos"][idx])  # copia: la fila se sobrescribe
+        self.data["gastos"][idx] = gasto
+        self.ledger.replace(anterior, gasto)
+        self.store.append({"op": "edit", "idx": idx, "gasto": gasto}, self.data)
+        return self.duplicados.replace(anterior, gasto)
+
+    def eliminar_gastos(self, indices):
+        indices = sorted(set(indices), reverse=True)
+        for idx in indices:
+            gasto = self.data["gastos"].pop(idx)
+            self.ledger.remove(gasto)
+            self.duplicados.remove(gasto)
+        self.store.append({"op": "delete", "indices": indices}, self.data)
 
     def resumen(self):
-        total = sum(g["monto"] for g in self.data.get("gastos", []))
-        cantidad = len(self.data.get("gastos", []))
-        saldo = self.data.get("fondo_inicial", 0) - total
-        return cantidad, total, saldo
-
-    def exportar_excel(self, path="informe_gastos.xlsx"):
-        """Genera un archivo Excel con todos los gastos."""
-        try:  # Importar solo cuando se usa
-            from openpyxl import Workbook
-        except Exception as exc:  # pragma: no cover - dependencia faltante
+        return self.ledger.cantidad, self.ledger.total, self.ledger.saldo
+
+    def instantanea(self):
+        """Copia de los datos para exportar en otro hilo mientras se sigue editando."""
+        return {
+            "fondo_inicial": self.data.get("fondo_inicial", 0),
+            "gastos": self.data["gastos"].copy(),
+        }
+
+    def _rendicion(self, datos):
+        """Fondo y gastos por fecha de una ``instantanea()`` (por defecto, la actual)."""
+        datos = datos if datos is not None else self.instantanea()
+        return {"fondo_inicial": datos["fondo_inicial"], "gastos": datos["gastos"].sorted_by("fecha")}
+
+    def exportar_excel(self, path="informe_gastos.xlsx", datos=None, progreso=None):
+        """Genera el listado Excel de esta app (``rendicion.excel_export.export_listado``).
+
+        ``datos``: una ``instantanea()`` (por defecto, la actual); ``progreso(hechos, total)``
+        se llama cada ``PASO_PROGRESO`` filas.
+        """
+        try:
+            contenido = excel_export.export_listado(self._rendicion(datos), progreso=progreso,
+                                                    paso=PASO_PROGRESO)
+        except ImportError as exc:  # pragma: no cover - dependencia faltante
             raise RuntimeError(
                 "Debe instalar openpyxl para exportar a Excel"
             ) from exc
+        Path(path).write_bytes(contenido)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Gastos"
-
-        # Titulo
-        ws.append([
-            "Rendicion de Gastos menores Fondo Fijo - SLEP Petorca - Programa 01"
-        ])
-        ws.append([])
-
-        ws.append(["Fecha", "Detalle", "Monto", "Documento"])
-        gastos = sorted(self.data.get("gastos", []), key=lambda g: g["fecha"])
-        for g in gastos:
-            ws.append([
-                g["fecha"],
-                g["descripcion"],
-                g["monto"],
-                Path(g["documento"]).name if g["documento"] else "",
-            ])
-
-        ws.append([])
-        cantidad, total, saldo = self.resumen()
-        ws.append(["", "Fondo entregado", self.data.get("fondo_inicial", 0)])
-        ws.append(["", "Gastos realizados", total])
-        ws.append(["", "Saldo disponible", saldo])
-
-        wb.save(path)
-
-    def exportar_pdf(self, path="informe_gastos.pdf"):
-        """Genera un PDF con el detalle de gastos."""
+    def exportar_pdf(self, path="informe_gastos.pdf", datos=None, progreso=None):
+        """Genera el listado PDF (``rendicion.pdf_export.export_listado``; ``datos`` y
+        ``progreso`` como en Excel), con el logotipo institucional si esta disponible."""
+        logo = Path(LOGO_PATH).read_bytes() if Path(LOGO_PATH).exists() else None
         try:
-            from fpdf import FPDF
-        except Exception as exc:  # pragma: no cover - dependencia faltante
+            contenido = pdf_export.export_listado(self._rendicion(datos), logo_bytes=logo,
+                                                  progreso=progreso, paso=PASO_PROGRESO)
+        except ImportError as exc:  # pragma: no cover - dependencia faltante
             raise RuntimeError(
                 "Debe instalar fpdf para exportar a PDF"
             ) from exc
-
-        # Crear en orientacion horizontal
-        pdf = FPDF(orientation="L")
-        pdf.add_page()
-        # Incluir el logotipo institucional si esta disponible
-        if Path(LOGO_PATH).exists():
-            pdf.image(LOGO_PATH, x=10, y=8, w=40)
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.cell(0, 10,
-                 "Rendicion de Gastos menores Fondo Fijo - SLEP Petorca - Programa 01",
-                 ln=True, align="C")
-        pdf.ln(5)
-
-        pdf.set_font("Helvetica", size=10)
-        fecha_w = 30
-        detalle_w = 120
-        monto_w = 30
-        # Ancho restante para la columna Documento
-        max_doc_w = (
-            pdf.w
-            - pdf.l_margin
-            - pdf.r_margin
-            - fecha_w
-            - detalle_w
-            - monto_w
-        )
-        gastos = sorted(self.data.get("gastos", []), key=lambda g: g["fecha"])
-        docs = [Path(g["documento"]).name if g["documento"] else "" for g in gastos]
-        if docs:
-            doc_w = min(max(pdf.get_string_width(d) + 4 for d in docs), max_doc_w)
-        else:
-            doc_w = max_doc_w
-        pdf.cell(fecha_w, 8, "Fecha", border=1)
-        pdf.cell(detalle_w, 8, "Detalle", border=1)
-        pdf.cell(monto_w, 8, "Monto", border=1)
-        pdf.cell(doc_w, 8, "Documento", border=1, ln=True)
-
-        def wrap_text(text, width):
-            words = text.split()
-            lines = []
-            line = ""
-            for word in words:
-                test = f"{line} {word}".strip()
-                if pdf.get_string_width(test) <= width:
-                    line = test
-                else:
-                    lines.append(line)
-                    line = word
-            if line:
-                lines.append(line)
-            return lines or [""]
-
-        line_h = 8
-        for g in gastos:
-            doc_text = Path(g["documento"]).name if g["documento"] else ""
-            doc_lines = wrap_text(doc_text, doc_w - 2)
-            row_h = line_h * max(1, len(doc_lines))
-            x_left = pdf.l_margin
-            y_start = pdf.get_y()
-            pdf.cell(fecha_w, row_h, g["fecha"], border=1)
-            pdf.cell(detalle_w, row_h, g["descripcion"], border=1)
-            pdf.cell(monto_w, row_h, f"${g['monto']}", border=1)
-            pdf.multi_cell(doc_w, line_h, "\n".join(doc_lines), border=1)
-            y_end = max(y_start + row_h, pdf.get_y())
-            pdf.set_xy(x_left, y_end)
-
-        pdf.ln(5)
-        cantidad, total, saldo = self.resumen()
-
-        pdf.cell(0, 6, "Resumen", ln=True)
-        pdf.cell(60, 8, "Total Fondo Entregado", border=1)
-        pdf.cell(40, 8, str(self.data.get("fondo_inicial", 0)), border=1, ln=True)
-        pdf.cell(60, 8, "Total Gastos Realizados", border=1)
-        pdf.cell(40, 8, str(total), border=1, ln=True)
-        pdf.cell(60, 8, "Saldo disponible", border=1)
-        pdf.cell(40, 8, str(saldo), border=1, ln=True)
-
-        pdf.ln(15)
-        pdf.cell(0, 6, "_____________________________", ln=True, align="L")
-        pdf.cell(0, 6, "Nombre:", ln=True)
-        pdf.cell(0, 6, "RUT:", ln=True)
-        pdf.cell(0, 6, "Cargo:", ln=True)
-
-        pdf.output(path)
+        Path(path).write_bytes(contenido)
 
 
 class FileChooserPopup(Popup):
     def __init__(self, on_select, **kwargs):
         super().__init__(title="Seleccionar documento", size_hint=(0.9, 0.9), **kwargs)
         self.on_select = on_select
+        # el selector de archivos (y su ScreenManager) se carga solo al abrir el popup
+        from kivy.uix.filechooser import FileChooserIconView
+
         box = BoxLayout(orientation="vertical")
         self.fc = FileChooserIconView()
         box.add_widget(self.fc)
@@ -299,6 +360,85 @@ class CalendarPopup(Popup):
         self.dismiss()
 
 
+class GastoFila(RecycleDataViewBehavior, BoxLayout):
+    """Fila de la lista; la RecycleView reutiliza unas pocas para las entradas visibles."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lista = None
+        self.index = None
+        self._refrescando = False
+        self.cb = CheckBox(size_hint_x=None, width=30)
+        self.cb.bind(active=self._on_active)
+        self.label = Label()
+        self.add_widget(self.cb)
+        self.add_widget(self.label)
+
+    def refresh_view_attrs(self, rv, index, data):
+        # la fila pasa a mostrar otra entrada: sin disparar el cambio de seleccion
+        self.lista = rv
+        self.index = index
+        self._refrescando = True
+        self.label.text = data["texto"]
+        self.cb.active = data["seleccionado"]
+        self._refrescando = False
+
+    def _on_active(self, _instance, value):
+        if not self._refrescando and self.lista is not None:
+            self.lista.marcar(self.index, value)
+
+
+class ListaGastos(RecycleView):
+    """Lista virtualizada de los gastos del GastosManager.
+
+    ``data`` tiene una entrada (texto y seleccion) por gasto; solo las filas
+    visibles existen como widgets y reemplazar una entrada refresca solo esa
+    fila. La seleccion vive en ``data`` para que no se pierda al desplazarse.
+    """
+
+    def __init__(self, on_toggle, **kwargs):
+        super().__init__(**kwargs)
+        self.on_toggle = on_toggle
+        layout = RecycleBoxLayout(
+            orientation="vertical", spacing=5, size_hint_y=None,
+            default_size=(None, 30), default_size_hint=(1, None),
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+        self.viewclass = GastoFila  # despues del layout, que es quien la guarda
+
+    @staticmethod
+    def entrada(gasto, seleccionado=False):
+        texto = (
+            f"{gasto['fecha']} - {detalle(gasto)} - {money(gasto['monto'])} - "
+            f"{nombre_doc(gasto) or ''}"
+        )
+        return {"texto": texto, "seleccionado": seleccionado}
+
+    def cargar(self, gastos, seleccion=()):
+        self.data = [self.entrada(g, i in seleccion) for i, g in enumerate(gastos)]
+
+    def agregar(self, gasto):
+        self.data.append(self.entrada(gasto))
+
+    def actualizar(self, idx, gasto):
+        self.data[idx] = self.entrada(gasto, self.data[idx]["seleccionado"])
+
+    def eliminar(self, indices):
+        for idx in sorted(set(indices), reverse=True):
+            del self.data[idx]
+
+    def marcar(self, idx, valor):
+        # desde la casilla: la fila ya muestra el valor, basta con guardarlo
+        self.data[idx]["seleccionado"] = valor
+        self.on_toggle(idx, valor)
+
+    def desmarcar(self, indices):
+        for idx in indices:
+            if idx < len(self.data):
+                self.data[idx] = {**self.data[idx], "seleccionado": False}
+
+
 class GastosUI(BoxLayout):
     """Interfaz principal de la aplicacion."""
 
@@ -307,21 +447,22 @@ class GastosUI(BoxLayout):
         self.manager = GastosManager()
         self.selected_indices = set()
         self.edit_index = None
+        self.trabajos = TrabajosFondo()
+        # varios pedidos en el mismo cuadro se juntan en un solo render
+        self._grafico_trigger = Clock.create_trigger(self._render_grafico)
 
         self.controls_box = BoxLayout(orientation="vertical", spacing=5, size_hint_x=0.5)
         self.add_widget(self.controls_box)
 
-        self.lista_layout = GridLayout(cols=1, spacing=5, size_hint_y=None)
-        self.lista_layout.bind(minimum_height=self.lista_layout.setter("height"))
+        self.lista = ListaGastos(on_toggle=self._toggle)
 
         self.right_box = BoxLayout(orientation="vertical", spacing=5, size_hint_x=0.5)
-        scroll = ScrollView()
-        scroll.add_widget(self.lista_layout)
         self.chart_image = Image(size_hint_y=None, height=200)
-        self.right_box.add_widget(scroll)
+        self.right_box.add_widget(self.lista)
         self.right_box.add_widget(self.chart_image)
         self.add_widget(self.right_box)
         self.actualizar_lista()
+        self._completar_hashes()
 
         # Fondo inicial
         self.fondo_input = TextInput(
@@ -372,29 +513,64 @@ class GastosUI(BoxLayout):
         self.controls_box.add_widget(btn_pdf)
         self.label_resumen = Label(text="")
         self.controls_box.add_widget(self.label_resumen)
+        self.progreso = ProgressBar(max=100, value=0, size_hint_y=None, height=20)
+        self.controls_box.add_widget(self.progreso)
 
     def actualizar_grafico(self):
-        try:
-            import matplotlib.pyplot as plt
-            from kivy.core.image import Image as CoreImage
-        except Exception:
+        """Pide un nuevo grafico; se dibuja en segundo plano y los pedidos seguidos se juntan."""
+        self._grafico_trigger()
+
+    def _completar_hashes(self):
+        """Hash de los adjuntos sin ``ref_doc`` (al iniciar, y tras cada alta o edicion),
+        leidos fuera del hilo de la interfaz: un archivo grande no congela la ventana."""
+        pendientes = self.manager.adjuntos_sin_hash()
+        if pendientes:
+            self.trabajos.enviar(
+                "hashes", lambda: [(idx, ruta, hash_archivo(ruta)) for idx, ruta in pendientes],
+                al_terminar=self._hashes_listos,
+            )
+
+    def _hashes_listos(self, hashes):
+        avisos = self.manager.completar_hashes(hashes)
+        if avisos:
+            self.label_resumen.text += " | " + " ".join(c.mensaje() for c in avisos)
+
+    def _render_grafico(self, _dt=None):
+        _cantidad, total, saldo = self.manager.resumen()
+        self.trabajos.enviar(
+            "grafico", lambda: grafico_png(total, saldo),
+            al_terminar=self._mostrar_grafico,
+            al_fallar=lambda exc: self._mostrar_grafico(None),
+        )
+
+    def _mostrar_grafico(self, png):
+        if png is None:
             self.chart_image.texture = None
             return
+        from kivy.core.image import Image as CoreImage
+        self.chart_image.texture = CoreImage(io.BytesIO(png), ext="png").texture
+
+    def _exportar(self, nombre, exportar, listo):
+        """Exporta una instantanea en segundo plano; se puede seguir editando mientras tanto."""
+        datos = self.manager.instantanea()
+        progreso = self.trabajos.en_hilo_ui(self._mostrar_progreso)
+        self.progreso.value = 0
+        self.label_resumen.text = f"Generando informe {nombre}..."
+
+        def terminado(_resultado):
+            self.progreso.value = self.progreso.max
+            self.label_resumen.text = listo
+
+        def fallo(exc):
+            self.progreso.value = 0
+            self.label_resumen.text = str(exc)
+
+        if not self.trabajos.enviar(nombre, lambda: exportar(datos=datos, progreso=progreso),
+                                    al_terminar=terminado, al_fallar=fallo):
+            self.label_resumen.text = f"Informe {nombre} en curso; se repetira con los datos actuales"
 
-        fondo = self.manager.data.get("fondo_inicial", 0)
-        total = sum(g["monto"] for g in self.manager.data.get("gastos", []))
-        saldo = fondo - total
-        labels = ["Gastos realizados", "Saldo disponible"]
-        sizes = [total, max(saldo, 0)]
-        fig, ax = plt.subplots(figsize=(3, 3))
-        ax.pie(sizes, labels=labels, autopct="%1.1f%%")
-        ax.axis("equal")
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        plt.close(fig)
-        buf.seek(0)
-        img = CoreImage(buf, ext="png")
-        self.chart_image.texture = img.texture
+    def _mostrar_progreso(self, hechos, total):
+        self.progreso.value = self.progreso.max * hechos / total if total else self.progreso.max
 
     def on_set_fondo(self, _instance):
         try:
@@ -412,48 +588,49 @@ class GastosUI(BoxLayout):
         except ValueError:
             self.label_resumen.text = "Monto invalido"
             return
-        detalle = self.detalle_input.text
+        texto = self.detalle_input.text
         doc = self.doc_path
+        gastos = self.manager.data["gastos"]
         if self.edit_index is None:
-            self.manager.agregar_gasto(monto, detalle, doc, self.fecha)
+            avisos = self.manager.agregar_gasto(monto, texto, doc, self.fecha)
+            self.lista.agregar(gastos[-1])
             self.label_resumen.text = "Gasto registrado"
         else:
-            self.manager.data["gastos"][self.edit_index] = {
-                "fecha": self.fecha.isoformat(), 
-                "monto": monto,
-                "descripcion": detalle,
-                "documento": doc,
-            }
-            self.manager.guardar_datos()
+            # se conservan los campos de las otras apps (proveedor, N° de documento...)
+            gasto = dict(gastos[self.edit_index])
+            gasto.update(fecha=self.fecha.isoformat(), monto=monto)
+            gasto["detalle" if "detalle" in gasto else "descripcion"] = texto
+            if doc != (gasto.get("documento") or ""):
+                gasto.pop("nombre_doc", None)
+                gasto.pop("ref_doc", None)
+                gasto["documento"] = doc
+            avisos = self.manager.editar_gasto(self.edit_index, gasto)
+            self.lista.actualizar(self.edit_index, gastos[self.edit_index])
             self.label_resumen.text = "Gasto actualizado"
             self.edit_index = None
             self.btn_registrar.text = "Registrar gasto"
+        if avisos:
+            self.label_resumen.text += " | " + " ".join(c.mensaje() for c in avisos)
         self.detalle_input.text = ""
         self.monto_input.text = ""
         self.doc_path = ""
         self.doc_label.text = "Documento: (ninguno)"
+        self.lista.desmarcar(self.selected_indices)
         self.selected_indices.clear()
-        self.actualizar_lista()
+        self.actualizar_grafico()
+        self._completar_hashes()
 
     def on_resumen(self, _instance):
         cantidad, total, saldo = self.manager.resumen()
         self.label_resumen.text = (
-            f"Gastos: {cantidad} | Total: ${total} | Saldo disponible: ${saldo}"
+            f"Gastos: {cantidad} | Total: {money(total)} | Saldo disponible: {money(saldo)}"
         )
 
     def on_export_excel(self, _instance):
-        try:
-            self.manager.exportar_excel()
-            self.label_resumen.text = "Informe Excel creado"
-        except Exception as exc:
-            self.label_resumen.text = str(exc)
+        self._exportar("Excel", self.manager.exportar_excel, "Informe Excel creado")
 
     def on_export_pdf(self, _instance):
-        try:
-            self.manager.exportar_pdf()
-            self.label_resumen.text = "Informe PDF creado"
-        except Exception as exc:
-            self.label_resumen.text = str(exc)
+        self._exportar("PDF", self.manager.exportar_pdf, "Informe PDF creado")
 
     def on_select_doc(self, _instance):
         FileChooserPopup(self.set_doc).open()
@@ -475,10 +652,10 @@ class GastosUI(BoxLayout):
             return
         idx = next(iter(self.selected_indices))
         gasto = self.manager.data["gastos"][idx]
-        self.detalle_input.text = gasto["descripcion"]
+        self.detalle_input.text = detalle(gasto)
         self.monto_input.text = str(gasto["monto"])
-        self.doc_path = gasto["documento"]
-        nombre = Path(gasto["documento"]).name if gasto["documento"] else "(ninguno)"
+        self.doc_path = gasto.get("documento") or ""
+        nombre = nombre_doc(gasto) or "(ninguno)"
         self.doc_label.text = f"Documento: {nombre}"
         self.fecha = date.fromisoformat(gasto["fecha"])
         self.fecha_label.text = f"Fecha: {self.fecha.isoformat()}"
@@ -490,30 +667,17 @@ class GastosUI(BoxLayout):
         if not self.selected_indices:
             self.label_resumen.text = "No hay registros seleccionados"
             return
-        for idx in sorted(self.selected_indices, reverse=True):
-            del self.manager.data["gastos"][idx]
-        self.manager.guardar_datos()
+        self.manager.eliminar_gastos(self.selected_indices)
+        self.lista.eliminar(self.selected_indices)
         self.selected_indices.clear()
         self.edit_index = None
         self.btn_registrar.text = "Registrar gasto"
-        self.actualizar_lista()
+        self.actualizar_grafico()
         self.label_resumen.text = "Registro(s) eliminado(s)"
 
     def actualizar_lista(self):
-        self.lista_layout.clear_widgets()
-        for idx, g in enumerate(self.manager.data.get("gastos", [])):
-            info = (
-                f"{g['fecha']} - {g['descripcion']} - ${g['monto']} - "
-                f"{Path(g['documento']).name if g['documento'] else ''}"
-            )
-            row = BoxLayout(size_hint_y=None, height=30)
-            cb = CheckBox(size_hint_x=None, width=30)
-            cb.active = idx in self.selected_indices
-            cb.bind(active=lambda inst, val, i=idx: self._toggle(i, val))
-            row.add_widget(cb)
-            row.add_widget(Label(text=info))
-            self.lista_layout.add_widget(row)
-
+        """Recarga completa (al iniciar); altas, ediciones y bajas tocan solo su entrada."""
+        self.lista.cargar(self.manager.data.get("gastos", []), self.selected_indices)
         self.actualizar_grafico()
 
     def _toggle(self, idx, active):
@@ -526,7 +690,13 @@ class GastosUI(BoxLayout):
 class GastosApp(App):
     def build(self):
         self.title = "App Registro Rendición de Cuentas - SLEP Petorca"
-        return GastosUI()
+        self.ui = GastosUI()
+        return self.ui
+
+    def on_stop(self):
+        # Al cerrar se terminan los exportes en curso y se compacta la bitacora en la instantanea
+        self.ui.trabajos.cerrar()
+        self.ui.manager.guardar_datos()
 
 
 if __name__ == "__main__":
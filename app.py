@@ -1,212 +1,97 @@
-
-import io
-import json
-from datetime import date, datetime
+from datetime import date
 from typing import List, Dict, Any, Optional
 
 import streamlit as st
 import pandas as pd
-from fpdf import FPDF
-import matplotlib.pyplot as plt
+
+from rendicion import attachments, charts, excel_export, importer, model, pdf_export, st_common
+from rendicion.model import money
+from rendicion.st_common import documentos_adjuntos, escrito as written, export_button, quitar_gastos as remove_gastos, repo, totals
 
 st.set_page_config(page_title="Rendición de Cuentas – SLEP Petorca", layout="wide")
 
 # ----------------------------
 # Helpers & State
 # ----------------------------
+# (title, gasto key, fill for empty cells) of the table shown by this app
+COLUMNAS = [("Fecha", "fecha", None), ("Detalle", "detalle", ""), ("Monto", "monto", None), ("Documento", "nombre_doc", "—")]
+
+def _frame_from_gastos(gastos, start: int = 1) -> pd.DataFrame:
+    # this app's table has no "N" column, so start is not used
+    return st_common.frame_from_gastos(gastos, COLUMNAS)
+
+def open_rendicion(clave: str) -> None:
+    # gastos: {fecha:str 'YYYY-MM-DD', monto:float, detalle:str, nombre_doc:str or None, ref_doc: sha256 del adjunto or None}
+    st_common.abrir_rendicion(repo().rendicion_id(clave), _frame_from_gastos)
+    st.session_state.rendicion_clave = clave
+
+def sync_rendicion() -> None:
+    # Another session, front-end or the CLI wrote to this rendición: reload it (by clave, so a deleted one comes back empty)
+    st_common.sincronizar(lambda rid: open_rendicion(st.session_state.rendicion_clave))
+
 def init_state():
-    if "data" not in st.session_state:
-        st.session_state.data = {
-            "fondo_inicial": 0.0,
-            # gastos: list of dicts: {fecha:str 'YYYY-MM-DD', monto:float, detalle:str, nombre_doc:str or None, bytes_doc: bytes or None}
-            "gastos": []
-        }
+    if "rendicion_id" not in st.session_state:
+        open_rendicion("principal")
+    else:
+        sync_rendicion()
     if "logo_bytes" not in st.session_state:
         st.session_state.logo_bytes = None
         st.session_state.logo_name = None
-
-def money(x: float) -> str:
-    try:
-        return f"${x:,.0f}".replace(",", ".")
-    except Exception:
-        return f"${x}"
+    if "exports" not in st.session_state:
+        st.session_state.exports = {}  # kind -> (huella, bytes)
 
 def load_data_from_json(file) -> None:
+    # streamed straight into the database: the upload is never held in memory as a whole
+    store = attachments.default_store()
+    progress = st.progress(0.0, text="Importando...")
+
+    def on_progress(done, total, n):
+        progress.progress(min(done / total, 1.0) if total else 0.0, text=f"Importando... {n} gastos")
+
     try:
-        obj = json.load(file)
-        # backward compatibility: allow missing keys
-        fi = float(obj.get("fondo_inicial", 0))
-        gastos = obj.get("gastos", [])
-        fixed_gastos = []
-        for g in gastos:
-            fixed_gastos.append({
-                "fecha": g.get("fecha"),
-                "monto": float(g.get("monto", 0)),
-                "detalle": g.get("detalle") or g.get("descripcion") or "",
-                "nombre_doc": g.get("nombre_doc"),
-                "bytes_doc": None  # documents are not embedded when importing JSON (optional)
-            })
-        st.session_state.data = {"fondo_inicial": fi, "gastos": fixed_gastos}
-        st.success("Datos cargados desde JSON.")
+        rid = st.session_state.rendicion_id
+        # documents are not embedded in JSON; reuse the stored one if this server still has it
+        imp = importer.StreamImport(file, normalize=lambda g: importer.normalize_gasto(g, store), progress=on_progress)
+        repo().import_gastos(rid, imp)
+        repo().set_fondo(rid, imp.fondo_inicial or 0.0)
+        open_rendicion(st.session_state.rendicion_clave)
+        st.success(f"Datos cargados desde JSON: {imp.cantidad} gastos.")
+        if imp.errores:
+            st.warning(f"Se omitieron {len(imp.errores)} registros inválidos (primero: registro {imp.errores[0][0]}: {imp.errores[0][1]}).")
     except Exception as e:
         st.error(f"Error al leer JSON: {e}")
+    finally:
+        progress.empty()
 
 def export_data_json() -> bytes:
-    # For privacy/size, do not embed raw document bytes in JSON.
-    data = {
-        "fondo_inicial": st.session_state.data["fondo_inicial"],
-        "gastos": [
-            {
-                "fecha": g["fecha"],
-                "monto": g["monto"],
-                "detalle": g["detalle"],
-                "nombre_doc": g.get("nombre_doc"),
-            }
-            for g in st.session_state.data["gastos"]
-        ]
-    }
-    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    # Document bytes are not embedded in the JSON (privacy/size), only their reference
+    return model.export_json(st.session_state.data)
 
 def gastos_df() -> pd.DataFrame:
-    df = pd.DataFrame(st.session_state.data["gastos"])
-    if not df.empty:
-        df = df.assign(
-            Fecha=pd.to_datetime(df["fecha"]).dt.date,
-            Detalle=df["detalle"],
-            Monto=df["monto"].astype(float),
-            Documento=df["nombre_doc"].fillna("—")
-        )[["Fecha", "Detalle", "Monto", "Documento"]]
-    return df
-
-def totals():
-    df = gastos_df()
-    total = float(df["Monto"].sum()) if not df.empty else 0.0
-    cantidad = int(len(df)) if not df.empty else 0
-    fondo = float(st.session_state.data["fondo_inicial"])
-    saldo = fondo - total
-    return fondo, total, saldo, cantidad
+    return st_common.gastos_df(_frame_from_gastos)
 
 def add_gasto(fecha: date, detalle: str, monto: float, doc_file):
     nombre_doc = None
-    bytes_doc = None
+    ref_doc = None
     if doc_file is not None:
         nombre_doc = doc_file.name
-        bytes_doc = doc_file.read()
-    st.session_state.data["gastos"].append({
+        doc_file.seek(0)
+        ref_doc = attachments.default_store().put_stream(doc_file)
+    g = {
         "fecha": fecha.strftime("%Y-%m-%d"),
         "monto": float(monto),
         "detalle": detalle,
         "nombre_doc": nombre_doc,
-        "bytes_doc": bytes_doc
-    })
-
-def remove_gastos(indices: List[int]):
-    # Remove from last to first to keep indices stable
-    for idx in sorted(indices, reverse=True):
-        if 0 <= idx < len(st.session_state.data["gastos"]):
-            st.session_state.data["gastos"].pop(idx)
+        "ref_doc": ref_doc
+    }
+    return st_common.agregar_gasto(g, _frame_from_gastos)
 
+# Layout of this app, built headless by rendicion.excel_export / rendicion.pdf_export
 def export_excel() -> bytes:
-    df = gastos_df()
-    from openpyxl import Workbook
-    from openpyxl.utils.dataframe import dataframe_to_rows
-    from openpyxl.styles import Alignment, Font
-    from openpyxl.worksheet.table import Table, TableStyleInfo
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Gastos"
-
-    # Title
-    ws["A1"] = "Rendición de Cuentas – SLEP Petorca"
-    ws["A1"].font = Font(bold=True, size=14)
-    ws.merge_cells("A1:D1")
-    ws["A1"].alignment = Alignment(horizontal="center")
-
-    # Table
-    if df.empty:
-        df = pd.DataFrame(columns=["Fecha","Detalle","Monto","Documento"])
-    start_row = 3
-    for r in dataframe_to_rows(df, index=False, header=True):
-        ws.append(r)
-    # Convert appended data starting at row 3
-    last_row = start_row + len(df)
-    table = Table(displayName="TablaGastos", ref=f"A{start_row}:D{last_row}")
-    style = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False,
-                           showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-    table.tableStyleInfo = style
-    ws.add_table(table)
-
-    # Summary
-    fondo, total, saldo, cantidad = totals()
-    ws[f"A{last_row+2}"] = "Fondo inicial"
-    ws[f"B{last_row+2}"] = fondo
-    ws[f"A{last_row+3}"] = "Total gastos"
-    ws[f"B{last_row+3}"] = total
-    ws[f"A{last_row+4}"] = "Saldo"
-    ws[f"B{last_row+4}"] = saldo
-    ws[f"A{last_row+5}"] = "Cantidad de gastos"
-    ws[f"B{last_row+5}"] = cantidad
-
-    bio = io.BytesIO()
-    wb.save(bio)
-    return bio.getvalue()
+    return excel_export.export_tabla(st.session_state.data)
 
 def export_pdf() -> bytes:
-    df = gastos_df()
-    fondo, total, saldo, cantidad = totals()
-
-    pdf = FPDF(orientation="P", unit="mm", format="A4")
-    pdf.add_page()
-    # Logo (optional)
-    if st.session_state.logo_bytes:
-        try:
-            logo_bio = io.BytesIO(st.session_state.logo_bytes)
-            pdf.image(logo_bio, x=10, y=8, w=30)
-        except Exception:
-            pass
-    pdf.set_font("Arial", size=12)
-    pdf.cell(0, 10, "Rendición de Cuentas – SLEP Petorca", ln=True, align="C")
-    pdf.ln(5)
-    pdf.set_font("Arial", size=10)
-    pdf.cell(0, 6, f"Fecha de emisión: {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True)
-    pdf.ln(2)
-
-    # Summary
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 7, "Resumen", ln=True)
-    pdf.set_font("Arial", size=10)
-    pdf.cell(0, 6, f"Fondo inicial: {money(fondo)}", ln=True)
-    pdf.cell(0, 6, f"Total gastos: {money(total)}", ln=True)
-    pdf.cell(0, 6, f"Saldo: {money(saldo)}", ln=True)
-    pdf.cell(0, 6, f"Cantidad de gastos: {cantidad}", ln=True)
-    pdf.ln(4)
-
-    # Table header
-    pdf.set_font("Arial", "B", 10)
-    pdf.cell(30, 7, "Fecha", border=1, align="C")
-    pdf.cell(100, 7, "Detalle", border=1, align="C")
-    pdf.cell(30, 7, "Monto", border=1, align="C")
-    pdf.cell(30, 7, "Documento", border=1, align="C")
-    pdf.ln()
-
-    pdf.set_font("Arial", size=9)
-    if df.empty:
-        pdf.cell(190, 7, "Sin registros", border=1, align="C")
-        pdf.ln()
-    else:
-        for _, row in df.iterrows():
-            pdf.cell(30, 7, row["Fecha"].strftime("%Y-%m-%d"), border=1)
-            # detalle: truncate to fit
-            detalle = str(row["Detalle"])[:60]
-            pdf.cell(100, 7, detalle, border=1)
-            pdf.cell(30, 7, money(float(row["Monto"])), border=1, align="R")
-            pdf.cell(30, 7, str(row["Documento"])[:14], border=1)
-            pdf.ln()
-
-    bio = io.BytesIO()
-    pdf.output(bio)
-    return bio.getvalue()
+    return pdf_export.export_tabla(st.session_state.data, logo_bytes=st.session_state.logo_bytes)
 
 # ----------------------------
 # UI
@@ -216,9 +101,14 @@ st.title("Rendición de Cuentas – SLEP Petorca")
 
 with st.sidebar:
     st.header("Configuración")
+    clave = st.text_input("Clave de la rendición", value=st.session_state.rendicion_clave)
+    if st.button("Abrir rendición") and clave.strip() and clave.strip() != st.session_state.rendicion_clave:
+        open_rendicion(clave.strip()); st.rerun()
     fondo_inicial = st.number_input("Fondo inicial", min_value=0.0, step=1000.0, value=float(st.session_state.data["fondo_inicial"]))
     if st.button("Guardar fondo"):
         st.session_state.data["fondo_inicial"] = float(fondo_inicial)
+        repo().set_fondo(st.session_state.rendicion_id, fondo_inicial)
+        written()
         st.success("Fondo inicial actualizado.")
 
     st.divider()
@@ -231,10 +121,10 @@ with st.sidebar:
 
     st.divider()
     st.caption("Importar / Exportar datos")
-    up = st.file_uploader("Importar datos JSON", type=["json"], key="json_up")
+    up = st.file_uploader("Importar datos JSON", type=["json", "jsonl"], key="json_up")
     if up is not None and st.button("Cargar JSON"):
         load_data_from_json(up)
-    st.download_button("Exportar datos a JSON", data=export_data_json(), file_name="rendicion_datos.json", mime="application/json")
+    export_button("JSON", "json", export_data_json, file_name="rendicion_datos.json", mime="application/json", images=False)
 
 # ---- Registro de gasto ----
 st.subheader("Registrar gasto")
@@ -253,8 +143,10 @@ with st.form("form_gasto", clear_on_submit=True):
         if d.strip() == "":
             st.error("El detalle es obligatorio.")
         else:
-            add_gasto(f, d, m, doc)
+            avisos = add_gasto(f, d, m, doc)
             st.success("Gasto agregado.")
+            for c in avisos:
+                st.warning(c.mensaje())
 
 # ---- Tabla / Gestión ----
 st.subheader("Gastos registrados")
@@ -284,31 +176,28 @@ c4.metric("Cantidad", f"{cantidad}")
 
 # ---- Gráfico ----
 st.subheader("Distribución")
-labels = ["Gastos", "Saldo"]
-vals = [max(total, 0), max(saldo, 0)]
-fig, ax = plt.subplots()
-ax.pie(vals, labels=labels, autopct="%1.1f%%")
-ax.axis("equal")
-st.pyplot(fig)
+# Cached PNG per (total, saldo): no matplotlib work when the numbers are unchanged
+if charts.renderer() == "vega":
+    chart = charts.pie_spec(total, saldo)
+    if chart is not None:
+        st.vega_lite_chart(chart, use_container_width=True)
+else:
+    chart = charts.pie_png(total, saldo)
+    if chart is not None:
+        st.image(chart)
+if chart is None:  # an empty pie (no fondo, no gastos) used to crash matplotlib
+    st.info("Aún no hay datos para graficar. Configura el fondo inicial o registra gastos.")
 
 # ---- Exportaciones ----
 st.subheader("Exportaciones")
 colx, colp = st.columns(2)
 with colx:
-    st.download_button("Descargar Excel", data=export_excel(), file_name="rendicion_gastos.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    export_button("Excel", "excel", export_excel, file_name="rendicion_gastos.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 with colp:
-    st.download_button("Descargar PDF", data=export_pdf(), file_name="rendicion_gastos.pdf", mime="application/pdf")
+    export_button("PDF", "pdf", export_pdf, file_name="rendicion_gastos.pdf", mime="application/pdf")
 
 # ---- Descarga de documentos ----
 st.subheader("Documentos adjuntos")
-if len(st.session_state.data["gastos"]) == 0:
-    st.caption("No hay documentos adjuntos aún.")
-else:
-    for i, g in enumerate(st.session_state.data["gastos"]):
-        if g.get("bytes_doc"):
-            st.download_button(f"Descargar '{g.get('nombre_doc','documento')}'", data=g["bytes_doc"], file_name=g.get("nombre_doc","documento"))
-        else:
-            if g.get("nombre_doc"):
-                st.caption(f"{i+1}. {g.get('nombre_doc')} (no embebido)")
+documentos_adjuntos()
 
-st.caption("⚠️ Nota: Los archivos subidos viven en la sesión del navegador (memoria). Exporta/Importa JSON para persistir registros entre sesiones.")
+st.caption("⚠️ Nota: Los archivos subidos se guardan en el almacén de adjuntos del servidor (no en la sesión). Exporta/Importa JSON para persistir registros entre sesiones.")
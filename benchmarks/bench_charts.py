@@ -0,0 +1,57 @@
+"""Costo del gráfico de torta por rerun: figura nueva con pyplot frente a ``rendicion.charts``.
+
+Simula ``n`` reruns de Streamlit en los que los números cambian cada
+``cada`` reruns (lo normal: la mayoría de los reruns son clics que no tocan
+los gastos) y mide el tiempo total y las figuras que quedan abiertas.
+
+Uso: python benchmarks/bench_charts.py [reruns] [cada]   (por defecto 200 y 10)
+"""
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import matplotlib  # noqa: E402
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+plt.rcParams["figure.max_open_warning"] = 0  # las figuras sin cerrar son justamente lo que se mide
+
+from rendicion import charts  # noqa: E402
+
+
+def pyplot_fresh(total: float, saldo: float) -> bytes:
+    """Lo que hacían las apps: ``plt.subplots()`` en cada rerun, sin cerrar la figura."""
+    fig, ax = plt.subplots()
+    ax.pie([total, saldo], labels=["Gastos", "Saldo"], autopct="%1.1f%%")
+    ax.axis("equal")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def timed(label: str, fn, reruns: int, cada: int) -> None:
+    t0 = time.perf_counter()
+    for i in range(reruns):
+        total = 1000.0 * (i // cada + 1)
+        fn(total, 1_000_000.0 - total)
+    dt = time.perf_counter() - t0
+    print(f"  {label:<28} {dt:7.3f} s  ({dt / reruns * 1000:6.1f} ms por rerun)  figuras abiertas: {len(plt.get_fignums())}")
+
+
+def main(reruns: int = 200, cada: int = 10) -> None:
+    charts.pie_png(1.0, 1.0)  # importa matplotlib fuera de las mediciones
+    charts.clear_cache()
+    print(f"{reruns} reruns, números nuevos cada {cada}")
+    timed("pyplot, figura nueva", pyplot_fresh, reruns, cada)
+    plt.close("all")
+    timed("charts.pie_png", charts.pie_png, reruns, cada)
+    charts.clear_cache()
+    timed("charts.pie_png, sin caché", lambda t, s: (charts.clear_cache(), charts.pie_png(t, s)), reruns, cada)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
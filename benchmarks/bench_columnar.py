@@ -0,0 +1,82 @@
+"""Memoria y tiempos de los gastos en columnas (``GastosTable``) frente a una lista de diccionarios.
+
+Mide con ``tracemalloc`` lo que ocupan ``n`` gastos en cada forma y el tiempo
+de las operaciones que hacen las apps en cada recarga: total, subtotales por
+tipo de documento, orden por fecha y filtro por rango de fechas y proveedor.
+
+Uso: python benchmarks/bench_columnar.py [gastos]   (por defecto 200.000)
+"""
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rendicion.columnar import GastosTable  # noqa: E402
+
+PROVEEDORES = [f"Proveedor {i}" for i in range(300)]
+TIPOS = ["Boleta", "Factura", "Comprobante", "Otro"]
+
+
+def sample(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    # los textos se generan por registro, como al leer un JSON: no se comparten entre gastos
+    return [{"fecha": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+             "monto": float(rnd.randint(1, 80) * 500), "tipo_doc": "".join(rnd.choice(TIPOS)),
+             "n_doc": str(rnd.randint(1, 99999)), "detalle": "gasto",
+             "proveedor": "".join(rnd.choice(PROVEEDORES)), "id": i + 1}
+            for i in range(n)]
+
+
+def memoria(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = fn()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, actual
+
+
+def timed(label: str, fn, base=None):
+    t0 = time.perf_counter()
+    result = fn()
+    dt = time.perf_counter() - t0
+    extra = f"   x{base / dt:5.1f}" if base else ""
+    print(f"  {label:<30} {dt:7.3f} s{extra}")
+    return result, dt
+
+
+def main(n: int = 200_000) -> None:
+    rows, mem_rows = memoria(lambda: sample(n))
+    table, mem_table = memoria(lambda: GastosTable(rows))
+    print(f"{n} gastos")
+    print(f"  lista de diccionarios           {mem_rows / 2**20:7.1f} MB")
+    print(f"  GastosTable                     {mem_table / 2**20:7.1f} MB   x{mem_rows / mem_table:5.1f}")
+    assert table == rows
+
+    def subtotales_dicts():
+        out = defaultdict(float)
+        for g in rows:
+            out[g["tipo_doc"]] += g["monto"]
+        return out
+
+    GastosTable(rows[:1]).total()  # importa numpy fuera de las mediciones
+    print("lista de diccionarios:")
+    _, t_total = timed("total", lambda: sum(g["monto"] for g in rows))
+    _, t_sub = timed("subtotales por tipo", subtotales_dicts)
+    _, t_sort = timed("orden por fecha", lambda: sorted(rows, key=lambda g: g["fecha"]))
+    _, t_filter = timed("filtro marzo + proveedor", lambda: [
+        g for g in rows if "2025-03-01" <= g["fecha"] <= "2025-03-31" and g["proveedor"] == "Proveedor 7"])
+    print("GastosTable:")
+    timed("total", table.total, t_total)
+    timed("subtotales por tipo", lambda: table.sum_by("tipo_doc"), t_sub)
+    timed("orden por fecha", lambda: table.argsort("fecha"), t_sort)
+    timed("filtro marzo + proveedor",
+          lambda: table.filter(desde="2025-03-01", hasta="2025-03-31", proveedor="Proveedor 7"), t_filter)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
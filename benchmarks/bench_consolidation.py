@@ -0,0 +1,105 @@
+"""Tiempo de consolidar un año de rendiciones de todos los establecimientos.
+
+Genera ``escuelas`` fondos con 12 rendiciones mensuales encadenadas (el saldo
+final de cada mes es el saldo anterior del siguiente) y ``gastos`` gastos por
+rendición, y mide la construcción de las tablas y cada agregado, tanto desde
+los diccionarios (como los JSON exportados) como desde una base SQLite, y el
+índice de duplicados que se consulta al registrar cada gasto.
+
+Uso: python benchmarks/bench_consolidation.py [escuelas] [gastos por rendición]
+     (por defecto 80 escuelas y 150 gastos: 11.520 gastos por mes)
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rendicion.consolidation import Consolidado  # noqa: E402
+from rendicion.duplicates import DuplicateIndex  # noqa: E402
+from rendicion.storage import Repository  # noqa: E402
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto",
+         "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+PROVEEDORES = [f"Proveedor {i}" for i in range(300)]
+TIPOS = ["Boleta", "Factura", "Comprobante", "Otro"]
+DETALLES = [f"{a} {b}" for a in ("Compra de", "Reposición de", "Pago de", "Arriendo de", "Mantención de")
+            for b in ("materiales", "útiles de aseo", "insumos de oficina", "alimentos", "transporte",
+                      "herramientas", "libros", "gas", "artículos eléctricos", "mobiliario")]
+
+
+def sample_year(escuelas: int, por_rendicion: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    items = []
+    for e in range(escuelas):
+        saldo = 0.0
+        for m, mes in enumerate(MESES):
+            gastos = [{"fecha": f"2025-{m+1:02d}-{rnd.randint(1, 28):02d}", "monto": float(rnd.randint(1, 80) * 500),
+                       "tipo_doc": rnd.choice(TIPOS), "n_doc": str(rnd.randint(1, 99999)),
+                       "detalle": rnd.choice(DETALLES), "proveedor": rnd.choice(PROVEEDORES)}
+                      for _ in range(por_rendicion)]
+            meta = {"institucion": f"Escuela {e+1}", "tipo_fondo": "Fondo fijo", "responsable": f"Responsable {e+1}",
+                    "n_rendicion": str(m + 1), "mes_que_rinde": f"{mes} 2025",
+                    "saldo_mes_anterior": saldo, "monto_recibido_mes_anterior": 2_000_000.0,
+                    "monto_gasto_transporte": 0.0}
+            items.append((f"escuela{e+1}-{m+1:02d}", {"fondo_inicial": 2_000_000.0, "meta": meta, "gastos": gastos}))
+            saldo = saldo + 2_000_000.0 - sum(g["monto"] for g in gastos)
+    return items
+
+
+def timed(label: str, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"  {label:<24} {time.perf_counter() - t0:7.3f} s")
+    return result
+
+
+def run_aggregates(c: Consolidado) -> None:
+    timed("por mes", c.por_mes)
+    timed("por fondo", c.por_fondo)
+    timed("por proveedor", c.por_proveedor)
+    timed("por tipo documento", c.por_tipo_doc)
+    problemas = timed("continuidad", c.problemas)
+    print(f"  problemas de continuidad: {len(problemas)}")
+    duplicados = timed("duplicados", c.duplicados)
+    print(f"  grupos de duplicados: {duplicados['grupo'].nunique()}")
+
+
+def run_index(items) -> None:
+    """Índice de duplicados de un año completo y revisión de cada gasto al registrarlo."""
+    gastos = [g for _, data in items for g in data["gastos"]]
+    index = timed("índice (todo el año)", lambda: DuplicateIndex(gastos))
+    t0 = time.perf_counter()
+    for g in gastos[:10_000]:
+        index.check(g)
+    print(f"  revisión por gasto        {(time.perf_counter() - t0) / 10_000 * 1e6:7.1f} µs")
+
+
+def main(escuelas: int = 80, por_rendicion: int = 150) -> None:
+    items = sample_year(escuelas, por_rendicion)
+    print(f"{len(items)} rendiciones, {len(items) * por_rendicion} gastos")
+
+    print("desde diccionarios:")
+    c = timed("tablas", lambda: Consolidado.from_data(items))
+    run_aggregates(c)
+    run_index(items)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Repository(os.path.join(tmp, "bench.db"))
+        for nombre, data in items:
+            rid = repo.rendicion_id(nombre)
+            repo.set_fondo(rid, data["fondo_inicial"])
+            repo.set_meta(rid, data["meta"])
+            repo.add_gastos(rid, data["gastos"])
+        print("desde la base SQLite:")
+        c = timed("tablas", lambda: Consolidado.from_repository(repo))
+        run_aggregates(c)
+        timed("informe Excel", c.to_excel)
+        repo.close()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
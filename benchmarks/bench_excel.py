@@ -0,0 +1,62 @@
+"""Tiempo y memoria máxima de la exportación a Excel: libro normal frente a write-only.
+
+Ambos caminos reciben las mismas filas (tipos nativos, como las de
+``rendicion.model.filas``) y generan las hojas "Gastos" y "Resumen". La memoria
+es el pico de ``tracemalloc`` durante la construcción y el guardado, en una
+segunda pasada para no sumar su costo al tiempo.
+
+Uso: python benchmarks/bench_excel.py [filas ...]   (por defecto 1000 10000 50000)
+"""
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rendicion.excel_export import build_workbook, build_workbook_streaming  # noqa: E402
+
+PROVEEDORES = ["Librería Central", "Comercial Petorca Ltda.", "Ferretería El Roble",
+               "Supermercado La Ligua", "Transportes Hijuelas SpA", "Farmacia Cabildo"]
+TIPOS = ["Boleta", "Factura", "Comprobante", "Otro"]
+PALABRAS = ("materiales de oficina aseo reparación escolar transporte alimentación "
+            "actividad taller insumos fotocopias premiación ceremonia mantención").split()
+META = {"tipo_fondo": "Fondo fijo", "responsable": "Responsable", "institucion": "SLEP Petorca",
+        "n_rendicion": "1", "saldo_mes_anterior": "0", "monto_recibido_mes_anterior": "0"}
+
+
+def sample_rows(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    return [(i, date(2025, rnd.randint(1, 12), rnd.randint(1, 28)), rnd.choice(TIPOS),
+             str(rnd.randint(1000, 99999)),
+             " ".join(rnd.choice(PALABRAS) for _ in range(rnd.randint(2, 18))),
+             rnd.choice(PROVEEDORES), float(rnd.randrange(500, 250_000, 10)))
+            for i in range(1, n + 1)]
+
+
+def measure(builder, rows) -> tuple:
+    """(segundos, MB pico, MB del xlsx); el tiempo se toma sin ``tracemalloc``, que lo distorsiona."""
+    total = sum(r[6] for r in rows)
+    t0 = time.perf_counter()
+    data = builder(rows, META, 10_000_000.0, total)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    builder(rows, META, 10_000_000.0, total)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, len(data) / 2**20
+
+
+def main(sizes) -> None:
+    print(f"{'filas':>7} {'normal (s)':>11} {'normal MB':>10} {'write-only (s)':>15} {'write-only MB':>14} {'xlsx MB':>8}")
+    for n in sizes:
+        rows = sample_rows(n)
+        t_n, m_n, _ = measure(build_workbook, rows)
+        t_s, m_s, size = measure(build_workbook_streaming, rows)
+        print(f"{n:>7} {t_n:>11.2f} {m_n:>10.1f} {t_s:>15.2f} {m_s:>14.1f} {size:>8.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,135 @@
+"""Tiempo de generación de la tabla de gastos del PDF, antes y después de la etapa de maquetación.
+
+"antes": cada fila se ajusta dos veces (altura + dibujo), sin caché, y se
+dibuja con ``multi_cell`` (que vuelve a partir el texto), como hacía
+``export_pdf`` originalmente. "después": ``layout_rows`` ajusta cada
+celda una vez, con la caché de proceso fría (primera exportación) y caliente.
+
+Al final compara solo el ajuste de textos largos de "Detalle del gasto":
+medido con ``pdf.get_string_width`` frente a la tabla de anchos de glifo.
+
+Uso: python benchmarks/bench_pdf_table.py [filas ...]   (por defecto 1000 10000)
+"""
+import io
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fpdf import FPDF  # noqa: E402
+
+from rendicion import pdf_layout  # noqa: E402
+
+DEJAVU = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+COL_W = [11.34, 22.68, 32.13, 34.02, 96.39, 52.92, 31.19]  # anchos horizontales normalizados (A4)
+ALIGNS = ["C", "L", "L", "L", "L", "L", "R"]
+PROVEEDORES = ["Librería Central", "Comercial Petorca Ltda.", "Ferretería El Roble",
+               "Supermercado La Ligua", "Transportes Hijuelas SpA", "Farmacia Cabildo"]
+TIPOS = ["Boleta", "Factura", "Comprobante", "Otro"]
+PALABRAS = ("materiales de oficina aseo reparación escolar transporte alimentación "
+            "actividad taller insumos fotocopias premiación ceremonia mantención").split()
+
+
+def sample_rows(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(1, n + 1):
+        detalle = " ".join(rnd.choice(PALABRAS) for _ in range(rnd.randint(2, 18)))
+        monto = rnd.randrange(500, 250_000, 10)
+        rows.append([str(i), f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                     rnd.choice(TIPOS), str(rnd.randint(1000, 99999)), detalle,
+                     rnd.choice(PROVEEDORES), f"${monto:,}".replace(",", ".")])
+    return rows
+
+
+def new_pdf() -> FPDF:
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=True, margin=14)
+    pdf.add_page()
+    if os.path.exists(DEJAVU):
+        pdf.add_font("DejaVu", "", DEJAVU)
+        pdf.set_font("DejaVu", size=9)
+    else:
+        pdf.set_font("Helvetica", size=9)
+    return pdf
+
+
+def draw_antes(pdf, cell_lines, row_h, line_h):
+    x0 = pdf.get_x(); y0 = pdf.get_y()
+    for txt_lines, w, a in zip(cell_lines, COL_W, ALIGNS):
+        x = pdf.get_x(); y = pdf.get_y()
+        pdf.multi_cell(w, line_h, "\n".join(txt_lines), border=1, align=a)
+        pdf.set_xy(x + w, y)
+    pdf.set_xy(x0, y0 + row_h)
+
+
+def render_antes(rows) -> bytes:
+    pdf = new_pdf()
+    line_h = 5.2
+    for r in rows:
+        sample = [pdf_layout._wrap_measured(pdf, v, max(1.0, w - 3)) for v, w in zip(r, COL_W)]
+        row_h = max(len(x) for x in sample) * line_h
+        if row_h > (pdf.h - pdf.b_margin) - pdf.get_y():
+            pdf.add_page()
+        pdf.set_x(10)
+        cells = [pdf_layout._wrap_measured(pdf, v, max(1.0, w - 3)) for v, w in zip(r, COL_W)]
+        draw_antes(pdf, cells, row_h, line_h)
+    out = io.BytesIO(); pdf.output(out)
+    return out.getvalue()
+
+
+def render_despues(rows) -> bytes:
+    pdf = new_pdf()
+    line_h = 5.2
+    for cells, row_h in pdf_layout.layout_rows(pdf, rows, COL_W, line_h):
+        if row_h > (pdf.h - pdf.b_margin) - pdf.get_y():
+            pdf.add_page()
+        pdf.set_x(10)
+        pdf_layout.draw_wrapped_row(pdf, cells, COL_W, ALIGNS, line_h, row_h)
+    out = io.BytesIO(); pdf.output(out)
+    return out.getvalue()
+
+
+def timed(fn, rows) -> float:
+    t0 = time.perf_counter()
+    fn(rows)
+    return time.perf_counter() - t0
+
+
+def bench_wrap(n: int = 2000, seed: int = 11) -> None:
+    rnd = random.Random(seed)
+    textos = []
+    for _ in range(n):
+        palabras = [rnd.choice(PALABRAS) for _ in range(rnd.randint(40, 160))]
+        palabras.insert(rnd.randrange(len(palabras)), "https://mercadopublico.cl/orden/" + "x" * rnd.randint(40, 200))
+        textos.append(" ".join(palabras))
+    pdf = new_pdf()
+    ancho = COL_W[4] - 3
+    t0 = time.perf_counter()
+    for t in textos:
+        pdf_layout._wrap_measured(pdf, t, ancho)
+    medido = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for t in textos:
+        pdf_layout._wrap(pdf, t, ancho)
+    tabla = time.perf_counter() - t0
+    print(f"ajuste de {n} detalles largos: get_string_width {medido:.2f} s, tabla de glifos {tabla:.2f} s")
+
+
+def main(sizes) -> None:
+    print(f"{'filas':>7} {'antes (s)':>10} {'después frío':>13} {'después caliente':>17}")
+    for n in sizes:
+        rows = sample_rows(n)
+        antes = timed(render_antes, rows)
+        pdf_layout.clear_wrap_cache()
+        frio = timed(render_despues, rows)
+        caliente = timed(render_despues, rows)
+        print(f"{n:>7} {antes:>10.2f} {frio:>13.2f} {caliente:>17.2f}")
+    bench_wrap()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000])
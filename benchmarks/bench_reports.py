@@ -0,0 +1,100 @@
+"""Informes de una rendición sin interfaz: cargar, armar filas, JSON, Excel y PDF.
+
+Es el mismo camino que siguen las tres apps y ``python -m rendicion exportar``
+(``Repository.load`` → ``model.filas`` → ``excel_export`` / ``pdf_export``: el
+formulario institucional, ``export_tabla`` de app.py y ``export_listado`` de
+Kivy), medido etapa por etapa sobre una base temporal con ``n`` gastos. Con
+``--perfil`` corre además la exportación completa bajo ``cProfile`` y lista las
+funciones con más tiempo acumulado.
+
+Uso: python benchmarks/bench_reports.py [gastos ...] [--perfil]   (por defecto 1000 10000)
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rendicion import excel_export, model, pdf_export, storage  # noqa: E402
+
+PROVEEDORES = ["Librería Central", "Comercial Petorca Ltda.", "Ferretería El Roble",
+               "Supermercado La Ligua", "Transportes Hijuelas SpA", "Farmacia Cabildo"]
+TIPOS = ["Boleta", "Factura", "Comprobante", "Otro"]
+PALABRAS = ("materiales de oficina aseo reparación escolar transporte alimentación "
+            "actividad taller insumos fotocopias premiación ceremonia mantención").split()
+TOP_PERFIL = 15  # funciones listadas con --perfil
+
+
+def sample(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    return [{"fecha": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+             "tipo_doc": rnd.choice(TIPOS), "n_doc": str(rnd.randint(1000, 99999)),
+             "detalle": " ".join(rnd.choice(PALABRAS) for _ in range(rnd.randint(2, 18))),
+             "proveedor": rnd.choice(PROVEEDORES), "monto": float(rnd.randrange(500, 250_000, 10))}
+            for _ in range(n)]
+
+
+def exportar(repo, rid) -> dict:
+    data = repo.load(rid)
+    data["meta"] = {**model.default_meta(), **data["meta"]}
+    rows = model.filas(data["gastos"])
+    return {"json": model.export_json(data),
+            "xlsx": excel_export.export_rendicion(data, rows=rows),
+            "pdf": pdf_export.export_pdf(data, landscape=True, rows=rows)}
+
+
+def etapas(repo, rid) -> list:
+    """[(etapa, segundos, bytes)] de cada paso de ``exportar``."""
+    out = []
+
+    def paso(nombre, fn):
+        t0 = time.perf_counter()
+        r = fn()
+        out.append((nombre, time.perf_counter() - t0, len(r) if isinstance(r, bytes) else None))
+        return r
+
+    data = paso("Repository.load", lambda: repo.load(rid))
+    data["meta"] = {**model.default_meta(), **data["meta"]}
+    rows = paso("model.filas", lambda: model.filas(data["gastos"]))
+    paso("model.export_json", lambda: model.export_json(data))
+    paso("excel_export.export_rendicion", lambda: excel_export.export_rendicion(data, rows=rows))
+    paso("pdf_export.export_pdf", lambda: pdf_export.export_pdf(data, landscape=True, rows=rows))
+    paso("excel_export.export_tabla", lambda: excel_export.export_tabla(data, rows=rows))
+    paso("pdf_export.export_tabla", lambda: pdf_export.export_tabla(data, rows=rows))
+    paso("excel_export.export_listado", lambda: excel_export.export_listado(data, rows=rows))
+    paso("pdf_export.export_listado", lambda: pdf_export.export_listado(data, rows=rows))
+    return out
+
+
+def main(sizes, perfil: int = 0) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = storage.Repository(os.path.join(tmp, "bench.db"))
+        try:
+            for n in sizes:
+                rid = repo.rendicion_id(f"bench-{n}")
+                repo.replace_gastos(rid, sample(n))
+                repo.set_fondo(rid, 10_000_000.0)
+                print(f"{n} gastos")
+                total = 0.0
+                for nombre, dt, size in etapas(repo, rid):
+                    total += dt
+                    kb = f"{size / 1024:9.1f} KB" if size is not None else ""
+                    print(f"  {nombre:<30} {dt:8.3f} s {kb}")
+                print(f"  {'total':<30} {total:8.3f} s")
+                if perfil:
+                    prof = cProfile.Profile()
+                    prof.runcall(exportar, repo, rid)
+                    pstats.Stats(prof, stream=sys.stdout).sort_stats("cumulative").print_stats(perfil)
+        finally:
+            repo.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    perfil = TOP_PERFIL if "--perfil" in args else 0
+    main([int(a) for a in args if a != "--perfil"] or [1000, 10000], perfil)
@@ -0,0 +1,136 @@
+"""Arranque de las tres apps: importaciones en frío (``python -X importtime``) y reruns.
+
+Cada app se mide en un proceso nuevo, con una base vacía en un directorio temporal:
+
+- Streamlit (``app.py``, ``streamlit_app.py``): la primera ejecución del script con
+  ``AppTest`` (el arranque en frío: ahí se importan pandas, ``rendicion``, ...) y la
+  mediana de ``reruns`` reruns (lo que cuesta cada clic). Streamlit ya está
+  importado por el servidor, así que no se cuenta.
+- Kivy (``Rendiciondecuentasapp2.py``): importar el módulo y construir ``GastosUI``
+  (sin ``App.run``); el "rerun" es volver a construir la interfaz con todo ya importado.
+
+De la salida de ``-X importtime`` se toman solo las importaciones hechas por la app
+y se listan las ``top`` más pesadas. ``PRESUPUESTO`` fija, por app, los módulos que
+no deben cargarse al arrancar (solo los usan exportes, gráficos o popups) y los
+milisegundos máximos de arranque y rerun; si algo se pasa, el script termina con
+código 1, de modo que sirve de control de regresión.
+
+Uso: python benchmarks/bench_startup.py [reruns] [top]   (por defecto 5 y 8)
+"""
+import json
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MARCA = "-- bench_startup: inicio --"
+NO_AL_ARRANCAR = ("fpdf", "matplotlib", "openpyxl")
+
+# app -> módulos que no deben importarse al arrancar y tiempos máximos (ms)
+PRESUPUESTO = {
+    "app.py": {"prohibidos": NO_AL_ARRANCAR, "frio_ms": 1500, "rerun_ms": 250},
+    "streamlit_app.py": {"prohibidos": NO_AL_ARRANCAR + ("rendicion.consolidation",),
+                         "frio_ms": 1500, "rerun_ms": 400},
+    "Rendiciondecuentasapp2.py": {"prohibidos": NO_AL_ARRANCAR + ("pandas", "kivy.uix.filechooser"),
+                                  "frio_ms": 2500, "rerun_ms": 250},
+}
+
+
+def sonda(entrada: str, reruns: int) -> None:
+    """Corre dentro del proceso medido: imprime en stdout los tiempos y los módulos nuevos."""
+    sys.path.insert(0, str(ROOT))
+    if entrada.endswith("app.py"):
+        from streamlit.testing.v1 import AppTest
+
+        antes = set(sys.modules)
+        print(MARCA, file=sys.stderr, flush=True)
+        at = AppTest.from_file(str(ROOT / entrada), default_timeout=120)
+        t0 = time.perf_counter()
+        at.run()
+        frio = time.perf_counter() - t0
+        tiempos = []
+        for _ in range(reruns):
+            t0 = time.perf_counter()
+            at.run()
+            tiempos.append(time.perf_counter() - t0)
+        error = [e.value for e in at.exception]
+    else:
+        antes = set(sys.modules)
+        print(MARCA, file=sys.stderr, flush=True)
+        t0 = time.perf_counter()
+        app = runpy.run_path(str(ROOT / entrada), run_name="bench_startup")  # sus importaciones quedan de primer nivel
+        app["GastosUI"]().trabajos.cerrar()
+        frio = time.perf_counter() - t0
+        nuevos = set(sys.modules) - antes
+        tiempos = []
+        for _ in range(reruns):
+            t0 = time.perf_counter()
+            app["GastosUI"]().trabajos.cerrar()
+            tiempos.append(time.perf_counter() - t0)
+        antes |= set(sys.modules) - nuevos  # lo que se importe recién al reconstruir no es arranque
+        error = []
+    print(json.dumps({
+        "frio_ms": frio * 1000,
+        "rerun_ms": statistics.median(tiempos) * 1000 if tiempos else 0.0,
+        "modulos": sorted(set(sys.modules) - antes),
+        "error": error,
+    }))
+
+
+def importaciones(stderr: str) -> list:
+    """``[(ms acumulados, módulo)]`` de primer nivel importados después de la marca."""
+    out, medir = [], False
+    for linea in stderr.splitlines():
+        if linea == MARCA:
+            medir = True
+        elif medir and linea.startswith("import time:") and "[us]" not in linea:
+            _, acumulado, nombre = linea[len("import time:"):].split("|")
+            if not nombre[1:].startswith(" "):  # sangría = importación anidada
+                out.append((int(acumulado) / 1000, nombre.strip()))
+    return out
+
+
+def medir(entrada: str, reruns: int) -> tuple:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, RENDICION_DB=os.path.join(tmp, "rendicion.db"),
+                   RENDICION_ADJUNTOS_DIR=os.path.join(tmp, "adjuntos"),
+                   KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+        p = subprocess.run([sys.executable, "-X", "importtime", __file__, "--sonda", entrada, str(reruns)],
+                           cwd=tmp, env=env, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"{entrada}: la sonda falló\n{p.stderr[-2000:]}")
+    return json.loads(p.stdout.strip().splitlines()[-1]), importaciones(p.stderr)
+
+
+def main(reruns: int = 5, top: int = 8) -> int:
+    fallas = []
+    for entrada, presupuesto in PRESUPUESTO.items():
+        r, imps = medir(entrada, reruns)
+        print(f"{entrada}: arranque {r['frio_ms']:8.1f} ms (importaciones {sum(ms for ms, _ in imps):7.1f} ms)"
+              f" | rerun {r['rerun_ms']:7.1f} ms")
+        for ms, nombre in sorted(imps, reverse=True)[:top]:
+            print(f"    {ms:8.1f} ms  {nombre}")
+        cargados = [m for m in presupuesto["prohibidos"]
+                    if any(x == m or x.startswith(m + ".") for x in r["modulos"])]
+        if r["error"]:
+            fallas.append(f"{entrada}: excepción en el script: {r['error']}")
+        if cargados:
+            fallas.append(f"{entrada}: importa al arrancar {', '.join(cargados)}")
+        for clave in ("frio_ms", "rerun_ms"):
+            if r[clave] > presupuesto[clave]:
+                fallas.append(f"{entrada}: {clave} = {r[clave]:.0f} > {presupuesto[clave]}")
+    for f in fallas:
+        print("FALLA", f)
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--sonda"]:
+        sonda(sys.argv[2], int(sys.argv[3]))
+    else:
+        sys.exit(main(*(int(a) for a in sys.argv[1:3])))
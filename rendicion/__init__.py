@@ -0,0 +1,12 @@
+"""Lógica compartida (sin interfaz) de la app de Rendición de Cuentas – SLEP Petorca.
+
+La usan las tres apps (Streamlit y Kivy) y la línea de comandos, ``python -m rendicion``.
+"""
+from .attachments import AttachmentStore
+from .columnar import GastosTable
+from .duplicates import DuplicateIndex
+from .journal import JournalStore
+from .ledger import GastosLedger, LedgerMismatch
+from .storage import Repository, RepositoryStore
+
+__all__ = ["AttachmentStore", "DuplicateIndex", "GastosLedger", "GastosTable", "JournalStore", "LedgerMismatch", "Repository", "RepositoryStore"]
@@ -0,0 +1,6 @@
+"""``python -m rendicion``: ver ``rendicion.cli``."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
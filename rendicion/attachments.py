@@ -0,0 +1,196 @@
+"""Almacén de documentos adjuntos en disco, direccionado por contenido (SHA-256).
+
+Los gastos guardan solo la referencia (``ref_doc``, el hash hexadecimal) y el
+nombre original; los bytes viven una sola vez en disco aunque se suba el mismo
+archivo en varios gastos o sesiones. La escritura se hace por bloques (se
+calcula el hash mientras se copia a un temporal y se renombra al final) y la
+lectura también, así que la memoria de cada sesión no depende del tamaño ni
+de la cantidad de adjuntos.
+
+La carpeta se toma de ``RENDICION_ADJUNTOS_DIR`` o, si no está definida, de
+``<tmp>/rendicion_adjuntos``. Los ZIP de "descargar todo" se arman por bloques
+en ``<raíz>/zips`` y también quedan direccionados por contenido; de ellos se
+conservan solo los ``ARCHIVES_KEPT`` usados más recientemente.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+ENV_DIR = "RENDICION_ADJUNTOS_DIR"
+CHUNK_SIZE = 1 << 20  # 1 MiB
+# Formatos ya comprimidos: se guardan tal cual en los ZIP (comprimirlos solo gasta CPU)
+STORED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+                     ".zip", ".gz", ".7z", ".rar", ".docx", ".xlsx", ".pptx", ".odt", ".ods"}
+# ZIP generados (zips/, paquetes/) que se conservan por carpeta; los demás se borran
+ARCHIVES_KEPT = 16
+
+
+def default_root() -> str:
+    return os.environ.get(ENV_DIR) or os.path.join(tempfile.gettempdir(), "rendicion_adjuntos")
+
+
+def _is_ref(ref) -> bool:
+    return isinstance(ref, str) and len(ref) == 64 and all(c in "0123456789abcdef" for c in ref)
+
+
+class AttachmentStore:
+    """Archivos inmutables en ``<raíz>/<ab>/<hash completo>``."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or default_root())
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+
+    def path(self, ref: str) -> str:
+        if not _is_ref(ref):
+            raise ValueError(f"Referencia de adjunto inválida: {ref!r}")
+        return os.path.join(self.root, ref[:2], ref)
+
+    def exists(self, ref) -> bool:
+        return _is_ref(ref) and os.path.isfile(self.path(ref))
+
+    def size(self, ref: str) -> int:
+        return os.path.getsize(self.path(ref))
+
+    # ---------- escritura ----------
+    def put_stream(self, fileobj, chunk_size: int = CHUNK_SIZE) -> str:
+        """Copia ``fileobj`` al almacén por bloques y devuelve su referencia."""
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    block = fileobj.read(chunk_size)
+                    if not block:
+                        break
+                    h.update(block)
+                    out.write(block)
+            ref = h.hexdigest()
+            dest = self.path(ref)
+            if os.path.exists(dest):  # mismo contenido ya guardado
+                os.remove(tmp)
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(tmp, dest)
+            return ref
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def put_bytes(self, data: bytes) -> str:
+        ref = hashlib.sha256(data).hexdigest()
+        if not self.exists(ref):
+            self.put_stream(io.BytesIO(data))
+        return ref
+
+    # ---------- lectura ----------
+    def open(self, ref: str):
+        return open(self.path(ref), "rb")
+
+    def iter_chunks(self, ref: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self.open(ref) as f:
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    return
+                yield block
+
+    def read(self, ref: str) -> bytes:
+        """Bytes completos; solo para entregar una descarga puntual."""
+        with self.open(ref) as f:
+            return f.read()
+
+    # ---------- ZIP de varios adjuntos ----------
+    def zip_path(self, items) -> str:
+        """Ruta del ZIP para ``items`` (``[(nombre en el zip, ref), ...]``), exista o no."""
+        key = hashlib.sha256(json.dumps(list(items), ensure_ascii=False).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "zips", key + ".zip")
+
+    def build_zip(self, items) -> str:
+        """Arma (una sola vez) el ZIP de ``items`` en disco y devuelve su ruta."""
+        items = [tuple(it) for it in items]
+        dest = self.zip_path(items)
+        if os.path.exists(dest):
+            os.utime(dest)  # recién usado: no lo borra prune_archives
+            return dest
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                write_zip(self, items, out)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        prune_archives(os.path.dirname(dest))
+        return dest
+
+
+def prune_archives(directory: str, keep: int = ARCHIVES_KEPT) -> None:
+    """Borra de ``directory`` los ZIP más antiguos y deja los ``keep`` usados más recientemente.
+
+    Cada cambio en los datos genera un archivo nuevo (el nombre es la huella del
+    contenido); sin esto la carpeta crece sin límite.
+    """
+    archivos = []
+    try:
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".zip") and entry.is_file():
+                archivos.append((entry.stat().st_mtime, entry.path))
+    except FileNotFoundError:  # carpeta aún no creada o archivo borrado por otra sesión
+        return
+    archivos.sort(reverse=True)
+    for _, path in archivos[keep:]:
+        try:
+            os.remove(path)
+        except OSError:  # ya borrado, o abierto en Windows: se intenta la próxima vez
+            pass
+
+
+def write_zip(store: AttachmentStore, items: Iterable[Tuple[str, str]], fileobj,
+              chunk_size: int = CHUNK_SIZE) -> None:
+    """Escribe los adjuntos en ``fileobj`` como ZIP, bloque a bloque desde el almacén."""
+    with zipfile.ZipFile(fileobj, "w", allowZip64=True) as zf:
+        for arcname, ref in items:
+            add_to_zip(zf, store, arcname, ref, chunk_size)
+
+
+def zip_compression(arcname: str) -> int:
+    ext = os.path.splitext(arcname)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def add_to_zip(zf: zipfile.ZipFile, store: AttachmentStore, arcname: str, ref: str,
+               chunk_size: int = CHUNK_SIZE) -> None:
+    """Agrega un adjunto a un ZIP abierto copiándolo por bloques."""
+    path = store.path(ref)
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime(os.path.getmtime(path))[:6])
+    info.compress_type = zip_compression(arcname)
+    size = os.path.getsize(path)
+    info.file_size = size
+    with zf.open(info, "w", force_zip64=size > 0x7FFFFFFF) as dst:
+        for block in store.iter_chunks(ref, chunk_size):
+            dst.write(block)
+
+
+_DEFAULT = {}
+_LOCK = threading.Lock()
+
+
+def default_store() -> AttachmentStore:
+    """Almacén compartido por el proceso para la carpeta configurada."""
+    root = os.path.abspath(default_root())
+    store = _DEFAULT.get(root)
+    if store is None:
+        with _LOCK:
+            store = _DEFAULT.get(root)
+            if store is None:
+                store = _DEFAULT[root] = AttachmentStore(root)
+    return store
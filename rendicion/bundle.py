@@ -0,0 +1,122 @@
+"""Paquete de rendición: un ZIP con el PDF, el Excel, el JSON de datos y los adjuntos.
+
+El paquete se escribe directo a disco (nunca se arma en memoria): los informes
+ya generados se agregan como entradas y cada adjunto se copia por bloques desde
+el ``AttachmentStore``. Los formatos ya comprimidos (PDF, XLSX, JPG, ...) se
+guardan sin volver a comprimir. En el JSON cada gasto con documento lleva
+``"adjunto"``, la ruta de su archivo dentro del ZIP, de modo que
+``read_bundle`` puede devolver los adjuntos al almacén al importar.
+
+Los paquetes que arman las apps quedan en ``<raíz del almacén>/paquetes``,
+con la huella de sus datos como nombre; se conservan los más recientes
+(``attachments.prune_archives``).
+"""
+import json
+import os
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+
+from .attachments import AttachmentStore, add_to_zip, prune_archives, zip_compression
+from .importer import StreamImport, normalize_gasto
+
+DATA_NAME = "rendicion_datos.json"
+ADJUNTOS_PREFIX = "adjuntos/"
+
+
+def _arcname(i: int, nombre: str) -> str:
+    base = os.path.basename(str(nombre).replace("\\", "/")) or "documento"
+    return f"{ADJUNTOS_PREFIX}{i+1:03d}_{base}"
+
+
+def bundle_path(store: AttachmentStore, key: str) -> str:
+    """Ruta del paquete identificado por ``key`` (la huella de sus datos)."""
+    return os.path.join(store.root, "paquetes", f"{key}.zip")
+
+
+def write_bundle(fileobj, data: dict, reports: dict, store: AttachmentStore) -> None:
+    """Escribe el paquete en ``fileobj``.
+
+    ``data`` es el diccionario que se exporta como JSON (gastos con ``ref_doc``
+    y ``nombre_doc``); ``reports`` mapea nombre de archivo -> bytes ya generados.
+    """
+    data = dict(data)
+    gastos, adjuntos = [], []
+    for i, g in enumerate(data.get("gastos", [])):
+        g = dict(g)
+        if g.get("nombre_doc") and store.exists(g.get("ref_doc")):
+            g["adjunto"] = _arcname(i, g["nombre_doc"])
+            adjuntos.append((g["adjunto"], g["ref_doc"]))
+        gastos.append(g)
+    data["gastos"] = gastos
+
+    now = time.localtime()[:6]
+    with zipfile.ZipFile(fileobj, "w", allowZip64=True) as zf:
+        payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        zf.writestr(zipfile.ZipInfo(DATA_NAME, date_time=now), payload, compress_type=zipfile.ZIP_DEFLATED)
+        for name, content in reports.items():
+            zf.writestr(zipfile.ZipInfo(name, date_time=now), content, compress_type=zip_compression(name))
+        for arcname, ref in adjuntos:
+            add_to_zip(zf, store, arcname, ref)
+
+
+def build_bundle(dest: str, data: dict, reports: dict, store: AttachmentStore) -> str:
+    """Escribe el paquete en ``dest`` (vía temporal + renombrado) si aún no existe; luego
+    borra los paquetes más antiguos de la misma carpeta."""
+    if os.path.exists(dest):
+        os.utime(dest)
+        return dest
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            write_bundle(out, data, reports, store)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    prune_archives(os.path.dirname(dest))
+    return dest
+
+
+def read_data(fileobj) -> dict:
+    """Solo el JSON de datos del paquete (sin copiar los adjuntos)."""
+    with zipfile.ZipFile(fileobj) as zf:
+        if DATA_NAME not in zf.namelist():
+            raise ValueError(f"El paquete no contiene {DATA_NAME}")
+        with zf.open(DATA_NAME) as f:
+            return json.load(f)
+
+
+@contextmanager
+def open_import(fileobj, store: AttachmentStore, progress=None, raw: bool = False):
+    """``StreamImport`` sobre el JSON del paquete: cada gasto con adjunto lo copia por
+    bloques al almacén (``ref_doc``) a medida que se lee; el ZIP queda abierto dentro
+    del ``with``. Con ``raw=True`` los gastos se entregan sin normalizar."""
+    with zipfile.ZipFile(fileobj) as zf:
+        names = set(zf.namelist())
+        if DATA_NAME not in names:
+            raise ValueError(f"El paquete no contiene {DATA_NAME}")
+
+        def restaurar(g):
+            if isinstance(g, dict) and g.get("adjunto") in names:
+                g = dict(g)
+                with zf.open(g.pop("adjunto")) as src:
+                    g["ref_doc"] = store.put_stream(src)
+            return g if raw else normalize_gasto(g, store)
+
+        with zf.open(DATA_NAME) as f:
+            yield StreamImport(f, normalize=restaurar, progress=progress,
+                               total_bytes=zf.getinfo(DATA_NAME).file_size)
+
+
+def read_bundle(fileobj, store: AttachmentStore) -> dict:
+    """Lee el JSON del paquete y devuelve sus datos con ``ref_doc`` apuntando a los
+    adjuntos, que se copian por bloques al almacén."""
+    with open_import(fileobj, store, raw=True) as imp:
+        gastos = [g for g in imp]
+        for g in gastos:
+            g.pop("adjunto", None)
+    return {"fondo_inicial": imp.fondo_inicial or 0, "meta": imp.meta, "gastos": gastos}
@@ -0,0 +1,100 @@
+"""Gráfico de torta gastos / saldo, compartido por todo el proceso.
+
+Cada rerun de Streamlit (y cada refresco de la lista en Kivy) creaba una
+figura nueva con ``plt.subplots()`` que las apps Streamlit nunca cerraban.
+Aquí el PNG se guarda en un caché por ``(total, saldo)`` (y etiquetas y
+tamaño), de modo que si los números no cambiaron no se toca matplotlib; al
+cambiar, se dibuja sobre una única figura Agg reutilizada (sin pyplot, así
+que sirve desde cualquier hilo), con un candado porque la figura es una sola.
+
+``pie_spec`` da el mismo gráfico como especificación Vega-Lite para
+``st.vega_lite_chart`` (vectorial, dibujado por el navegador, sin
+matplotlib). Las apps lo usan si ``RENDICION_GRAFICO=vega``.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+ENV_RENDERER = "RENDICION_GRAFICO"  # "png" (por defecto) o "vega"
+LABELS = ("Gastos", "Saldo")
+FIGSIZE = (6.4, 4.8)  # pulgadas, el tamaño por omisión de matplotlib
+DPI = 100
+
+_LOCK = threading.Lock()
+_CACHE = OrderedDict()  # (etiquetas, total, saldo, figsize, dpi) -> PNG
+_CACHE_MAX = 128
+_FIGURES = {}           # figsize -> (Figure, FigureCanvasAgg)
+
+
+def renderer() -> str:
+    return "vega" if os.environ.get(ENV_RENDERER, "").strip().lower() == "vega" else "png"
+
+
+def _valores(total, saldo):
+    """Porciones de la torta (negativos a cero); None si no hay nada que dibujar."""
+    vals = (max(float(total or 0), 0.0), max(float(saldo or 0), 0.0))
+    return vals if sum(vals) > 0 else None
+
+
+def _figure(figsize):
+    entry = _FIGURES.get(figsize)
+    if entry is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize, dpi=DPI)
+        entry = _FIGURES[figsize] = (fig, FigureCanvasAgg(fig))
+    return entry
+
+
+def pie_png(total, saldo, labels=LABELS, figsize=FIGSIZE, dpi=DPI) -> Optional[bytes]:
+    """PNG de la torta; None si total y saldo son cero (matplotlib no dibuja una torta vacía)."""
+    vals = _valores(total, saldo)
+    if vals is None:
+        return None
+    key = (tuple(labels), round(vals[0], 2), round(vals[1], 2), tuple(figsize), dpi)
+    with _LOCK:
+        png = _CACHE.get(key)
+        if png is not None:
+            _CACHE.move_to_end(key)
+            return png
+        fig, canvas = _figure(tuple(figsize))
+        fig.clear()
+        ax = fig.add_subplot()
+        ax.pie(vals, labels=list(labels), autopct="%1.1f%%")
+        ax.axis("equal")
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi)
+        fig.clear()  # suelta los artistas: la figura queda vacía hasta el próximo dibujo
+        png = _CACHE[key] = buf.getvalue()
+        while len(_CACHE) > _CACHE_MAX:
+            _CACHE.popitem(last=False)
+        return png
+
+
+def pie_spec(total, saldo, labels=LABELS) -> Optional[dict]:
+    """La misma torta como especificación Vega-Lite (None si no hay nada que dibujar)."""
+    vals = _valores(total, saldo)
+    if vals is None:
+        return None
+    suma = sum(vals)
+    datos = [{"parte": label, "monto": v, "etiqueta": f"{label} {v / suma:.1%}"}
+             for label, v in zip(labels, vals)]
+    return {
+        "data": {"values": datos},
+        "encoding": {
+            "theta": {"field": "monto", "type": "quantitative", "stack": True},
+            "color": {"field": "parte", "type": "nominal", "sort": list(labels), "legend": None},
+        },
+        "layer": [
+            {"mark": {"type": "arc", "outerRadius": 110}},
+            {"mark": {"type": "text", "radius": 140}, "encoding": {"text": {"field": "etiqueta"}}},
+        ],
+        "view": {"stroke": None},
+    }
+
+
+def clear_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
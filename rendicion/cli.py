@@ -0,0 +1,222 @@
+"""Línea de comandos: ``python -m rendicion [--db BASE] [--adjuntos CARPETA] COMANDO ...``.
+
+Trabaja sobre la misma base SQLite que las tres apps (``RENDICION_DB`` o
+``rendicion.db``, salvo ``--db``) y genera los mismos informes, sin Streamlit
+ni Kivy, para trabajo por lotes:
+
+- ``listar``: rendiciones guardadas con su resumen.
+- ``resumen RENDICION [--por tipo_doc|proveedor|mes]``: totales y subtotales.
+- ``importar RENDICION ARCHIVO [--agregar]``: JSON, JSON Lines o paquete .zip
+  (por flujo, en una transacción).
+- ``exportar RENDICION SALIDA``: .json, .xlsx, .pdf o paquete .zip según la
+  extensión de ``SALIDA``.
+- ``consolidar SALIDA.xlsx [ARCHIVO ...]``: consolidado de toda la base (o de
+  archivos JSON / .zip) con continuidad de saldos y duplicados.
+
+``RENDICION`` es el id numérico (ver ``listar``) o la clave de la rendición
+(la app Kivy guarda la suya con la clave "kivy"); ``importar`` crea la
+rendición si la clave no existe.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from . import attachments, bundle, excel_export, importer, model, pdf_export, storage
+from .model import money
+
+FORMATOS = (".json", ".xlsx", ".pdf", ".zip")
+
+
+class ErrorCLI(Exception):
+    """Error de uso o de datos: se informa en una línea, sin traza."""
+
+
+def _rendicion(repo: storage.Repository, texto: str, crear: bool = False) -> int:
+    if texto.isdigit():  # un número es siempre un id, nunca una clave nueva
+        rid = int(texto) if int(texto) in {r["id"] for r in repo.rendiciones()} else None
+    else:
+        rid = repo.rendicion_id(texto, create=crear)
+    if rid is None:
+        raise ErrorCLI(f"No existe la rendición {texto!r} (ver 'listar').")
+    return rid
+
+
+def _store(args) -> attachments.AttachmentStore:
+    return attachments.AttachmentStore(args.adjuntos) if args.adjuntos else attachments.default_store()
+
+
+def _leer(path, que: str) -> bytes:
+    try:
+        return Path(path).read_bytes()
+    except OSError as e:
+        raise ErrorCLI(f"No se pudo leer {que} {path}: {e.strerror}")
+
+
+def _firmas(pares) -> dict:
+    firmas = {}
+    claves = [k for k, _ in pdf_export.FIRMAS]
+    for par in pares or ():
+        clave, _, ruta = par.partition("=")
+        if clave not in claves or not ruta:
+            raise ErrorCLI(f"--firma espera CLAVE=IMAGEN con CLAVE en: {', '.join(claves)}")
+        firmas[clave] = _leer(ruta, "la firma")
+    return firmas
+
+
+# ---------- comandos ----------
+def cmd_listar(repo, args) -> None:
+    filas = repo.rendiciones()
+    if not filas:
+        print("No hay rendiciones guardadas.")
+        return
+    print(f"{'id':>4}  {'gastos':>6}  {'total':>14}  {'saldo':>14}  {'actualizada':19}  clave")
+    for r in filas:
+        print(f"{r['id']:>4}  {r['cantidad']:>6}  {money(r['total']):>14}  {money(r['saldo']):>14}  "
+              f"{(r['actualizada'] or '')[:19]:19}  {r['clave']}")
+
+
+def cmd_resumen(repo, args) -> None:
+    rid = _rendicion(repo, args.rendicion)
+    fondo, total, saldo, cantidad = repo.totals(rid)
+    print(f"Fondo inicial: {money(fondo)}")
+    print(f"Total gastos:  {money(total)} ({cantidad} gastos)")
+    print(f"Saldo:         {money(saldo)}")
+    subtotales = repo.subtotales(rid, por=args.por)
+    if subtotales:
+        print(f"Por {args.por}:")
+        ancho = max(len(k or "(sin dato)") for k in subtotales)
+        for k, (monto, n) in subtotales.items():
+            print(f"  {k or '(sin dato)':{ancho}}  {money(monto):>14}  ({n})")
+
+
+def cmd_importar(repo, args) -> None:
+    store = _store(args)
+    es_paquete = args.archivo.lower().endswith(".zip")
+    rid = _rendicion(repo, args.rendicion, crear=True)
+    try:
+        with open(args.archivo, "rb") as f:
+            if es_paquete:
+                with bundle.open_import(f, store) as imp:
+                    repo.import_gastos(rid, imp, replace=not args.agregar)
+            else:
+                imp = importer.StreamImport(f, normalize=lambda g: importer.normalize_gasto(g, store))
+                repo.import_gastos(rid, imp, replace=not args.agregar)
+    except OSError as e:
+        raise ErrorCLI(f"No se pudo leer {args.archivo}: {e.strerror}")
+    except ValueError as e:  # JSON o paquete inválido: la rendición queda como estaba
+        raise ErrorCLI(f"{args.archivo}: {e}")
+    if imp.fondo_inicial is not None or not args.agregar:
+        repo.set_fondo(rid, imp.fondo_inicial or 0.0)
+    if imp.meta:
+        repo.set_meta(rid, {**repo.load(rid)["meta"], **imp.meta})
+    print(f"{imp.cantidad} gastos importados en la rendición {rid}.")
+    for n, msg in imp.errores:
+        print(f"  omitido registro {n}: {msg}", file=sys.stderr)
+
+
+def cmd_exportar(repo, args) -> None:
+    formato = os.path.splitext(args.salida)[1].lower()
+    if formato not in FORMATOS:
+        raise ErrorCLI(f"Formato de salida no soportado: use {', '.join(FORMATOS)}")
+    data = repo.load(_rendicion(repo, args.rendicion))
+    data["meta"] = {**model.default_meta(), **data["meta"]}
+    logo = _leer(args.logo, "el logo") if args.logo else None
+    firmas = _firmas(args.firma)
+
+    def pdf(rows):
+        return pdf_export.export_pdf(data, not args.vertical, args.logo_mm, logo, firmas, rows=rows)
+
+    def xlsx(rows):
+        return excel_export.export_rendicion(data, logo, args.logo_px, rows=rows)
+
+    if formato == ".json":
+        contenido = model.export_json(data)
+    elif formato == ".xlsx":
+        contenido = xlsx(None)
+    elif formato == ".pdf":
+        contenido = pdf(None)
+    else:  # paquete: informes + JSON + adjuntos, como en la app
+        rows = model.filas(data["gastos"])
+        reports = {"rendicion_gastos.pdf": pdf(rows), "rendicion_gastos.xlsx": xlsx(rows)}
+        with open(args.salida, "wb") as f:
+            bundle.write_bundle(f, model.export_data(data), reports, _store(args))
+        print(f"Paquete escrito en {args.salida}.")
+        return
+    Path(args.salida).write_bytes(contenido)
+    print(f"{len(data['gastos'])} gastos exportados a {args.salida}.")
+
+
+def cmd_consolidar(repo, args) -> None:
+    from .consolidation import Consolidado
+    if args.archivos:
+        try:
+            c = Consolidado.from_files(args.archivos)
+        except OSError as e:
+            raise ErrorCLI(f"No se pudo leer {e.filename}: {e.strerror}")
+        except ValueError as e:  # el mensaje ya empieza con el archivo
+            raise ErrorCLI(str(e))
+    else:
+        c = Consolidado.from_repository(repo)
+    Path(args.salida).write_bytes(c.to_excel())
+    problemas, duplicados = c.problemas(), c.duplicados()
+    print(f"Consolidado de {len(c.rendiciones)} rendiciones escrito en {args.salida}.")
+    print(f"{len(problemas)} rendiciones con problemas de continuidad de saldos; "
+          f"{duplicados['grupo'].nunique() if not duplicados.empty else 0} grupos de gastos duplicados.")
+
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m rendicion",
+                                description="Rendiciones de cuentas sin interfaz gráfica.")
+    p.add_argument("--db", help="base SQLite (por defecto RENDICION_DB o rendicion.db)")
+    p.add_argument("--adjuntos", help="carpeta de adjuntos (por defecto RENDICION_ADJUNTOS_DIR)")
+    sub = p.add_subparsers(dest="comando", required=True)
+
+    s = sub.add_parser("listar", help="rendiciones guardadas")
+    s.set_defaults(fn=cmd_listar)
+
+    s = sub.add_parser("resumen", help="totales y subtotales de una rendición")
+    s.add_argument("rendicion")
+    s.add_argument("--por", choices=("tipo_doc", "proveedor", "mes"), default="tipo_doc")
+    s.set_defaults(fn=cmd_resumen)
+
+    s = sub.add_parser("importar", help="importa un JSON, JSON Lines o paquete .zip")
+    s.add_argument("rendicion")
+    s.add_argument("archivo")
+    s.add_argument("--agregar", action="store_true", help="agrega a los gastos existentes en vez de reemplazarlos")
+    s.set_defaults(fn=cmd_importar)
+
+    s = sub.add_parser("exportar", help="exporta a .json, .xlsx, .pdf o paquete .zip")
+    s.add_argument("rendicion")
+    s.add_argument("salida")
+    s.add_argument("--vertical", action="store_true", help="PDF en orientación vertical")
+    s.add_argument("--logo", help="imagen del logo (PNG/JPG)")
+    s.add_argument("--logo-mm", type=int, default=24, help="ancho del logo en el PDF (16 a 40 mm)")
+    s.add_argument("--logo-px", type=int, default=140, help="ancho del logo en el Excel")
+    s.add_argument("--firma", action="append", metavar="CLAVE=IMAGEN",
+                   help="imagen de una firma del PDF (repetible)")
+    s.set_defaults(fn=cmd_exportar)
+
+    s = sub.add_parser("consolidar", help="consolidado Excel de muchas rendiciones")
+    s.add_argument("salida")
+    s.add_argument("archivos", nargs="*", help="JSON o paquetes .zip (por defecto, toda la base)")
+    s.set_defaults(fn=cmd_consolidar)
+    return p
+
+
+def main(argv=None) -> int:
+    args = parser().parse_args(argv)
+    try:
+        repo = storage.Repository(args.db)
+    except sqlite3.Error as e:
+        print(f"error: no se pudo abrir la base {args.db or storage.default_path()}: {e}", file=sys.stderr)
+        return 1
+    try:
+        args.fn(repo, args)
+    except ErrorCLI as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        repo.close()
+    return 0
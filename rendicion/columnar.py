@@ -0,0 +1,454 @@
+"""Contenedor columnar de gastos con vista por fila tipo diccionario.
+
+``GastosTable`` guarda cada clave como una columna en lugar de un ``dict`` por
+gasto:
+
+- ``monto`` en un ``array('d')`` (8 bytes por fila);
+- ``fecha`` como ordinal de la fecha en un ``array('i')`` (4 bytes);
+- ``tipo_doc`` y ``proveedor`` como códigos en un ``array('i')`` más una lista
+  de categorías (cada texto distinto se guarda una sola vez);
+- ``id`` en un ``array('q')``;
+- cualquier otra clave en una lista de Python.
+
+Un monto entero (lo habitual en JSON y en la app Kivy) se guarda como float.
+Si llega un valor que una columna tipada no puede representar (una fecha que
+no es "YYYY-MM-DD", un monto no numérico, ...) esa columna pasa a ser una lista
+común, sin perder el dato.
+
+``tabla[i]`` devuelve una ``GastoRow``: un ``Mapping`` sobre la fila ``i`` que
+se lee como el diccionario de antes (``g["monto"]``, ``g.get("nombre_doc")``,
+``dict(g)``), así que el código que recorre los gastos no cambia. Una clave
+ausente en una fila sigue ausente (no aparece como None). ``pop`` devuelve un
+``dict`` independiente; una ``GastoRow`` apunta a una posición, de modo que
+deja de corresponder a su gasto si antes de él se insertan o eliminan filas.
+
+Sumas, subtotales, orden y filtros trabajan sobre las columnas con numpy.
+"""
+from array import array
+from collections.abc import Mapping, MutableSequence
+from datetime import date
+from numbers import Real
+
+_MISSING = object()
+_NO_ID = -(1 << 63)
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def _arreglo(data: array, dtype=None):
+    """Copia de un ``array`` como arreglo de numpy a través de su búfer (sin pasar por
+    objetos de Python); la vista intermedia se suelta antes de volver."""
+    import numpy as np
+    vista = np.frombuffer(data, dtype=data.typecode) if len(data) else np.zeros(0, dtype=data.typecode)
+    return vista.astype(dtype or vista.dtype)
+
+
+# clave -> tipo de columna; las demás claves son "object"
+SCHEMA = {"monto": "float", "fecha": "date", "tipo_doc": "category", "proveedor": "category", "id": "int"}
+
+
+class _Column:
+    """Una columna: ``float`` / ``date`` / ``int`` en arrays, ``category`` como códigos,
+    ``object`` como lista. ``get`` devuelve ``_MISSING`` si la fila no tiene la clave."""
+
+    __slots__ = ("kind", "data", "categories", "index")
+
+    def __init__(self, kind: str, n: int = 0):
+        self.kind = kind
+        self.categories, self.index = [], {}
+        if kind == "float":
+            self.data = array("d", [float("nan")]) * n
+        elif kind == "date":
+            self.data = array("i", [0]) * n
+        elif kind == "int":
+            self.data = array("q", [_NO_ID]) * n
+        elif kind == "category":
+            self.data = array("i", [-1]) * n
+        else:
+            self.data = [_MISSING] * n
+
+    # ---------- codificación ----------
+    def _encode(self, v):
+        """Valor interno de ``v``; ``TypeError``/``ValueError`` si la columna no lo admite."""
+        kind = self.kind
+        if v is _MISSING:
+            return {"float": float("nan"), "date": 0, "int": _NO_ID, "category": -1}[kind]
+        if kind == "float":
+            if type(v) is bool or not isinstance(v, Real):
+                raise TypeError
+            try:
+                v = float(v)  # enteros (también de numpy) como float
+            except OverflowError:
+                raise ValueError from None
+            if v != v:
+                raise ValueError  # NaN se reserva para "sin valor"
+            return v
+        if kind == "date":
+            if type(v) is not str or len(v) != 10:
+                raise TypeError
+            d = date.fromisoformat(v)
+            if d.isoformat() != v:  # otras formas ISO ("2025-W01-1") se guardan tal cual
+                raise ValueError
+            return d.toordinal()
+        if kind == "int":
+            if type(v) is not int or v == _NO_ID:
+                raise TypeError
+            return v
+        # category
+        if type(v) is not str:
+            raise TypeError
+        code = self.index.get(v)
+        if code is None:
+            code = self.index[v] = len(self.categories)
+            self.categories.append(v)
+        return code
+
+    def _decode(self, x):
+        kind = self.kind
+        if kind == "float":
+            return _MISSING if x != x else x
+        if kind == "date":
+            return _MISSING if x == 0 else date.fromordinal(x).isoformat()
+        if kind == "int":
+            return _MISSING if x == _NO_ID else x
+        if kind == "category":
+            return _MISSING if x < 0 else self.categories[x]
+        return x
+
+    def _to_object(self) -> None:
+        self.data = [self._decode(x) for x in self.data]
+        self.kind = "object"
+        self.categories, self.index = [], {}
+
+    # ---------- acceso ----------
+    def get(self, i: int):
+        return self._decode(self.data[i])
+
+    def set(self, i: int, v) -> None:
+        if self.kind != "object":
+            try:
+                v = self._encode(v)
+            except (TypeError, ValueError):
+                self._to_object()
+        self.data[i] = v
+
+    def insert(self, i: int, v) -> None:
+        if self.kind != "object":
+            try:
+                v = self._encode(v)
+            except (TypeError, ValueError):
+                self._to_object()
+        self.data.insert(i, v)
+
+    def append(self, v) -> None:
+        if self.kind != "object":
+            try:
+                v = self._encode(v)
+            except (TypeError, ValueError):
+                self._to_object()
+        self.data.append(v)
+
+    def copy(self) -> "_Column":
+        col = _Column.__new__(_Column)
+        col.kind = self.kind
+        col.data = self.data[:]  # array: copia de memoria, sin objetos de Python
+        col.categories, col.index = list(self.categories), dict(self.index)
+        return col
+
+
+class GastoRow(Mapping):
+    """Vista de una fila de una ``GastosTable``; se lee (y se escribe) como un ``dict``."""
+
+    __slots__ = ("_table", "_i")
+
+    def __init__(self, table: "GastosTable", i: int):
+        self._table = table
+        self._i = i
+
+    def __getitem__(self, key):
+        col = self._table._cols.get(key)
+        v = _MISSING if col is None else col.get(self._i)
+        if v is _MISSING:
+            raise KeyError(key)
+        return v
+
+    def __iter__(self):
+        i = self._i
+        return iter([k for k, col in self._table._cols.items() if col.get(i) is not _MISSING])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __setitem__(self, key, value) -> None:
+        self._table._column(key).set(self._i, value)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"GastoRow({dict(self)!r})"
+
+
+class GastosTable(MutableSequence):
+    """Lista de gastos guardada por columnas (ver el docstring del módulo)."""
+
+    def __init__(self, rows=()):
+        self._cols = {}
+        self._n = 0
+        for row in rows:
+            self.append(row)
+
+    @classmethod
+    def from_rows(cls, rows) -> "GastosTable":
+        return rows if isinstance(rows, cls) else cls(rows)
+
+    def _column(self, key) -> _Column:
+        col = self._cols.get(key)
+        if col is None:
+            col = self._cols[key] = _Column(SCHEMA.get(key, "object"), self._n)
+        return col
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("índice de gasto fuera de rango")
+        return i
+
+    # ---------- protocolo de lista ----------
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [GastoRow(self, j) for j in range(*i.indices(self._n))]
+        return GastoRow(self, self._index(i))
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield GastoRow(self, i)
+
+    def __setitem__(self, i, row) -> None:
+        if isinstance(i, slice):
+            raise TypeError("GastosTable no admite asignación por rebanadas")
+        i = self._index(i)
+        row = dict(row)
+        for key in row:
+            self._column(key)
+        for key, col in self._cols.items():
+            col.set(i, row.get(key, _MISSING))
+
+    def __delitem__(self, i) -> None:
+        if isinstance(i, slice):
+            for j in sorted(range(*i.indices(self._n)), reverse=True):
+                del self[j]
+            return
+        i = self._index(i)
+        for col in self._cols.values():
+            del col.data[i]
+        self._n -= 1
+
+    def insert(self, i: int, row) -> None:
+        i = max(0, min(i + self._n if i < 0 else i, self._n))
+        row = dict(row)
+        for key in row:
+            self._column(key)
+        for key, col in self._cols.items():
+            col.insert(i, row.get(key, _MISSING))
+        self._n += 1
+
+    def append(self, row) -> None:
+        for key in row:
+            self._column(key)
+        get = row.get
+        for key, col in self._cols.items():
+            col.append(get(key, _MISSING))
+        self._n += 1
+
+    def pop(self, i: int = -1) -> dict:
+        """Quita la fila ``i`` y la devuelve como ``dict`` (no como vista)."""
+        i = self._index(i)
+        row = dict(GastoRow(self, i))
+        del self[i]
+        return row
+
+    def clear(self) -> None:
+        self._cols = {}
+        self._n = 0
+
+    def copy(self) -> "GastosTable":
+        """Copia independiente (p. ej. para exportar en otro hilo mientras se sigue editando)."""
+        out = GastosTable()
+        out._cols = {k: col.copy() for k, col in self._cols.items()}
+        out._n = self._n
+        return out
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (list, tuple, GastosTable)) or len(other) != self._n:
+            return False
+        return all(dict(a) == dict(b) for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"GastosTable({self._n} gastos, columnas={list(self._cols)})"
+
+    # ---------- columnas ----------
+    def keys(self) -> list:
+        return list(self._cols)
+
+    def column(self, key) -> list:
+        """Valores de ``key`` fila a fila (None donde la fila no tiene la clave)."""
+        col = self._cols.get(key)
+        if col is None:
+            return [None] * self._n
+        out = [col.get(i) for i in range(self._n)]
+        return [None if v is _MISSING else v for v in out]
+
+    def values(self, key):
+        """Columna ``key`` como arreglo de numpy: float64 (NaN sin valor), datetime64[D]
+        (NaT), int64 o, para textos (y enteros con faltantes), ``object`` con None."""
+        import numpy as np
+        col = self._cols.get(key)
+        if col is None:
+            return np.full(self._n, None, dtype=object)
+        if col.kind == "float":
+            return _arreglo(col.data, np.float64)
+        if col.kind == "date":
+            ords = _arreglo(col.data, np.int64)
+            out = (ords - _EPOCH).astype("datetime64[D]")
+            out[ords == 0] = np.datetime64("NaT")
+            return out
+        if col.kind == "int":
+            vals = _arreglo(col.data, np.int64)
+            if (vals == _NO_ID).any():
+                return np.array(self.column(key), dtype=object)
+            return vals
+        if col.kind == "category":
+            cats = np.array(col.categories + [None], dtype=object)
+            codes = _arreglo(col.data, np.int64)
+            return cats[np.where(codes < 0, len(col.categories), codes)]
+        return np.array([None if v is _MISSING else v for v in col.data], dtype=object)
+
+    def _codes(self, key):
+        """Códigos de una columna de categorías y sus categorías (o None si no lo es)."""
+        import numpy as np
+        col = self._cols.get(key)
+        if col is None or col.kind != "category":
+            return None
+        return _arreglo(col.data, np.int64), col.categories
+
+    # ---------- operaciones vectorizadas ----------
+    def total(self, key: str = "monto") -> float:
+        import numpy as np
+        col = self._cols.get(key)
+        if col is None:
+            return 0.0
+        if col.kind == "float":
+            # vista sin copia; se suelta al salir (array no puede crecer mientras se exporta)
+            return float(np.nansum(np.frombuffer(col.data, dtype=np.float64))) if self._n else 0.0
+        return float(sum(float(v or 0) for v in self.column(key)))
+
+    def sum_by(self, by: str = "tipo_doc", key: str = "monto") -> dict:
+        """``{valor de by: suma de key}`` (None agrupa las filas sin ``by``)."""
+        import numpy as np
+        montos = np.nan_to_num(self.values(key).astype(np.float64)) if self._n else np.zeros(0)
+        coded = self._codes(by)
+        if coded is not None:
+            codes, cats = coded
+            sumas = np.bincount(codes + 1, weights=montos, minlength=len(cats) + 1)
+            filas = np.bincount(codes + 1, minlength=len(cats) + 1)
+            out = {cats[c]: float(sumas[c + 1]) for c in np.flatnonzero(filas[1:])}
+            if filas[0]:
+                out[None] = float(sumas[0])
+            return out
+        out = {}
+        for k, m in zip(self.column(by), montos.tolist()):
+            out[k] = out.get(k, 0.0) + m
+        return out
+
+    def argsort(self, key: str, reverse: bool = False):
+        """Índices que ordenan la tabla por ``key`` (estable; sin valor primero)."""
+        import numpy as np
+        col = self._cols.get(key)
+        if col is None:
+            order = np.arange(self._n)
+        elif col.kind in ("float", "date", "int"):
+            vals = _arreglo(col.data)
+            if col.kind == "float":
+                vals = np.where(np.isnan(vals), -np.inf, vals)
+            order = np.argsort(vals, kind="stable")
+        elif col.kind == "category":
+            rank = np.empty(len(col.categories) + 1, dtype=np.int64)
+            rank[0] = -1
+            rank[1:] = np.argsort(np.argsort(np.array(col.categories, dtype=object), kind="stable"), kind="stable")
+            order = np.argsort(rank[_arreglo(col.data, np.int64) + 1], kind="stable")
+        else:
+            vals = self.column(key)
+            order = np.array(sorted(range(self._n), key=lambda i: (vals[i] is not None, vals[i] or "")), dtype=np.int64)
+        if reverse:
+            order = order[::-1]
+        return order
+
+    def sorted_by(self, key: str, reverse: bool = False) -> list:
+        return [GastoRow(self, int(i)) for i in self.argsort(key, reverse)]
+
+    def filter(self, desde=None, hasta=None, **iguales):
+        """Índices de las filas con ``fecha`` entre ``desde`` y ``hasta`` ("YYYY-MM-DD" o
+        ``date``) y ``clave == valor`` para cada par de ``iguales``; como con
+        ``g.get(clave) == valor``, ``valor=None`` elige las filas sin la clave."""
+        import numpy as np
+        mask = np.ones(self._n, dtype=bool)
+        if desde is not None or hasta is not None:
+            fechas = self.values("fecha")
+            if fechas.dtype != object:
+                if desde is not None:
+                    mask &= fechas >= np.datetime64(str(desde)[:10])
+                if hasta is not None:
+                    mask &= fechas <= np.datetime64(str(hasta)[:10])
+            else:
+                texto = np.array([str(f or "")[:10] for f in fechas], dtype=object)
+                if desde is not None:
+                    mask &= texto >= str(desde)[:10]
+                if hasta is not None:
+                    mask &= texto <= str(hasta)[:10]
+        for key, valor in iguales.items():
+            coded = self._codes(key)
+            if coded is not None:
+                codes, cats = coded
+                code = -1 if valor is None else cats.index(valor) if valor in cats else -2
+                mask &= codes == code
+            elif valor is None:
+                vals = self.values(key)
+                if vals.dtype.kind == "f":
+                    mask &= np.isnan(vals)
+                elif vals.dtype.kind == "M":
+                    mask &= np.isnat(vals)
+                else:
+                    mask &= np.array([v is None for v in vals], dtype=bool)
+            else:
+                mask &= self.values(key) == valor
+        return np.flatnonzero(mask)
+
+    def take(self, indices) -> "GastosTable":
+        """Nueva tabla con las filas ``indices`` (en ese orden)."""
+        out = GastosTable()
+        idx = [int(i) for i in indices]
+        for key, col in self._cols.items():
+            nueva = _Column(col.kind)
+            if col.kind == "object":
+                nueva.data = [col.data[i] for i in idx]
+            else:
+                nueva.data = array(col.data.typecode, [col.data[i] for i in idx])
+                nueva.categories, nueva.index = list(col.categories), dict(col.index)
+            out._cols[key] = nueva
+        out._n = len(idx)
+        return out
+
+    # ---------- conversión ----------
+    def to_list(self) -> list:
+        """Lista de ``dict`` (para JSON)."""
+        return [dict(r) for r in self]
+
+    def to_frame(self, columns=None):
+        """DataFrame con las columnas pedidas (todas si es None), armado columna a columna."""
+        import pandas as pd
+        keys = list(self._cols) if columns is None else list(columns)
+        return pd.DataFrame({k: self.values(k) for k in keys}, index=pd.RangeIndex(self._n), columns=keys)
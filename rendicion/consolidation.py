@@ -0,0 +1,240 @@
+"""Consolidación de muchas rendiciones: agregados por mes, fondo, proveedor y tipo de documento.
+
+Las rendiciones (archivos JSON, paquetes .zip o rendiciones guardadas en la
+base) se vuelcan a dos tablas de pandas: ``rendiciones`` (una fila por
+rendición, con los datos del Cuadro Resumen y su ``saldo_final``) y
+``gastos`` (una fila por gasto, con la posición ``rid`` de su rendición).
+Todos los agregados son ``groupby`` sobre esas tablas, sin recorrer gastos en
+Python, de modo que un año de rendiciones de todos los establecimientos se
+consolida en segundos.
+
+El saldo final se calcula como en el Cuadro Resumen del PDF y del Excel:
+``saldo_mes_anterior + monto_recibido_mes_anterior - gastos - transporte``.
+``continuidad`` encadena las rendiciones de cada fondo por mes y marca las
+que no parten del saldo final de la anterior, los meses repetidos y los
+meses faltantes. ``duplicados`` busca el mismo documento rendido dos veces, en
+la misma rendición o en distintas (ver ``rendicion.duplicates``).
+
+Un fondo se identifica por institución + tipo de fondo (o, si faltan, por el
+responsable). El mes sale de ``mes_que_rinde`` ("2025-03", "03/2025" o el
+nombre de un mes seguido del año en cualquier parte del texto, como en
+"Rendición marzo 2025") o, si no se entiende, del primer gasto de la rendición.
+"""
+import io
+import json
+import os
+import zipfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MESES = {"enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+         "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12}
+TEXT_META = ("institucion", "tipo_fondo", "responsable", "n_rendicion", "mes_que_rinde")
+MONTO_META = ("saldo_mes_anterior", "monto_recibido_mes_anterior", "monto_gasto_transporte")
+GASTO_FIELDS = ("fecha", "monto", "tipo_doc", "n_doc", "detalle", "proveedor", "ref_doc")
+TOLERANCIA = 1.0  # pesos
+# nombre de un mes de MESES (en cualquier parte del texto) seguido del año
+_MES_NOMBRE = (r"(?<![a-záéíóúñ])(" + "|".join(sorted(MESES, key=len, reverse=True))
+               + r")(?![a-záéíóúñ])\D*?(\d{4})(?!\d)")
+
+
+def _mes_numero(texto: pd.Series) -> pd.Series:
+    """Mes como entero ``año * 12 + (mes - 1)`` (NaN si no se reconoce)."""
+    t = texto.fillna("").astype(str).str.strip().str.lower()
+    iso = t.str.extract(r"^(\d{4})[-/.](\d{1,2})\b")
+    mmyy = t.str.extract(r"^(\d{1,2})[-/.](\d{4})\b")
+    nombre = t.str.extract(_MES_NOMBRE)
+    anio = pd.to_numeric(iso[0].fillna(mmyy[1]).fillna(nombre[1]), errors="coerce")
+    mes = pd.to_numeric(iso[1].fillna(mmyy[0]), errors="coerce").fillna(nombre[0].map(MESES))
+    mes = mes.where(mes.between(1, 12))
+    return anio * 12 + mes - 1
+
+
+def _mes_texto(n: pd.Series) -> pd.Series:
+    ok = n.notna()
+    n = n.fillna(0).astype("int64")
+    return ((n // 12).astype(str) + "-" + (n % 12 + 1).astype(str).str.zfill(2)).where(ok, "")
+
+
+def _texto(s: pd.Series) -> pd.Series:
+    return s.fillna("").astype(str).str.strip()
+
+
+class Consolidado:
+    """Tablas ``rendiciones`` y ``gastos`` de un conjunto de rendiciones y sus agregados."""
+
+    def __init__(self, rendiciones: pd.DataFrame, gastos: pd.DataFrame):
+        self.rendiciones = rendiciones
+        self.gastos = gastos
+
+    # ---------- construcción ----------
+    @classmethod
+    def from_frames(cls, cabeceras: pd.DataFrame, gastos: pd.DataFrame) -> "Consolidado":
+        """``cabeceras``: una fila por rendición (``rendicion``, ``fondo_inicial`` y los campos
+        de la meta); ``gastos``: ``rid`` (posición de la rendición) + ``GASTO_FIELDS``."""
+        r = cabeceras.reset_index(drop=True)
+        for col in TEXT_META:
+            r[col] = _texto(r[col]) if col in r else ""
+        for col in ("fondo_inicial",) + MONTO_META:
+            r[col] = pd.to_numeric(r[col], errors="coerce").fillna(0.0) if col in r else 0.0
+
+        g = gastos.reset_index(drop=True)
+        g["monto"] = pd.to_numeric(g["monto"], errors="coerce").fillna(0.0)
+        g["fecha"] = pd.to_datetime(g["fecha"], errors="coerce")
+        for col in ("tipo_doc", "proveedor"):
+            g[col] = _texto(g[col]).astype("category")
+        rid = g["rid"].to_numpy()
+
+        por_rid = g.groupby("rid")["monto"].agg(["sum", "size"]).reindex(r.index)
+        r["total_gastos"] = por_rid["sum"].fillna(0.0).to_numpy()
+        r["cantidad"] = por_rid["size"].fillna(0).astype("int64").to_numpy()
+        r["saldo_final"] = (r["saldo_mes_anterior"] + r["monto_recibido_mes_anterior"]
+                            - r["total_gastos"] - r["monto_gasto_transporte"])
+
+        fondo = r["institucion"].str.cat(r["tipo_fondo"], sep=" / ").str.strip(" /")
+        r["fondo"] = fondo.where(fondo != "", r["responsable"]).replace("", "(sin fondo)")
+        primer_gasto = g.groupby("rid")["fecha"].min().reindex(r.index)
+        mes_gasto = primer_gasto.dt.year * 12 + primer_gasto.dt.month - 1
+        r["mes_n"] = _mes_numero(r["mes_que_rinde"]).fillna(mes_gasto)
+        r["mes"] = _mes_texto(r["mes_n"])
+
+        g["fondo"] = r["fondo"].to_numpy()[rid]
+        g["mes"] = r["mes"].to_numpy()[rid]
+        return cls(r, g)
+
+    @classmethod
+    def from_data(cls, items) -> "Consolidado":
+        """``items``: ``[(nombre, datos), ...]`` con datos como los del JSON exportado."""
+        cabeceras, registros, largos = [], [], []
+        for nombre, data in items:
+            meta = data.get("meta") or {}
+            cabeceras.append({"rendicion": nombre, "fondo_inicial": data.get("fondo_inicial", 0),
+                              **{k: meta.get(k) for k in TEXT_META + MONTO_META}})
+            gastos = data.get("gastos") or []
+            registros.extend(tuple(gs.get(k) for k in GASTO_FIELDS) for gs in gastos)
+            largos.append(len(gastos))
+        gastos = pd.DataFrame.from_records(registros, columns=list(GASTO_FIELDS))
+        gastos.insert(0, "rid", np.repeat(np.arange(len(largos)), largos))
+        return cls.from_frames(pd.DataFrame(cabeceras, columns=["rendicion", "fondo_inicial", *TEXT_META, *MONTO_META]),
+                               gastos)
+
+    @classmethod
+    def from_files(cls, paths) -> "Consolidado":
+        """Archivos JSON de datos o paquetes .zip exportados por la app.
+
+        Un archivo ilegible levanta ``OSError``; uno con contenido inválido, ``ValueError``
+        con la ruta al comienzo del mensaje.
+        """
+        from .bundle import read_data
+        items = []
+        for path in paths:
+            path = os.fspath(path)
+            try:
+                if zipfile.is_zipfile(path):
+                    with open(path, "rb") as f:
+                        data = read_data(f)
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+            except ValueError as e:  # JSON inválido (JSONDecodeError), UTF-8 o paquete dañado
+                raise ValueError(f"{path}: {e}") from e
+            items.append((os.path.basename(path), data))
+        return cls.from_data(items)
+
+    @classmethod
+    def from_repository(cls, repo, rids=None) -> "Consolidado":
+        """Rendiciones guardadas en la base (todas, o las de ``rids``), con dos consultas."""
+        metas = repo.metas(rids)
+        cabeceras = pd.DataFrame(
+            [{"rendicion": clave, "fondo_inicial": fondo, **{k: meta.get(k) for k in TEXT_META + MONTO_META}}
+             for _, clave, fondo, meta in metas],
+            columns=["rendicion", "fondo_inicial", *TEXT_META, *MONTO_META])
+        gastos = pd.DataFrame.from_records(repo.gastos_columnas(GASTO_FIELDS, rids),
+                                           columns=["rendicion_id", *GASTO_FIELDS])
+        posicion = pd.Series(np.arange(len(metas)), index=[m[0] for m in metas])
+        gastos.insert(0, "rid", posicion.reindex(gastos.pop("rendicion_id")).to_numpy())
+        return cls.from_frames(cabeceras, gastos)
+
+    # ---------- agregados ----------
+    def por_mes(self) -> pd.DataFrame:
+        r = self.rendiciones
+        return (r.groupby("mes", sort=True)
+                 .agg(rendiciones=("rendicion", "size"), fondos=("fondo", "nunique"),
+                      recibido=("monto_recibido_mes_anterior", "sum"), gastos=("total_gastos", "sum"),
+                      transporte=("monto_gasto_transporte", "sum"), cantidad=("cantidad", "sum"),
+                      saldo_final=("saldo_final", "sum"))
+                 .reset_index())
+
+    def por_fondo(self) -> pd.DataFrame:
+        r = self.rendiciones.sort_values(["fondo", "mes_n"], kind="stable")
+        return (r.groupby("fondo", sort=True)
+                 .agg(rendiciones=("rendicion", "size"), desde=("mes", "first"), hasta=("mes", "last"),
+                      recibido=("monto_recibido_mes_anterior", "sum"), gastos=("total_gastos", "sum"),
+                      transporte=("monto_gasto_transporte", "sum"), cantidad=("cantidad", "sum"),
+                      saldo_final=("saldo_final", "last"))
+                 .reset_index())
+
+    def _por_gasto(self, col: str) -> pd.DataFrame:
+        return (self.gastos.groupby(col, observed=True)
+                    .agg(monto=("monto", "sum"), cantidad=("monto", "size"),
+                         rendiciones=("rid", "nunique"), fondos=("fondo", "nunique"))
+                    .sort_values("monto", ascending=False)
+                    .reset_index())
+
+    def por_proveedor(self) -> pd.DataFrame:
+        return self._por_gasto("proveedor")
+
+    def por_tipo_doc(self) -> pd.DataFrame:
+        return self._por_gasto("tipo_doc")
+
+    def continuidad(self, tolerancia: float = TOLERANCIA) -> pd.DataFrame:
+        """Cadena ``saldo_final`` -> ``saldo_mes_anterior`` de cada fondo, mes a mes.
+
+        ``estado``: "inicio" (primera del fondo), "sin mes", "mes repetido",
+        "mes faltante", "saldo no coincide" u "ok".
+        """
+        r = self.rendiciones.sort_values(["fondo", "mes_n", "n_rendicion"], kind="stable")
+        g = r.groupby("fondo", sort=False)
+        saldo_previo = g["saldo_final"].shift()
+        salto = r["mes_n"] - g["mes_n"].shift()
+        diferencia = r["saldo_mes_anterior"] - saldo_previo
+        estado = np.select(
+            [saldo_previo.isna(), r["mes_n"].isna() | salto.isna(), salto == 0, salto > 1,
+             diferencia.abs() > tolerancia],
+            ["inicio", "sin mes", "mes repetido", "mes faltante", "saldo no coincide"], "ok")
+        return (r[["fondo", "mes", "rendicion", "n_rendicion", "saldo_mes_anterior", "saldo_final"]]
+                .assign(saldo_final_anterior=saldo_previo, diferencia=diferencia, estado=estado)
+                .reset_index(drop=True))
+
+    def problemas(self, tolerancia: float = TOLERANCIA) -> pd.DataFrame:
+        c = self.continuidad(tolerancia)
+        return c[~c["estado"].isin(("inicio", "ok"))].reset_index(drop=True)
+
+    def duplicados(self) -> pd.DataFrame:
+        """Gastos duplicados agrupados (``grupo``): exactos en todo el conjunto, similares
+        dentro de cada fondo."""
+        from .duplicates import buscar_duplicados
+        g = self.gastos.assign(rendicion=self.rendiciones["rendicion"].to_numpy()[self.gastos["rid"].to_numpy()])
+        d = buscar_duplicados(g, contexto=("fondo", "mes", "rendicion"), ambito="fondo")
+        return d.drop(columns=["fila"]).assign(fecha=d["fecha"].dt.date) if not d.empty else d.drop(columns=["fila"])
+
+    # ---------- informe ----------
+    def to_excel(self, fileobj=None) -> Optional[bytes]:
+        """Libro con una hoja por agregado y la de continuidad; devuelve los bytes si no se
+        pasa ``fileobj``."""
+        out = fileobj if fileobj is not None else io.BytesIO()
+        hojas = {
+            "Por mes": self.por_mes(),
+            "Por fondo": self.por_fondo(),
+            "Por proveedor": self.por_proveedor(),
+            "Por tipo documento": self.por_tipo_doc(),
+            "Continuidad": self.continuidad(),
+            "Duplicados": self.duplicados(),
+            "Rendiciones": self.rendiciones.drop(columns=["mes_n"]),
+        }
+        with pd.ExcelWriter(out, engine="openpyxl") as xw:
+            for nombre, df in hojas.items():
+                df.to_excel(xw, sheet_name=nombre, index=False)
+        return out.getvalue() if fileobj is None else None
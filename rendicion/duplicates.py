@@ -0,0 +1,248 @@
+"""Detección de documentos duplicados: al registrar un gasto y en un año consolidado.
+
+Cada gasto se reduce a una clave por regla, con los campos normalizados
+(proveedor sin tildes, puntuación ni "Ltda."/"SpA"; número de documento sin
+ceros a la izquierda; monto redondeado al centavo) y el hash del contenido del
+adjunto (``ref_doc``: el sha256 del archivo, en el ``AttachmentStore`` de las apps
+Streamlit o calculado con ``hash_archivo`` al adjuntarlo en la app Kivy):
+
+- exactos: mismo tipo + número de documento + proveedor, o mismo adjunto;
+- similares: mismo tipo + número + monto (proveedor escrito distinto), o
+  misma fecha + monto con el mismo proveedor o el mismo detalle.
+
+``DuplicateIndex`` guarda cuántos gastos hay por clave, de modo que revisar
+un gasto nuevo son unas pocas búsquedas en un diccionario. ``buscar_duplicados``
+aplica las mismas reglas a una tabla de pandas (p. ej. los gastos de un
+``Consolidado``), normalizando solo los valores distintos de cada columna.
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional
+
+# (regla, tipo, campos): en orden, de la más fuerte a la más débil
+REGLAS = (
+    ("documento", "exacto", ("tipo_doc", "n_doc", "proveedor")),
+    ("adjunto", "exacto", ("adjunto",)),
+    ("número y monto", "similar", ("tipo_doc", "n_doc", "monto")),
+    ("proveedor, fecha y monto", "similar", ("proveedor", "fecha", "monto")),
+    ("detalle, fecha y monto", "similar", ("detalle", "fecha", "monto")),
+)
+SUFIJOS = {"ltda", "limitada", "spa", "sa", "eirl", "cia", "y"}
+CHUNK_SIZE = 1 << 20
+
+
+# ---------- normalización ----------
+def _palabras(texto) -> list:
+    t = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode("ascii")
+    t = t.lower().replace(".", "")  # "S.A." -> "sa"
+    return re.sub(r"[^a-z0-9]+", " ", t).split()
+
+
+def normalizar_texto(texto) -> str:
+    return " ".join(_palabras(texto))
+
+
+def normalizar_proveedor(texto) -> str:
+    palabras = _palabras(texto)
+    while len(palabras) > 1 and palabras[-1] in SUFIJOS:
+        palabras.pop()
+    return " ".join(palabras)
+
+
+def normalizar_n_doc(texto) -> str:
+    """Solo los dígitos, sin ceros a la izquierda ("N° 000123" == "123"); si no hay
+    dígitos, el texto normalizado."""
+    t = str(texto or "")
+    digitos = re.sub(r"\D", "", t)
+    if digitos:
+        return digitos.lstrip("0") or "0"
+    return "".join(_palabras(t))
+
+
+def normalizar_fecha(fecha) -> str:
+    if fecha is None:
+        return ""
+    if not isinstance(fecha, str):
+        fecha = fecha.isoformat()
+    return fecha[:10]
+
+
+def normalizar_monto(monto) -> str:
+    try:
+        return f"{float(monto or 0):.2f}"
+    except (TypeError, ValueError):
+        return ""
+
+
+@lru_cache(maxsize=1024)
+def _hash_archivo(path: str, size: int, mtime_ns: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_archivo(path) -> Optional[str]:
+    """sha256 del contenido de un archivo local (None si no existe); se recuerda por ruta,
+    tamaño y fecha de modificación."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+        return _hash_archivo(os.fspath(path), st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+
+def ref_doc(g) -> Optional[str]:
+    """Hash del adjunto: ``ref_doc`` es el sha256 del contenido, que las apps guardan al adjuntar."""
+    return g.get("ref_doc")
+
+
+def campos(g, hash_adjunto: Callable = ref_doc) -> dict:
+    """Campos normalizados de un gasto (de cualquiera de las apps)."""
+    return {
+        "tipo_doc": normalizar_texto(g.get("tipo_doc")),
+        "n_doc": normalizar_n_doc(g.get("n_doc")),
+        "proveedor": normalizar_proveedor(g.get("proveedor")),
+        "detalle": normalizar_texto(g.get("detalle") or g.get("descripcion")),
+        "fecha": normalizar_fecha(g.get("fecha")),
+        "monto": normalizar_monto(g.get("monto")),
+        "adjunto": hash_adjunto(g) or "",
+    }
+
+
+def claves(g, hash_adjunto: Callable = ref_doc) -> list:
+    """``[(regla, clave)]`` de las reglas que aplican (todas sus partes con valor)."""
+    c = campos(g, hash_adjunto)
+    out = []
+    for regla, _, nombres in REGLAS:
+        clave = tuple(c[n] for n in nombres)
+        if all(clave):
+            out.append((regla, clave))
+    return out
+
+
+# ---------- índice en memoria ----------
+class Coincidencia(NamedTuple):
+    regla: str
+    tipo: str  # "exacto" o "similar"
+    cantidad: int  # gastos ya registrados con la misma clave
+
+    def mensaje(self) -> str:
+        cuantos = "otro gasto" if self.cantidad == 1 else f"otros {self.cantidad} gastos"
+        if self.tipo == "exacto":
+            return f"Documento duplicado: {cuantos} con el mismo {self.regla}."
+        return f"Posible duplicado: {cuantos} con el mismo {self.regla}."
+
+
+_TIPO = {regla: tipo for regla, tipo, _ in REGLAS}
+
+
+class DuplicateIndex:
+    """Cantidad de gastos por clave de cada regla; ``check`` / ``add`` / ``remove`` en O(1).
+
+    ``hash_adjunto(g)`` da el hash del contenido del adjunto (por defecto
+    ``ref_doc``, guardado con el gasto: armar el índice no lee archivos).
+    """
+
+    def __init__(self, gastos=(), hash_adjunto: Callable = ref_doc):
+        self.hash_adjunto = hash_adjunto
+        self.cuenta = {}
+        self.cantidad = 0
+        for g in gastos:
+            self._apply(g, 1)
+
+    def check(self, g) -> list:
+        """Coincidencias de ``g`` con lo ya registrado; si hay exactas, solo esas."""
+        encontradas = []
+        for regla, clave in claves(g, self.hash_adjunto):
+            n = self.cuenta.get((regla, clave), 0)
+            if n:
+                encontradas.append(Coincidencia(regla, _TIPO[regla], n))
+        exactas = [c for c in encontradas if c.tipo == "exacto"]
+        return exactas or encontradas
+
+    def add(self, g) -> list:
+        """Registra ``g`` y devuelve sus coincidencias previas."""
+        encontradas = self.check(g)
+        self._apply(g, 1)
+        return encontradas
+
+    def remove(self, g) -> None:
+        self._apply(g, -1)
+
+    def replace(self, old, new) -> list:
+        self._apply(old, -1)
+        return self.add(new)
+
+    def _apply(self, g, sign: int) -> None:
+        self.cantidad += sign
+        for key in claves(g, self.hash_adjunto):
+            n = self.cuenta.get(key, 0) + sign
+            if n > 0:
+                self.cuenta[key] = n
+            else:
+                self.cuenta.pop(key, None)
+
+
+# ---------- búsqueda por lotes ----------
+def _normalizada(s, fn):
+    """``fn`` aplicada a cada valor distinto de la serie (no a cada fila)."""
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    valores = np.array([fn(u) for u in uniques] + [""], dtype=object)
+    return pd.Series(valores[codes], index=s.index)  # el código -1 (sin valor) toma el ""
+
+
+def buscar_duplicados(gastos, contexto=(), ambito: Optional[str] = None):
+    """Grupos de gastos duplicados en una tabla con las columnas de ``campos`` (las que
+    falten se toman vacías; ``adjunto`` puede venir como ``ref_doc``).
+
+    Las reglas exactas comparan toda la tabla; las similares, solo dentro de la
+    columna ``ambito`` si se indica (p. ej. el fondo: la misma fecha y monto en dos
+    establecimientos no es sospechosa). Cada gasto aparece una sola vez, en la regla
+    más fuerte que lo marca. Devuelve
+    ``grupo``, ``regla``, ``tipo``, las columnas de ``contexto`` y los datos del gasto,
+    con ``fila`` = índice en ``gastos``.
+    """
+    import pandas as pd
+    normalizadores = {"tipo_doc": normalizar_texto, "n_doc": normalizar_n_doc, "proveedor": normalizar_proveedor,
+                      "detalle": normalizar_texto, "fecha": normalizar_fecha, "monto": normalizar_monto}
+    c = pd.DataFrame(index=gastos.index)
+    for nombre, fn in normalizadores.items():
+        c[nombre] = _normalizada(gastos[nombre], fn) if nombre in gastos else ""
+    adjunto = gastos["adjunto"] if "adjunto" in gastos else gastos.get("ref_doc")
+    c["adjunto"] = adjunto.fillna("").astype(str) if adjunto is not None else ""
+    if ambito is not None:
+        c["_ambito"] = gastos[ambito].to_numpy()
+
+    marcadas = pd.Series(False, index=gastos.index)
+    partes, siguiente = [], 0
+    for regla, tipo, nombres in REGLAS:
+        ok = ~marcadas
+        for n in nombres:
+            ok &= c[n] != ""
+        cols = list(nombres) + (["_ambito"] if ambito is not None and tipo == "similar" else [])
+        sub = c.loc[ok, cols]
+        sub = sub[sub.duplicated(keep=False)]
+        if sub.empty:
+            continue
+        grupo = sub.groupby(cols, sort=False).ngroup() + siguiente
+        siguiente = int(grupo.max()) + 1
+        marcadas[sub.index] = True
+        partes.append(pd.DataFrame({"grupo": grupo, "regla": regla, "tipo": tipo}, index=sub.index))
+
+    datos = [col for col in (*contexto, "fecha", "tipo_doc", "n_doc", "proveedor", "detalle", "monto")
+             if col in gastos]
+    if not partes:
+        return pd.DataFrame(columns=["grupo", "regla", "tipo", *datos, "fila"])
+    out = pd.concat(partes)
+    out = out.join(gastos[datos]).rename_axis("fila").reset_index()
+    return (out.sort_values(["grupo", "fila"], kind="stable")
+               [["grupo", "regla", "tipo", *datos, "fila"]].reset_index(drop=True))
@@ -0,0 +1,457 @@
+"""Exportación de la rendición a Excel (hojas "Gastos" y "Resumen").
+
+``build_workbook`` arma el libro completo en memoria. ``build_workbook_streaming``
+produce las mismas hojas con el modo write-only de openpyxl: las filas de
+gastos se escriben al vuelo, de modo que la memoria no crece con la cantidad
+de gastos. ``export_xlsx`` elige el modo según ``STREAMING_MIN_ROWS``;
+``export_rendicion`` lo arma directo desde la rendición (filas de ``model.filas``).
+``export_tabla`` (app.py) y ``export_listado`` (app Kivy) son los libros simples
+de las otras apps, con las mismas filas.
+
+Ambos modos usan el mismo registro de estilos con nombre (``STYLES``), inscrito
+una vez por libro y aplicado por nombre, y la misma descripción de los bloques
+combinados de cada hoja (``_gastos_bloques`` / ``_resumen_bloques``).
+
+``rows`` son tuplas ``(N, fecha, tipo_doc, n_doc, detalle, proveedor, monto)``
+con tipos nativos de Python.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, Optional
+
+STREAMING_MIN_ROWS = 5000
+
+HEADERS = ["N°","Fecha del gasto","Tipo documento","N° Documento","Detalle del gasto","Nombre Proveedor","Monto"]
+WIDTHS = [6,14,18,20,50,28,14]
+RESUMEN_WIDTHS = [22,28,10,22,10,22,10,12]
+MONEY_FMT = '"$"#,##0'
+DATE_FMT = "yyyy-mm-dd"
+GASTOS_START_ROW = 12  # fila de encabezados de la tabla de gastos
+
+_LOCK = threading.Lock()
+_LOGOS = OrderedDict()  # (sha256, ancho) -> bytes del logo a incrustar
+_LOGOS_MAX = 16
+
+# nombre -> (negrita, alineación, borde, formato numérico); la alineación es
+# (horizontal, vertical, ajuste de texto)
+_CENTRO = ("center", None, False)
+_DERECHA = ("right", None, False)
+STYLES = {
+    "rc_borde":              (False, None, True, None),
+    "rc_encabezado":         (True, _CENTRO, True, None),
+    "rc_centrado":           (False, _CENTRO, True, None),
+    "rc_texto":              (False, ("left", "top", True), True, None),
+    "rc_fecha":              (False, None, True, DATE_FMT),
+    "rc_monto":              (False, _DERECHA, True, MONEY_FMT),
+    "rc_total":              (True, _DERECHA, True, None),
+    "rc_total_monto":        (True, _DERECHA, True, MONEY_FMT),
+    "rc_bloque_titulo":      (True, ("center", "center", True), True, None),
+    "rc_bloque_valor":       (False, ("left", "center", True), True, None),
+    "rc_bloque_monto":       (False, ("right", "center", True), True, MONEY_FMT),
+    "rc_bloque_saldo":       (True, ("left", "center", True), True, None),
+    "rc_bloque_saldo_monto": (True, ("right", "center", True), True, MONEY_FMT),
+    "rc_firma":              (False, ("center", "center", True), False, None),
+}
+# Estilo de cada columna de la tabla de gastos (la fecha usa "rc_fecha" si es date)
+GASTOS_COL_STYLES = ["rc_borde", "rc_borde", "rc_borde", "rc_texto", "rc_texto", "rc_texto", "rc_monto"]
+
+
+def _num(x) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return 0.0
+
+
+def register_styles(wb) -> None:
+    """Inscribe ``STYLES`` en el libro; las celdas luego solo guardan el nombre."""
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+
+    thin = Side(style="thin", color="000000")
+    border = Border(top=thin, left=thin, right=thin, bottom=thin)
+    fonts = {b: Font(name="Calibri", sz=11, family=2, scheme="minor", b=b) for b in (False, True)}
+    for name, (bold, align, boxed, number_format) in STYLES.items():
+        style = NamedStyle(name=name, font=fonts[bold])
+        if align is not None:
+            style.alignment = Alignment(horizontal=align[0], vertical=align[1], wrap_text=align[2])
+        if boxed:
+            style.border = border
+        if number_format is not None:
+            style.number_format = number_format
+        wb.add_named_style(style)
+
+
+def _setup_sheet(ws, widths) -> None:
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.page import PageMargins
+
+    ws.page_setup.orientation = "landscape"
+    ws.page_setup.fitToWidth = 1
+    ws.page_margins = PageMargins(left=0.3, right=0.3, top=0.5, bottom=0.5)
+    for i, w in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+
+
+def _logo_data(logo_bytes: bytes, width: int, height: int) -> bytes:
+    """Logo listo para incrustar en el tamaño mostrado (al doble, para pantallas de alta
+    densidad), codificado una vez por logo y ancho y compartido entre exportaciones."""
+    key = (hashlib.sha256(logo_bytes).hexdigest(), width)
+    with _LOCK:
+        hit = _LOGOS.get(key)
+        if hit is not None:
+            _LOGOS.move_to_end(key)
+            return hit
+    from PIL import Image as PILImage
+
+    with PILImage.open(io.BytesIO(logo_bytes)) as im:
+        box = (width * 2, height * 2)
+        if im.format in ("PNG", "JPEG", "GIF") and im.width <= box[0] and im.height <= box[1]:
+            data = logo_bytes
+        else:
+            out = io.BytesIO()
+            im.resize(box, PILImage.LANCZOS).save(out, format="PNG", optimize=True)
+            data = out.getvalue()
+    with _LOCK:
+        _LOGOS[key] = data
+        while len(_LOGOS) > _LOGOS_MAX:
+            _LOGOS.popitem(last=False)
+    return data
+
+
+def _add_logo(ws, logo_bytes: Optional[bytes], logo_px: int) -> None:
+    if not logo_bytes:
+        return
+    from openpyxl.drawing.image import Image as XLImage
+    try:
+        width = max(80, min(logo_px, 220))
+        height = int(width * 0.35)
+        # openpyxl cierra el buffer al guardar: uno nuevo por hoja sobre los mismos bytes
+        img = XLImage(io.BytesIO(_logo_data(logo_bytes, width, height)))
+        img.width = width
+        img.height = height
+        img.anchor = "A1"
+        ws.add_image(img)
+    except Exception:
+        pass
+
+
+def _gastos_bloques(meta: dict):
+    """Bloques combinados ``(rango, valor, estilo)`` del encabezado de "Gastos" y rangos con borde."""
+    t, v = "rc_bloque_titulo", "rc_bloque_valor"
+    bloques = [
+        ("A4:B4", "Tipo de Fondo", t), ("C4:D4", "Responsable del fondo", t), ("E4:G4", "Institución", t),
+        ("A5:B5", meta.get("tipo_fondo",""), v), ("C5:D5", meta.get("responsable",""), v),
+        ("E5:G5", meta.get("institucion",""), v),
+        ("A6:D6", "Fecha Rendición", t), ("E6:G6", "N° Rendición", t),
+        ("A7:D7", meta.get("fecha_rendicion",""), v), ("E7:G7", meta.get("n_rendicion",""), v),
+        ("A9:D9", "N° REX", t), ("E9:G9", "Fecha REX", t),
+        ("A10:D10", meta.get("n_rex",""), v), ("E10:G10", meta.get("fecha_rex",""), v),
+    ]
+    return bloques, ["A4:G10"]
+
+
+def _resumen_bloques(meta: dict, fondo_inicial: float, total: float):
+    """Bloques combinados de la hoja "Resumen" (datos, cuadro resumen y firmas) y rangos con borde."""
+    t, v = "rc_bloque_titulo", "rc_bloque_valor"
+    bloques, bordes = [], []
+
+    def fila(r, *celdas):
+        for c1, c2, valor, estilo in celdas:
+            bloques.append((f"{c1}{r}:{c2}{r}", valor, estilo))
+
+    fila(5, ("A", "B", "Tipo de Fondo", t), ("C", "E", "Nombre Responsable del Fondo", t), ("F", "H", "N° RUT", t))
+    fila(6, ("A", "B", meta.get("tipo_fondo",""), v), ("C", "E", meta.get("responsable",""), v),
+         ("F", "H", meta.get("rut",""), v))
+    fila(7, ("A", "B", "Institución", t), ("C", "E", "Cargo", t), ("F", "H", "N° Rendición", t))
+    fila(8, ("A", "B", meta.get("institucion",""), v), ("C", "E", meta.get("cargo",""), v),
+         ("F", "H", meta.get("n_rendicion",""), v))
+    fila(9, ("A", "B", "Mes que Rinde", t), ("C", "E", "N° REX", t), ("F", "H", "Fecha REX", t))
+    fila(10, ("A", "B", meta.get("mes_que_rinde",""), v), ("C", "E", meta.get("n_rex",""), v),
+         ("F", "H", meta.get("fecha_rex",""), v))
+    fila(11, ("A", "E", "Observaciones", t), ("F", "H", "Monto Inicial Fondo", t))
+    fila(12, ("A", "E", meta.get("observaciones",""), v), ("F", "H", fondo_inicial, "rc_bloque_monto"))
+    fila(13, ("A", "C", "N° Egreso Contable Inicial del Fondo", t), ("D", "E", "", t),
+         ("F", "G", "Fecha de Egreso Inicial del Fondo", t), ("H", "H", "", t))
+    fila(14, ("A", "C", meta.get("n_egreso_inicial",""), v), ("F", "G", meta.get("fecha_egreso_inicial",""), v))
+    bordes.append("A5:H15")
+
+    row = 16
+    fila(row, ("A", "H", "CUADRO RESUMEN RENDICION", t)); row += 1
+    labels_vals = [
+        ("Saldo Inicial/Rendición Mes Anterior", _num(meta.get("saldo_mes_anterior", 0))),
+        ("Monto Recibido Mes anterior", _num(meta.get("monto_recibido_mes_anterior", 0))),
+        ("Monto Gasto del mes", total),
+        ("Monto del gasto del mes Transporte", _num(meta.get("monto_gasto_transporte", 0))),
+    ]
+    for label, val in labels_vals:
+        fila(row, ("A", "E", label, v), ("F", "H", val, "rc_bloque_monto")); row += 1
+    saldo_final = labels_vals[0][1] + labels_vals[1][1] - labels_vals[2][1] - labels_vals[3][1]
+    fila(row, ("A", "E", "Saldo Final", "rc_bloque_saldo"), ("F", "H", saldo_final, "rc_bloque_saldo_monto"))
+    bordes.append(f"A16:H{row}")
+    row += 3
+
+    fila(row, ("B", "D", "_"*40, "rc_firma"), ("F", "H", "_"*40, "rc_firma"))
+    fila(row + 1, ("B", "D", "Encargado/a del Fondo", "rc_firma"), ("F", "H", "Director/a Ejecutiva", "rc_firma"))
+    return bloques, bordes
+
+
+def export_xlsx(rows, meta: dict, fondo_inicial: float, total: float,
+                logo_bytes: Optional[bytes] = None, logo_px: int = 140,
+                streaming: Optional[bool] = None) -> bytes:
+    """Usa el modo streaming desde ``STREAMING_MIN_ROWS`` filas, salvo que se indique."""
+    if streaming is None:
+        streaming = len(rows) >= STREAMING_MIN_ROWS
+    builder = build_workbook_streaming if streaming else build_workbook
+    return builder(rows, meta, fondo_inicial, total, logo_bytes, logo_px)
+
+
+def export_rendicion(data, logo_bytes: Optional[bytes] = None, logo_px: int = 140,
+                     rows: Optional[list] = None) -> bytes:
+    """Libro de la rendición ``{"fondo_inicial", "meta", "gastos"}`` (``rows``: las filas de
+    ``model.filas`` si ya se tienen), como ``pdf_export.export_pdf``."""
+    from .model import filas
+    rows = filas(data.get("gastos") or ()) if rows is None else rows
+    return export_xlsx(rows, data.get("meta") or {}, _num(data.get("fondo_inicial")),
+                       sum(r[6] for r in rows), logo_bytes, logo_px)
+
+
+def _lista(data, rows, doc_vacio: str) -> tuple:
+    """Filas de ``model.filas``, nombres de documento (``doc_vacio`` si no hay), fondo y total."""
+    from .model import documentos, filas
+    gastos = data.get("gastos") or ()
+    rows = filas(gastos) if rows is None else rows
+    return rows, [d or doc_vacio for d in documentos(gastos)], _num(data.get("fondo_inicial")), \
+        sum(r[6] for r in rows)
+
+
+def export_tabla(data, rows: Optional[list] = None) -> bytes:
+    """Libro de app.py: título y tabla de Excel "TablaGastos" (Fecha / Detalle / Monto /
+    Documento) desde la fila 3, con fondo, total, saldo y cantidad debajo."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.worksheet.table import Table, TableStyleInfo
+    from .model import TITULO_TABLA
+
+    rows, docs, fondo, total = _lista(data, rows, "—")
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Gastos"
+    ws["A1"] = TITULO_TABLA
+    ws["A1"].font = Font(bold=True, size=14)
+    ws.merge_cells("A1:D1")
+    ws["A1"].alignment = Alignment(horizontal="center")
+
+    start_row = 3
+    for j, h in enumerate(("Fecha", "Detalle", "Monto", "Documento"), start=1):
+        ws.cell(row=start_row, column=j, value=h)
+    for i, (r, doc) in enumerate(zip(rows, docs), start=start_row + 1):
+        for j, val in enumerate((r[1], r[4], r[6], doc), start=1):
+            ws.cell(row=i, column=j, value=val)
+    last_row = start_row + len(rows)
+    table = Table(displayName="TablaGastos", ref=f"A{start_row}:D{max(last_row, start_row + 1)}")
+    table.tableStyleInfo = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False,
+                                          showLastColumn=False, showRowStripes=True, showColumnStripes=False)
+    ws.add_table(table)
+
+    for k, (label, valor) in enumerate((("Fondo inicial", fondo), ("Total gastos", total),
+                                        ("Saldo", fondo - total), ("Cantidad de gastos", len(rows))), start=2):
+        ws.cell(row=last_row + k, column=1, value=label)
+        ws.cell(row=last_row + k, column=2, value=valor)
+
+    bio = io.BytesIO()
+    wb.save(bio)
+    return bio.getvalue()
+
+
+def export_listado(data, rows: Optional[list] = None, progreso: Optional[Callable] = None,
+                   paso: int = 200) -> bytes:
+    """Libro de la app Kivy en modo write-only: título, listado Fecha / Detalle / Monto /
+    Documento y resumen. ``progreso(hechos, total)`` se llama cada ``paso`` filas y al terminar."""
+    from openpyxl import Workbook
+    from .model import TITULO_LISTADO
+
+    rows, docs, fondo, total = _lista(data, rows, "")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Gastos")
+    ws.append([TITULO_LISTADO])
+    ws.append([])
+    ws.append(["Fecha", "Detalle", "Monto", "Documento"])
+    for i, (r, doc) in enumerate(zip(rows, docs), 1):
+        ws.append([r[1], r[4], r[6], doc])
+        if progreso is not None and i % paso == 0:
+            progreso(i, len(rows))
+    ws.append([])
+    ws.append(["", "Fondo entregado", fondo])
+    ws.append(["", "Gastos realizados", total])
+    ws.append(["", "Saldo disponible", fondo - total])
+
+    bio = io.BytesIO()
+    wb.save(bio)
+    if progreso is not None:
+        progreso(len(rows), len(rows))
+    return bio.getvalue()
+
+
+def build_workbook(rows, meta: dict, fondo_inicial: float, total: float,
+                   logo_bytes: Optional[bytes] = None, logo_px: int = 140) -> bytes:
+    """Libro completo en memoria (modo normal de openpyxl)."""
+    from openpyxl import Workbook
+
+    def pintar(ws, bloques, bordes):
+        for rng, value, style in bloques:
+            if ":" in rng and rng.split(":")[0] != rng.split(":")[1]:
+                ws.merge_cells(rng)
+            c = ws[rng.split(":")[0]]
+            c.value = value; c.style = style
+        for rng in bordes:
+            for row in ws[rng]:
+                for c in row:
+                    if not c.has_style:
+                        c.style = "rc_borde"
+
+    wb = Workbook()
+    register_styles(wb)
+    # ---------- Hoja Gastos ----------
+    ws = wb.active
+    ws.title = "Gastos"
+    _setup_sheet(ws, WIDTHS)
+    _add_logo(ws, logo_bytes, logo_px)
+    pintar(ws, *_gastos_bloques(meta))
+    for r in range(4, 11): ws.row_dimensions[r].height = 18
+
+    start_row = GASTOS_START_ROW
+    for j, h in enumerate(HEADERS, start=1):
+        ws.cell(row=start_row, column=j, value=h).style = "rc_encabezado"
+
+    if not rows:
+        ws.cell(row=start_row+1, column=1, value="Sin registros").style = "rc_centrado"
+        for j in range(2, 8):
+            ws.cell(row=start_row+1, column=j, value="").style = "rc_borde"
+        last_row = start_row + 1
+    else:
+        for i, row in enumerate(rows, start=1):
+            for j, val in enumerate(row):
+                c = ws.cell(row=start_row+i, column=j+1, value=val)
+                c.style = "rc_fecha" if j == 1 and isinstance(val, date) else GASTOS_COL_STYLES[j]
+        last_row = start_row + len(rows)
+
+    ws.merge_cells(start_row=last_row+1, start_column=1, end_row=last_row+1, end_column=6)
+    ws.cell(row=last_row+1, column=1, value="Monto Total del Gasto").style = "rc_total"
+    ws.cell(row=last_row+1, column=7, value=total).style = "rc_total_monto"
+
+    # ---------- Hoja Resumen ----------
+    ws2 = wb.create_sheet("Resumen")
+    _setup_sheet(ws2, RESUMEN_WIDTHS)
+    _add_logo(ws2, logo_bytes, logo_px)
+    pintar(ws2, *_resumen_bloques(meta, fondo_inicial, total))
+
+    bio = io.BytesIO(); wb.save(bio); return bio.getvalue()
+
+
+class _Bloque:
+    """Celdas fijas (encabezados, resumen) de una hoja write-only.
+
+    En modo write-only las filas se escriben una sola vez y en orden, así que
+    los bloques combinados se arman aquí por coordenada y se vuelcan con
+    ``flush`` antes de empezar (o después de terminar) el flujo de filas.
+    """
+
+    def __init__(self, ws):
+        from openpyxl.cell import WriteOnlyCell
+        self.ws, self._cell = ws, WriteOnlyCell
+        self.cells = {}
+        self.next_row = 1
+
+    def put(self, row: int, col: int, value=None, style: Optional[str] = None):
+        c = self.cells.get((row, col))
+        if c is None:
+            c = self.cells[(row, col)] = self._cell(self.ws, value=value)
+        elif value is not None:
+            c.value = value
+        if style is not None:
+            c.style = style
+        return c
+
+    def pintar(self, bloques, bordes) -> None:
+        from openpyxl.utils import range_boundaries
+        for rng, value, style in bloques:
+            min_col, min_row, max_col, max_row = range_boundaries(rng)
+            if (min_col, min_row) != (max_col, max_row):
+                self.ws.merged_cells.add(rng)
+            self.put(min_row, min_col, value, style)
+        for rng in bordes:
+            min_col, min_row, max_col, max_row = range_boundaries(rng)
+            for r in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    if (r, col) not in self.cells:
+                        self.put(r, col, style="rc_borde")
+
+    def flush(self) -> None:
+        """Escribe las filas pendientes hasta la última celda registrada."""
+        if not self.cells:
+            return
+        last = max(r for r, _ in self.cells)
+        for r in range(self.next_row, last + 1):
+            cols = [col for (rr, col) in self.cells if rr == r]
+            self.ws.append([self.cells.get((r, col)) for col in range(1, max(cols) + 1)] if cols else [])
+        self.next_row = last + 1
+        self.cells = {}
+
+
+def build_workbook_streaming(rows, meta: dict, fondo_inicial: float, total: float,
+                             logo_bytes: Optional[bytes] = None, logo_px: int = 140) -> bytes:
+    """Mismo libro que ``build_workbook`` escrito en modo write-only de openpyxl.
+
+    Las filas de gastos pasan directo al archivo sin quedar en memoria.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = Workbook(write_only=True)
+    register_styles(wb)
+    # ---------- Hoja Gastos ----------
+    ws = wb.create_sheet("Gastos")
+    _setup_sheet(ws, WIDTHS)
+    _add_logo(ws, logo_bytes, logo_px)
+    for r in range(4, 11): ws.row_dimensions[r].height = 18
+
+    g = _Bloque(ws)
+    g.pintar(*_gastos_bloques(meta))
+    start_row = GASTOS_START_ROW
+    for j, h in enumerate(HEADERS, start=1):
+        g.put(start_row, j, h, "rc_encabezado")
+    g.flush()
+
+    if not rows:
+        row = [WriteOnlyCell(ws, value="Sin registros")] + [WriteOnlyCell(ws, value="") for _ in range(6)]
+        row[0].style = "rc_centrado"
+        for c in row[1:]: c.style = "rc_borde"
+        ws.append(row)
+        last_row = start_row + 1
+    else:
+        for values in rows:
+            row = []
+            for j, val in enumerate(values):
+                c = WriteOnlyCell(ws, value=val)
+                c.style = "rc_fecha" if j == 1 and isinstance(val, date) else GASTOS_COL_STYLES[j]
+                row.append(c)
+            ws.append(row)
+        last_row = start_row + len(rows)
+
+    g.next_row = last_row + 1
+    g.pintar([(f"A{last_row+1}:F{last_row+1}", "Monto Total del Gasto", "rc_total"),
+              (f"G{last_row+1}", total, "rc_total_monto")], [])
+    g.flush()
+
+    # ---------- Hoja Resumen ----------
+    ws2 = wb.create_sheet("Resumen")
+    _setup_sheet(ws2, RESUMEN_WIDTHS)
+    _add_logo(ws2, logo_bytes, logo_px)
+    b = _Bloque(ws2)
+    b.pintar(*_resumen_bloques(meta, fondo_inicial, total))
+    b.flush()
+
+    bio = io.BytesIO(); wb.save(bio); return bio.getvalue()
@@ -0,0 +1,260 @@
+"""Importación por flujo de archivos de datos grandes (JSON o JSON Lines).
+
+El archivo se lee por bloques y se decodifica de a un valor con
+``json.JSONDecoder.raw_decode``: los gastos del arreglo ``"gastos"`` se
+entregan uno a uno a medida que llegan, ya normalizados y validados, sin
+tener nunca el archivo completo (ni una segunda lista) en memoria. Se aceptan
+tres formas:
+
+- el JSON que exporta la app: ``{"fondo_inicial": ..., "meta": {...}, "gastos": [...]}``;
+- un arreglo de gastos: ``[{...}, {...}]``;
+- JSON Lines: un gasto por línea; una línea con solo ``fondo_inicial`` y/o
+  ``meta`` se toma como encabezado.
+
+``StreamImport`` es un iterable de gastos: se pasa directo a
+``Repository.import_gastos`` (una sola transacción con ``executemany``) o a
+cualquier otro consumidor. Los registros inválidos se omiten y quedan en
+``errores``; ``progress(bytes_leidos, bytes_totales, gastos)`` se llama cada
+``progress_every`` gastos y al terminar.
+"""
+import codecs
+import json
+import os
+from datetime import date, datetime
+from typing import Callable, Optional
+
+CHUNK_SIZE = 1 << 16  # 64 KiB
+HEADER_KEYS = ("fondo_inicial", "meta")
+_WS = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"  # los que pueden seguir a un número que aún no termina
+_DECODER = json.JSONDecoder()
+
+
+def _float(x, campo: str) -> float:
+    if x is None or x == "":
+        return 0.0
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo} no es un número: {x!r}")
+
+
+def _fecha(x) -> str:
+    if isinstance(x, (date, datetime)):
+        return x.strftime("%Y-%m-%d")
+    texto = str(x).strip()[:10]
+    try:
+        date.fromisoformat(texto)
+        return texto
+    except ValueError:
+        raise ValueError(f"fecha inválida: {x!r}")
+
+
+def validate_gasto(g) -> dict:
+    """Valida ``fecha`` y ``monto`` (y los deja como "YYYY-MM-DD" y float) sin cambiar las
+    demás claves; ``ValueError`` si el registro no sirve."""
+    if not isinstance(g, dict):
+        raise ValueError("el gasto no es un objeto JSON")
+    g = dict(g)
+    g["fecha"] = _fecha(g.get("fecha"))
+    g["monto"] = _float(g.get("monto"), "monto")
+    return g
+
+
+def normalize_gasto(g, store=None) -> dict:
+    """Gasto con las claves de las apps Streamlit; ``ref_doc`` se conserva solo si ``store``
+    (el almacén de adjuntos) tiene ese archivo."""
+    g = validate_gasto(g)
+    ref = g.get("ref_doc")
+    return {
+        "fecha": g["fecha"],
+        "monto": g["monto"],
+        "detalle": g.get("detalle") or g.get("descripcion") or "",
+        "tipo_doc": g.get("tipo_doc", ""),
+        "n_doc": g.get("n_doc", ""),
+        "proveedor": g.get("proveedor", ""),
+        "nombre_doc": g.get("nombre_doc"),
+        "ref_doc": ref if store is not None and store.exists(ref) else None,
+    }
+
+
+class _Reader:
+    """Texto del archivo por bloques y decodificación de a un valor JSON."""
+
+    def __init__(self, fileobj, chunk_size: int):
+        self.file = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self, size: Optional[int] = None) -> None:
+        block = self.file.read(size or self.chunk_size)
+        if self.pos > self.chunk_size:  # se descarta lo ya consumido
+            self.buf, self.pos = self.buf[self.pos:], 0
+        if not block:
+            self.eof = True
+            if isinstance(block, bytes):
+                self.buf += self.decoder.decode(b"", final=True)
+            return
+        if isinstance(block, bytes):
+            self.bytes_read += len(block)
+            block = self.decoder.decode(block)
+        else:
+            self.bytes_read += len(block.encode("utf-8"))
+        self.buf += block
+
+    def peek(self) -> str:
+        """Siguiente carácter no blanco (sin consumirlo); "" al final del archivo."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"JSON inválido: se esperaba {' o '.join(chars)} y llegó {ch or 'el fin del archivo'!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        """Decodifica el siguiente valor completo, leyendo más bloques si hace falta."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # un número al borde del bloque podría seguir en el próximo: "1" | "2", "1." | "5", "1e" | "3"
+                numero = type(value) in (int, float)
+                if self.eof or (end < len(self.buf) and not (numero and self.buf[end] in _NUMBER_CHARS)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"JSON inválido: {e.msg} (carácter {e.pos})") from None
+            self._fill(size)
+            size *= 2  # valores grandes: bloques crecientes para no decodificar de nuevo tantas veces
+
+
+class StreamImport:
+    """Gastos de un archivo JSON / JSON Lines, normalizados a medida que se leen.
+
+    Tras recorrerlo: ``fondo_inicial`` (None si el archivo no lo trae),
+    ``meta``, ``cantidad`` (gastos entregados) y ``errores`` (``[(n, mensaje)]``
+    con ``n`` la posición del registro, desde 1).
+    """
+
+    def __init__(self, fileobj, normalize: Optional[Callable] = normalize_gasto,
+                 progress: Optional[Callable] = None, progress_every: int = 500,
+                 chunk_size: int = CHUNK_SIZE, total_bytes: Optional[int] = None):
+        self.file = fileobj
+        self.normalize = normalize
+        self.progress = progress
+        self.progress_every = progress_every
+        self.chunk_size = chunk_size
+        self.total_bytes = total_bytes if total_bytes is not None else _size(fileobj)
+        self.fondo_inicial = None
+        self.meta = {}
+        self.cantidad = 0
+        self.errores = []
+        self._registros = 0
+        self._reader = None
+
+    def __iter__(self):
+        r = self._reader = _Reader(self.file, self.chunk_size)
+        first = r.peek()
+        if first == "[":
+            yield from self._array()
+        elif first == "{":
+            yield from self._document()
+            while r.peek():  # JSON Lines: más objetos después del primero
+                yield from self._record(r.value())
+        elif first:
+            raise ValueError(f"JSON inválido: se esperaba {{ o [ y llegó {first!r}")
+        self._report(force=True)
+
+    # ---------- estructura ----------
+    def _array(self):
+        r = self._reader
+        r.expect("[")
+        if r.peek() == "]":
+            r.pos += 1
+            return
+        while True:
+            yield from self._record(r.value())
+            if r.expect(",]") == "]":
+                return
+
+    def _document(self):
+        """Primer objeto: o el documento con ``"gastos"`` (que se recorre por flujo), o la
+        primera línea de un JSON Lines."""
+        r = self._reader
+        r.expect("{")
+        campos, con_gastos = {}, False
+        if r.peek() == "}":
+            r.pos += 1
+        else:
+            while True:
+                key = r.value()
+                if not isinstance(key, str):
+                    raise ValueError("JSON inválido: clave que no es texto")
+                r.expect(":")
+                if key == "gastos" and r.peek() == "[":
+                    con_gastos = True
+                    yield from self._array()
+                else:
+                    campos[key] = r.value()
+                if r.expect(",}") == "}":
+                    break
+        if con_gastos or not campos or set(campos) <= set(HEADER_KEYS):
+            self._header(campos)
+        else:
+            yield from self._record(campos)
+
+    def _header(self, campos: dict) -> None:
+        if "fondo_inicial" in campos:
+            self.fondo_inicial = _float(campos["fondo_inicial"], "fondo_inicial")
+        if isinstance(campos.get("meta"), dict):
+            self.meta.update(campos["meta"])
+
+    def _record(self, obj):
+        if isinstance(obj, dict) and obj and set(obj) <= set(HEADER_KEYS):
+            self._header(obj)  # encabezado de un JSON Lines
+            return
+        self._registros += 1
+        try:
+            g = self.normalize(obj) if self.normalize is not None else obj
+        except ValueError as e:
+            self.errores.append((self._registros, str(e)))
+            return
+        self.cantidad += 1
+        self._report()
+        yield g
+
+    def _report(self, force: bool = False) -> None:
+        if self.progress is not None and (force or self.cantidad % self.progress_every == 0):
+            self.progress(self._reader.bytes_read, self.total_bytes, self.cantidad)
+
+
+def _size(fileobj) -> Optional[int]:
+    size = getattr(fileobj, "size", None)
+    if isinstance(size, int):
+        return size
+    try:
+        return os.fstat(fileobj.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        pos = fileobj.tell()
+        end = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(pos)
+        return end - pos
+    except (AttributeError, OSError, ValueError):
+        return None
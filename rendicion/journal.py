@@ -0,0 +1,140 @@
+"""Persistencia incremental de una rendición: instantánea JSON + bitácora de operaciones.
+
+Cada alta, edición, baja o cambio de fondo se agrega como una línea JSON al
+final de ``<archivo>.log`` (O(1) de E/S por operación). Cada ``compact_every``
+operaciones, o al llamar ``compact``, el estado completo se escribe en el
+archivo principal mediante un temporal + ``os.replace`` (atómico) y la bitácora
+se vacía.
+
+Cada operación lleva un número de secuencia y la instantánea guarda el último
+aplicado (``journal_seq``): si el proceso se corta entre el reemplazo y el
+vaciado, al cargar se omiten las operaciones ya incluidas. Una última línea
+incompleta (corte a mitad de escritura) se descarta.
+"""
+import json
+import os
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+
+SEQ_KEY = "journal_seq"
+
+
+def _plain(obj):
+    """Para ``json.dump``: una ``GastosTable`` (o una de sus filas) como lista / dict."""
+    if hasattr(obj, "to_list"):
+        return obj.to_list()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"{type(obj).__name__} no es serializable a JSON")
+
+
+def apply_op(data: dict, op: dict) -> None:
+    """Aplica una operación de la bitácora sobre ``data`` (en sitio)."""
+    kind = op["op"]
+    gastos = data.setdefault("gastos", [])
+    if kind == "add":
+        gastos.append(op["gasto"])
+    elif kind == "edit":
+        gastos[op["idx"]] = op["gasto"]
+    elif kind == "delete":
+        for idx in sorted(set(op["indices"]), reverse=True):
+            gastos.pop(idx)
+    elif kind == "set_fondo":
+        data["fondo_inicial"] = op["monto"]
+    else:
+        raise ValueError(f"Operación desconocida en la bitácora: {kind!r}")
+
+
+class JournalStore:
+    """Instantánea en ``path`` y bitácora JSON-lines en ``path + '.log'``."""
+
+    def __init__(self, path, compact_every: int = 200, durable: bool = True):
+        self.path = Path(path)
+        self.log_path = Path(str(self.path) + ".log")
+        self.compact_every = compact_every
+        self.durable = durable
+        self.seq = 0
+        self.pending = 0  # operaciones en la bitácora desde la última instantánea
+        self._log = None
+
+    # ---------- lectura ----------
+    def load(self) -> dict:
+        data = {"fondo_inicial": 0, "gastos": []}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        self.seq = int(data.pop(SEQ_KEY, 0) or 0)
+        self.pending = 0
+        for op in self._replay_ops():
+            if op["seq"] <= self.seq:
+                continue
+            apply_op(data, op)
+            self.seq = op["seq"]
+            self.pending += 1
+        return data
+
+    def _replay_ops(self):
+        if not self.log_path.exists():
+            return []
+        ops, good_end = [], 0
+        with self.log_path.open("rb") as f:
+            raw = f.read()
+        for line in raw.splitlines(keepends=True):
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                if line.endswith(b"\n") or good_end + len(line) != len(raw):
+                    raise ValueError(f"Bitácora dañada en {self.log_path} (byte {good_end})")
+                # última línea a medio escribir: se descarta
+                with self.log_path.open("r+b") as f:
+                    f.truncate(good_end)
+                break
+            good_end += len(line)
+        else:
+            if raw and not raw.endswith(b"\n"):  # última operación completa sin salto de línea
+                with self.log_path.open("ab") as f:
+                    f.write(b"\n")
+        return ops
+
+    # ---------- escritura ----------
+    def append(self, op: dict, data: dict) -> None:
+        """Registra ``op`` (ya aplicada sobre ``data``) y compacta si corresponde."""
+        self.seq += 1
+        line = json.dumps({**op, "seq": self.seq}, ensure_ascii=False, separators=(",", ":"))
+        if self._log is None:
+            self._log = self.log_path.open("a", encoding="utf-8")
+        self._log.write(line + "\n")
+        self._log.flush()
+        if self.durable:
+            os.fsync(self._log.fileno())
+        self.pending += 1
+        if self.compact_every and self.pending >= self.compact_every:
+            self.compact(data)
+
+    def compact(self, data: dict) -> None:
+        """Escribe la instantánea completa de forma atómica y vacía la bitácora."""
+        snapshot = {**data, SEQ_KEY: self.seq}
+        directory = self.path.parent
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=self.path.name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2, default=_plain)
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.close()
+        with self.log_path.open("w", encoding="utf-8"):
+            pass
+        self.pending = 0
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,126 @@
+"""Totales acumulados de una rendición, actualizados en cada alta, edición y baja."""
+import math
+import os
+
+
+class LedgerMismatch(AssertionError):
+    """Los totales acumulados no coinciden con un recálculo completo."""
+
+
+def _monto(g) -> float:
+    try:
+        return float(g.get("monto") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _tipo(g) -> str:
+    return str(g.get("tipo_doc") or "")
+
+
+def _mes(g) -> str:
+    fecha = g.get("fecha")
+    if fecha is None:
+        return ""
+    if not isinstance(fecha, str):
+        fecha = fecha.isoformat()
+    return fecha[:7]  # "YYYY-MM"
+
+
+class GastosLedger:
+    """Total, cantidad, saldo y subtotales por tipo de documento y por mes en O(1).
+
+    Los subtotales se guardan como ``{clave: [monto, cantidad]}``; una clave
+    desaparece cuando su cantidad llega a cero. Con ``verify=True`` (o la
+    variable de entorno ``RENDICION_LEDGER_VERIFY=1``) cada operación se
+    contrasta con un recálculo completo sobre ``source()``, que debe devolver
+    la lista de gastos ya actualizada.
+    """
+
+    TOLERANCIA = 0.005
+
+    def __init__(self, fondo_inicial=0.0, gastos=(), verify=None, source=None):
+        self.fondo_inicial = float(fondo_inicial or 0)
+        self.total = 0.0
+        self.cantidad = 0
+        self.por_tipo = {}
+        self.por_mes = {}
+        if verify is None:
+            verify = os.environ.get("RENDICION_LEDGER_VERIFY") == "1"
+        self.verify = verify
+        self.source = source
+        for g in gastos:
+            self._apply(g, 1)
+
+    # ---------- consultas ----------
+    @property
+    def saldo(self) -> float:
+        return self.fondo_inicial - self.total
+
+    def totals(self):
+        """Mismo orden que ``totals()`` de las apps Streamlit: fondo, total, saldo, cantidad."""
+        return self.fondo_inicial, self.total, self.saldo, self.cantidad
+
+    def subtotal_tipo(self, tipo_doc: str) -> float:
+        return self.por_tipo.get(tipo_doc, [0.0, 0])[0]
+
+    def subtotal_mes(self, mes: str) -> float:
+        return self.por_mes.get(mes, [0.0, 0])[0]
+
+    # ---------- actualizaciones ----------
+    def add(self, g) -> None:
+        self._apply(g, 1)
+        self._check()
+
+    def remove(self, g) -> None:
+        self._apply(g, -1)
+        self._check()
+
+    def replace(self, old, new) -> None:
+        self._apply(old, -1)
+        self._apply(new, 1)
+        self._check()
+
+    def set_fondo(self, monto) -> None:
+        self.fondo_inicial = float(monto or 0)
+
+    def _apply(self, g, sign: int) -> None:
+        monto = _monto(g) * sign
+        self.total += monto
+        self.cantidad += sign
+        if self.cantidad == 0:
+            self.total = 0.0  # evita arrastrar error de redondeo al vaciarse
+        self._bump(self.por_tipo, _tipo(g), monto, sign)
+        self._bump(self.por_mes, _mes(g), monto, sign)
+
+    @staticmethod
+    def _bump(bucket: dict, key: str, monto: float, n: int) -> None:
+        acc = bucket.setdefault(key, [0.0, 0])
+        acc[0] += monto
+        acc[1] += n
+        if acc[1] <= 0:
+            del bucket[key]
+
+    # ---------- verificación ----------
+    def _check(self) -> None:
+        if self.verify and self.source is not None:
+            self.verify_against(self.source())
+
+    def verify_against(self, gastos) -> None:
+        """Recalcula todo desde ``gastos`` y lanza ``LedgerMismatch`` ante cualquier diferencia."""
+        gastos = list(gastos)
+        ref = GastosLedger(self.fondo_inicial, gastos, verify=False)
+        ref.total = math.fsum(_monto(g) for g in gastos)
+        errores = []
+        if ref.cantidad != self.cantidad:
+            errores.append(f"cantidad {self.cantidad} != {ref.cantidad}")
+        if abs(ref.total - self.total) > self.TOLERANCIA:
+            errores.append(f"total {self.total} != {ref.total}")
+        for nombre in ("por_tipo", "por_mes"):
+            mio, suyo = getattr(self, nombre), getattr(ref, nombre)
+            for key in set(mio) | set(suyo):
+                a, b = mio.get(key, [0.0, 0]), suyo.get(key, [0.0, 0])
+                if a[1] != b[1] or abs(a[0] - b[0]) > self.TOLERANCIA:
+                    errores.append(f"{nombre}[{key!r}] {a} != {b}")
+        if errores:
+            raise LedgerMismatch("; ".join(errores))
@@ -0,0 +1,138 @@
+"""Rendición sin interfaz: campos, formato de montos, documento JSON y filas de los informes.
+
+Una rendición es el diccionario ``{"fondo_inicial", "meta", "gastos"}`` que
+devuelve ``Repository.load`` y que exportan e importan las apps. Los gastos
+traen las claves de las apps Streamlit (``detalle``, ``nombre_doc``) o las de
+la app Kivy (``descripcion``, ``documento`` = ruta del archivo); ``detalle`` y
+``nombre_doc`` leen cualquiera de las dos, de modo que el mismo JSON y los
+informes de ``excel_export`` / ``pdf_export`` sirven para las rendiciones de
+cualquier interfaz.
+
+``filas`` arma la tabla de gastos de los informes columna a columna (con
+``GastosTable.column`` si los gastos vienen por columnas), sin pandas;
+``documentos`` agrega el nombre del adjunto para los informes que lo listan.
+"""
+import json
+import os
+from datetime import date
+
+# Claves de cada gasto en el JSON exportado (y en la huella de las exportaciones)
+GASTO_KEYS = ("fecha", "tipo_doc", "n_doc", "detalle", "proveedor", "monto", "nombre_doc", "ref_doc")
+TEXTOS = ("tipo_doc", "n_doc", "detalle", "proveedor")
+# Títulos de los informes simples (``export_tabla`` de app.py, ``export_listado`` de Kivy)
+TITULO_TABLA = "Rendición de Cuentas – SLEP Petorca"
+TITULO_LISTADO = "Rendicion de Gastos menores Fondo Fijo - SLEP Petorca - Programa 01"
+
+
+def default_meta() -> dict:
+    """Datos del formulario de rendición (encabezado, egreso inicial y cuadro resumen)."""
+    return {
+        "tipo_fondo": "",
+        "responsable": "",
+        "rut": "",
+        "cargo": "",
+        "institucion": "",
+        "mes_que_rinde": "",
+        "fecha_rendicion": "",
+        "n_rendicion": "",
+        "n_rex": "",
+        "fecha_rex": "",
+        "observaciones": "",
+        "n_egreso_inicial": "",
+        "fecha_egreso_inicial": "",
+        "saldo_mes_anterior": 0.0,
+        "monto_recibido_mes_anterior": 0.0,
+        "monto_gasto_transporte": 0.0,
+    }
+
+
+def parse_float(x) -> float:
+    try:
+        return float(x)
+    except Exception:
+        return 0.0
+
+
+def money(x) -> str:
+    """Monto en pesos: "$1.234.567" (sin decimales, punto de miles)."""
+    try:
+        s = f"{int(round(float(x))):,}".replace(",", ".")
+        return f"${s}"
+    except Exception:
+        return f"${x}"
+
+
+# ---------- campos de cualquiera de las apps ----------
+def detalle(g) -> str:
+    return g.get("detalle") or g.get("descripcion") or ""
+
+
+def _basename(ruta) -> str:
+    return os.path.basename(str(ruta).replace("\\", "/"))
+
+
+def nombre_doc(g):
+    """Nombre del documento adjunto (de ``nombre_doc`` o de la ruta en ``documento``); None si no hay."""
+    nombre = g.get("nombre_doc")
+    if nombre:
+        return nombre
+    ruta = g.get("documento")
+    return _basename(ruta) if ruta else None
+
+
+def gasto_json(g) -> dict:
+    return {
+        "fecha": g.get("fecha"),
+        "tipo_doc": g.get("tipo_doc") or "",
+        "n_doc": g.get("n_doc") or "",
+        "detalle": detalle(g),
+        "proveedor": g.get("proveedor") or "",
+        "monto": g.get("monto") or 0,
+        "nombre_doc": nombre_doc(g),
+        "ref_doc": g.get("ref_doc"),
+    }
+
+
+def export_data(data) -> dict:
+    """El documento JSON de la rendición (lo que lee ``importer.StreamImport``)."""
+    return {
+        "fondo_inicial": data.get("fondo_inicial") or 0,
+        "meta": data.get("meta") or {},
+        "gastos": [gasto_json(g) for g in data.get("gastos") or ()],
+    }
+
+
+def export_json(data) -> bytes:
+    return json.dumps(export_data(data), ensure_ascii=False, indent=2).encode("utf-8")
+
+
+# ---------- tabla de gastos de los informes ----------
+def _columna(gastos, key) -> list:
+    if hasattr(gastos, "column"):
+        return gastos.column(key)
+    return [g.get(key) for g in gastos]
+
+
+def _fecha(x):
+    try:
+        return date.fromisoformat(str(x)[:10])
+    except ValueError:
+        return "" if x is None else str(x)
+
+
+def filas(gastos, desde: int = 1) -> list:
+    """Filas ``(N, fecha, tipo_doc, n_doc, detalle, proveedor, monto)`` con tipos nativos
+    (``int``, ``date``, ``str``, ``float``), como las espera ``excel_export``."""
+    textos = {k: ["" if v is None else str(v) for v in _columna(gastos, k)] for k in TEXTOS}
+    if any(v is None for v in _columna(gastos, "detalle")):  # gastos de la app Kivy
+        textos["detalle"] = [d or ("" if v is None else str(v))
+                             for d, v in zip(textos["detalle"], _columna(gastos, "descripcion"))]
+    n = len(textos["detalle"])
+    return list(zip(range(desde, desde + n), map(_fecha, _columna(gastos, "fecha")),
+                    *(textos[k] for k in TEXTOS), map(parse_float, _columna(gastos, "monto"))))
+
+
+def documentos(gastos) -> list:
+    """Nombre del documento de cada gasto, como ``nombre_doc`` pero por columnas; None si no hay."""
+    return [n or (_basename(r) if r else None)
+            for n, r in zip(_columna(gastos, "nombre_doc"), _columna(gastos, "documento"))]
@@ -0,0 +1,398 @@
+"""Informe PDF de la rendición (formulario de Fondos Fijos P01), sin interfaz.
+
+``export_pdf`` recibe la rendición (``{"fondo_inicial", "meta", "gastos"}``)
+y arma: encabezado con logo, datos de la rendición, tabla de gastos maquetada
+una sola vez con ``pdf_layout`` (sin cortes de fila, encabezado repetido en
+cada página), total, egreso inicial, cuadro resumen y bloque de firmas, con
+pie "Página n de N". Lo usan ``streamlit_app.py`` y ``python -m rendicion``.
+
+Los informes más simples de las otras apps reciben la misma rendición:
+``export_tabla`` (app.py: resumen y tabla Fecha / Detalle / Monto / Documento)
+y ``export_listado`` (app Kivy: listado horizontal, resumen y firma, con avance).
+Los tres maquetan con ``pdf_layout`` sobre las filas de ``model.filas``.
+
+Con la fuente Unicode de ``resources`` el texto va tal cual; si no está, se
+reduce a latin-1 (las fuentes base de fpdf no tienen, p. ej., "–").
+"""
+import io
+from datetime import datetime
+from typing import Callable, Optional
+
+from . import resources
+from .model import TITULO_LISTADO, TITULO_TABLA, documentos, filas, money, parse_float
+from .pdf_layout import draw_wrapped_row, layout_rows, text_width
+
+HEADERS = ["N°", "Fecha gasto", "Tipo documento", "N° Documento",
+           "Detalle del gasto", "Nombre Proveedor", "Monto"]
+COL_W_LANDSCAPE = [12, 24, 34, 36, 102, 56, 33]
+COL_W_PORTRAIT = [10, 24, 30, 30, 84, 42, 30]
+ALIGNS = ["C", "L", "L", "L", "L", "L", "R"]
+LINE_H = 5.2
+# clave en ``firmas`` -> título bajo la línea, de a dos por fila
+FIRMAS = (
+    ("encargado", "Encargado/a del Fondo"),
+    ("directora", "Director/a Ejecutiva"),
+    ("revisor1", "Nombre/Firma Revisor/a 1"),
+    ("jefe_unidad", "V°B° JEFE UNIDAD"),
+    ("u_finanzas", "V°B° UNIDAD DE FINANZAS"),
+    ("contab_finanzas", "CONTABILIDAD Y FINANZAS"),
+    ("jefe_adm_fin", "V°B° JEFE/(A) ADMINISTRACIÓN Y FINANZAS"),
+)
+
+
+def safe_text(txt: str, unicode_ok: bool) -> str:
+    return txt if unicode_ok else txt.replace("–", "-").encode("latin-1", "ignore").decode("latin-1")
+
+
+def normalize_widths(widths, total):
+    """Ajusta una lista de anchos al ancho total disponible (el último absorbe el redondeo)."""
+    s = sum(widths)
+    if s <= 0:
+        return [total]
+    scale = total / s
+    scaled = [w * scale for w in widths]
+    if len(scaled) > 1:
+        scaled[-1] = total - sum(scaled[:-1])  # evita acumulación de redondeo
+    return scaled
+
+
+def rows_as_text(rows, unicode_ok: bool = True) -> list:
+    """Filas de ``model.filas`` ya formateadas: fecha ISO, monto CLP y textos seguros para la fuente."""
+    out = [(str(n), f.isoformat() if hasattr(f, "isoformat") else str(f), tipo, ndoc, det, prov, money(monto))
+           for n, f, tipo, ndoc, det, prov, monto in rows]
+    if not unicode_ok:
+        out = [tuple(safe_text(c, False) for c in row) for row in out]
+    return out
+
+
+def export_pdf(data, landscape: bool = False, logo_mm: int = 24, logo_bytes: Optional[bytes] = None,
+               firmas: Optional[dict] = None, rows: Optional[list] = None) -> bytes:
+    """PDF de la rendición. ``rows``: las filas de ``model.filas`` si ya se tienen;
+    ``firmas``: clave de ``FIRMAS`` -> imagen."""
+    from fpdf import FPDF
+
+    meta = data.get("meta") or {}
+    firmas = firmas or {}
+    rows = filas(data.get("gastos") or ()) if rows is None else rows
+    total = sum(r[6] for r in rows)
+
+    # --- Subclase con pie de página ---
+    class MyPDF(FPDF):
+        def footer(self):
+            self.set_y(-12)
+            self.set_font(self.font_family, size=8)
+            self.cell(0, 8, f"Página {self.page_no()} de {{nb}}", 0, 0, "C")
+
+    pdf = MyPDF(orientation="L" if landscape else "P", unit="mm", format="A4")
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(auto=True, margin=14)  # margen inferior claro
+    pdf.add_page()
+    # fuente analizada una sola vez por proceso (compartida entre sesiones)
+    unicode_ok = resources.set_unicode_font(pdf, size=11)
+
+    # Márgenes y ancho útil
+    left = 10
+    page_w = 297 if landscape else 210
+    usable_w = page_w - 2 * left
+
+    # Logo
+    if logo_bytes:
+        try:
+            logo = resources.image_source(pdf, logo_bytes)
+            pdf.image(logo, x=left, y=10, w=max(16, min(logo_mm, 40)))
+        except Exception:
+            pass
+
+    # Título
+    pdf.set_xy(left + 45, 10)
+    pdf.set_font(pdf.font_family, "B", 12)
+    pdf.cell(0, 6, safe_text("SERVICIO LOCAL DE EDUCACIÓN PÚBLICA DE PETORCA", unicode_ok), ln=True)
+    pdf.set_x(left + 45); pdf.set_font(pdf.font_family, size=10)
+    pdf.cell(0, 5, safe_text("Rendición de Fondos Fijos P01 – SLEP Petorca", unicode_ok), ln=True)
+    pdf.set_x(left + 45)
+    pdf.cell(0, 5, safe_text(f"Fecha de emisión: {datetime.now():%Y-%m-%d %H:%M}", unicode_ok), ln=True)
+    pdf.ln(2)
+
+    def header_row(labels, widths, align="C"):
+        pdf.set_font(pdf.font_family, "B", 10)
+        for h, w in zip(labels, widths):
+            pdf.cell(w, 7, safe_text(h, unicode_ok), 1, 0, align)
+        pdf.ln(7)
+
+    def value_row(values, widths, align="L", h=8, font=""):
+        pdf.set_font(pdf.font_family, font, 10)
+        for v, w in zip(values, widths):
+            pdf.cell(w, h, safe_text("" if v is None else str(v), unicode_ok), 1, 0, align)
+        pdf.ln(h)
+
+    def ensure_space(h_needed: float):
+        available = (pdf.h - pdf.b_margin) - pdf.get_y()
+        if h_needed > available:
+            pdf.add_page()
+            # reimprimir cabecera superior (logo/título) no es imprescindible; dejamos limpio
+
+    # Primera grilla (usa ancho útil)
+    w1 = [usable_w * i for i in ([0.17, 0.20, 0.18, 0.20, 0.15, 0.10] if landscape else [0.20,0.23,0.19,0.20,0.13,0.05])]
+    pdf.set_x(left); header_row(["Tipo de Fondo","Responsable del fondo","Institución","Fecha Rendición","N° Rendición",""], w1)
+    vals1 = [meta.get("tipo_fondo",""), meta.get("responsable",""), meta.get("institucion",""),
+             meta.get("fecha_rendicion",""), meta.get("n_rendicion",""), ""]
+    pdf.set_x(left); value_row(vals1, w1)
+
+    # Fila REX
+    w2 = [usable_w * 0.5, usable_w * 0.5]
+    pdf.set_x(left); header_row(["N° REX", "Fecha REX"], w2)
+    pdf.set_x(left); value_row([meta.get("n_rex",""), meta.get("fecha_rex","")], w2, "L", 8)
+
+    # Tabla de gastos: normalizada al ancho útil + control de salto por fila
+    col_w = normalize_widths(COL_W_LANDSCAPE if landscape else COL_W_PORTRAIT, usable_w)
+
+    def print_table_header():
+        pdf.set_x(left)
+        header_row(HEADERS, col_w)
+
+    print_table_header()
+
+    if not rows:
+        pdf.set_x(left)
+        pdf.cell(sum(col_w), 7, safe_text("Sin registros", unicode_ok), 1, 0, "C"); pdf.ln(7)
+    else:
+        pdf.set_font(pdf.font_family, size=9)
+        # maquetación: cada celda se ajusta una sola vez, antes de dibujar
+        layout = layout_rows(pdf, rows_as_text(rows, unicode_ok), col_w, LINE_H)
+        for cell_lines, row_h in layout:
+            # si no cabe la fila completa, salto de página y reimprimo encabezado
+            available = (pdf.h - pdf.b_margin) - pdf.get_y()
+            if row_h > available:
+                pdf.add_page()
+                print_table_header()
+
+            pdf.set_x(left)
+            draw_wrapped_row(pdf, cell_lines, col_w, ALIGNS, line_h=LINE_H, row_h=row_h)
+
+    # Total (protegido)
+    total_h = 9
+    ensure_space(total_h + 2)
+    pdf.set_font(pdf.font_family, "B", 10)
+    pdf.set_x(left); pdf.cell(sum(col_w[:-1]), 7, safe_text("Monto Total del Gasto", unicode_ok), 1, 0, "R")
+    pdf.cell(col_w[-1], 7, money(total), 1, 0, "R")
+    pdf.ln(9)
+
+    # Egreso inicial (protegido)
+    ensure_space(18)
+    pdf.set_x(left)
+    header_row(["N° Egreso Contable Inicial del Fondo", "Fecha de Egreso Inicial del Fondo"], [usable_w*0.5, usable_w*0.5])
+    pdf.set_x(left)
+    value_row([meta.get("n_egreso_inicial",""), meta.get("fecha_egreso_inicial","")], [usable_w*0.5, usable_w*0.5], "L", 8)
+
+    # Cuadro resumen (protegido)
+    resumen = [
+        ("Saldo Inicial/Rendición Mes Anterior", parse_float(meta.get("saldo_mes_anterior", 0))),
+        ("Monto Recibido Mes anterior", parse_float(meta.get("monto_recibido_mes_anterior", 0))),
+        ("Monto Gasto del mes", total),
+        ("Monto del gasto del mes Transporte", parse_float(meta.get("monto_gasto_transporte", 0))),
+    ]
+    saldo_final = resumen[0][1] + resumen[1][1] - resumen[2][1] - resumen[3][1]
+    w_label, w_val = usable_w * 0.79, usable_w * 0.21
+    needed = 7 + len(resumen)*8 + 8 + 6  # título + filas + saldo final + respiro
+    ensure_space(needed)
+
+    pdf.set_x(left); pdf.set_font(pdf.font_family, "B", 10)
+    pdf.cell(usable_w, 7, safe_text("CUADRO RESUMEN RENDICION", unicode_ok), 1, 0, "C"); pdf.ln(7)
+    pdf.set_font(pdf.font_family, size=10)
+    for label, val in resumen:
+        pdf.set_x(left); pdf.cell(w_label, 8, safe_text(label, unicode_ok), 1, 0, "L")
+        pdf.cell(w_val, 8, money(float(val)), 1, 0, "R")
+        pdf.ln(8)
+    pdf.set_font(pdf.font_family, "B", 10)
+    pdf.set_x(left); pdf.cell(w_label, 8, safe_text("Saldo Final", unicode_ok), 1, 0, "L")
+    pdf.cell(w_val, 8, money(saldo_final), 1, 0, "R")
+    pdf.ln(10)
+
+    # ---------------- Firmas (bloque con control de salto) ----------------
+    def draw_signature_box(pdf: FPDF, x: float, y: float, w: float, title: str, key: str):
+        SIG_IMG_W = 40
+        PAD_LR = 10
+        line_y = y + 12
+        img_bytes = firmas.get(key)
+        if img_bytes:
+            try:
+                img = resources.image_source(pdf, img_bytes)
+                img_x = x + (w - SIG_IMG_W) / 2
+                pdf.image(img, x=img_x, y=y, w=SIG_IMG_W)
+                line_y = y + 22
+            except Exception:
+                pass
+        left_x = x + PAD_LR
+        right_x = x + w - PAD_LR
+        pdf.line(left_x, line_y, right_x, line_y)
+        pdf.set_xy(x, line_y + 2)
+        pdf.set_font(pdf.font_family, size=9)
+        pdf.cell(w, 5, safe_text(title, unicode_ok), 0, 0, "C")
+        return max(28.0, (line_y - y) + 9)
+
+    row_h_est = 32.0
+    exclus_h = 9.0
+    gap = 6.0
+    block_h = exclus_h + gap + row_h_est*4 + gap*3  # 4 filas (la última Jefe Adm/Fin)
+
+    ensure_space(block_h)
+
+    pdf.set_font(pdf.font_family, "B", 10)
+    pdf.set_x(left)
+    pdf.cell(usable_w, 7, safe_text("USO EXCLUSIVO SERVICIO LOCAL DE EDUCACIÓN PÚBLICA DE PETORCA", unicode_ok), 1, 0, "C")
+    pdf.ln(gap)
+
+    x_left = left
+    box_w = (usable_w - 10) / 2
+    x_right = x_left + box_w + 10
+    y = pdf.get_y()
+
+    for par in range(0, len(FIRMAS), 2):
+        if par:
+            ensure_space(row_h_est + (gap if par + 2 < len(FIRMAS) else 0))
+        alturas = [draw_signature_box(pdf, x, y, box_w, titulo, clave)
+                   for x, (clave, titulo) in zip((x_left, x_right), FIRMAS[par:par + 2])]
+        if par + 2 < len(FIRMAS):
+            y += max(alturas) + gap
+    pdf.set_y(y + row_h_est)
+
+    out = io.BytesIO()
+    pdf.output(out)
+    return out.getvalue()
+
+
+def _lista(data, rows, doc_vacio: str) -> tuple:
+    """Filas de ``model.filas`` y nombres de documento (``doc_vacio`` si no hay) de la rendición."""
+    gastos = data.get("gastos") or ()
+    rows = filas(gastos) if rows is None else rows
+    return rows, [d or doc_vacio for d in documentos(gastos)]
+
+
+def _textos(rows, docs, unicode_ok: bool) -> list:
+    """(fecha, detalle, monto, documento) como texto, de ``rows_as_text`` y los documentos."""
+    docs = docs if unicode_ok else [safe_text(d, False) for d in docs]
+    return [(r[1], r[4], r[6], d) for r, d in zip(rows_as_text(rows, unicode_ok), docs)]
+
+
+def _output(pdf) -> bytes:
+    out = io.BytesIO()
+    pdf.output(out)
+    return out.getvalue()
+
+
+def _draw_rows(pdf, layout, widths, aligns, line_h: float, font_size: int, header=None,
+               progreso: Optional[Callable] = None, paso: int = 200) -> None:
+    """Dibuja filas ya maquetadas; si una no cabe, salto de página (y ``header()``)."""
+    for i, (cell_lines, row_h) in enumerate(layout, 1):
+        if row_h > (pdf.h - pdf.b_margin) - pdf.get_y():
+            pdf.add_page()
+            if header is not None:
+                header()
+        pdf.set_x(pdf.l_margin)
+        draw_wrapped_row(pdf, cell_lines, widths, aligns, line_h=line_h, row_h=row_h, font_size=font_size)
+        if progreso is not None and i % paso == 0:
+            progreso(i, len(layout))
+
+
+def export_tabla(data, logo_bytes: Optional[bytes] = None, logo_mm: int = 30,
+                 rows: Optional[list] = None) -> bytes:
+    """Informe de app.py: A4 vertical con logo, resumen (fondo, total, saldo, cantidad) y
+    tabla Fecha / Detalle / Monto / Documento."""
+    from fpdf import FPDF
+
+    rows, docs = _lista(data, rows, "—")
+    fondo = parse_float(data.get("fondo_inicial"))
+    total = sum(r[6] for r in rows)
+    widths, aligns = [30, 100, 30, 30], ["L", "L", "R", "L"]
+
+    pdf = FPDF(orientation="P", unit="mm", format="A4")
+    pdf.add_page()
+    if logo_bytes:
+        try:
+            pdf.image(resources.image_source(pdf, logo_bytes), x=10, y=8, w=logo_mm)
+        except Exception:
+            pass
+    unicode_ok = resources.set_unicode_font(pdf, size=12)
+    pdf.cell(0, 10, safe_text(TITULO_TABLA, unicode_ok), ln=True, align="C")
+    pdf.ln(5)
+    pdf.set_font(pdf.font_family, size=10)
+    pdf.cell(0, 6, safe_text(f"Fecha de emisión: {datetime.now():%Y-%m-%d %H:%M}", unicode_ok), ln=True)
+    pdf.ln(2)
+
+    pdf.set_font(pdf.font_family, "B", 11)
+    pdf.cell(0, 7, "Resumen", ln=True)
+    pdf.set_font(pdf.font_family, size=10)
+    for label, valor in (("Fondo inicial", money(fondo)), ("Total gastos", money(total)),
+                         ("Saldo", money(fondo - total)), ("Cantidad de gastos", len(rows))):
+        pdf.cell(0, 6, f"{label}: {valor}", ln=True)
+    pdf.ln(4)
+
+    def header():
+        pdf.set_font(pdf.font_family, "B", 10)
+        for label, w in zip(("Fecha", "Detalle", "Monto", "Documento"), widths):
+            pdf.cell(w, 7, label, border=1, align="C")
+        pdf.ln()
+
+    header()
+    pdf.set_font(pdf.font_family, size=9)
+    if not rows:
+        pdf.cell(sum(widths), 7, "Sin registros", border=1, align="C")
+        pdf.ln()
+    else:
+        _draw_rows(pdf, layout_rows(pdf, _textos(rows, docs, unicode_ok), widths, 7), widths, aligns, 7, 9, header)
+    return _output(pdf)
+
+
+def export_listado(data, logo_bytes: Optional[bytes] = None, logo_mm: int = 40,
+                   rows: Optional[list] = None, progreso: Optional[Callable] = None,
+                   paso: int = 200) -> bytes:
+    """Informe de la app Kivy: A4 horizontal con logo, listado Fecha / Detalle / Monto /
+    Documento (la columna del documento tan ancha como el nombre más largo), resumen y
+    firma. ``progreso(hechos, total)`` se llama cada ``paso`` filas y al terminar."""
+    from fpdf import FPDF
+
+    rows, docs = _lista(data, rows, "")
+    fondo = parse_float(data.get("fondo_inicial"))
+    total = sum(r[6] for r in rows)
+
+    pdf = FPDF(orientation="L")
+    pdf.add_page()
+    if logo_bytes:
+        try:
+            pdf.image(resources.image_source(pdf, logo_bytes), x=10, y=8, w=logo_mm)
+        except Exception:
+            pass
+    unicode_ok = resources.set_unicode_font(pdf, size=12)
+    pdf.set_font(pdf.font_family, "B", 12)
+    pdf.cell(0, 10, TITULO_LISTADO, ln=True, align="C")
+    pdf.ln(5)
+
+    pdf.set_font(pdf.font_family, size=10)
+    textos = _textos(rows, docs, unicode_ok)
+    # el documento ocupa lo que mide el nombre más largo (cada nombre distinto se mide una
+    # vez), sin pasar del ancho restante
+    max_doc_w = pdf.w - pdf.l_margin - pdf.r_margin - 30 - 120 - 30
+    nombres = {t[3] for t in textos} | {"Documento"}
+    doc_w = min(max(text_width(pdf, d) for d in nombres) + 4, max_doc_w) if textos else max_doc_w
+    widths = [30, 120, 30, doc_w]
+    for label, w in zip(("Fecha", "Detalle", "Monto"), widths):
+        pdf.cell(w, 8, label, border=1)
+    pdf.cell(doc_w, 8, "Documento", border=1, ln=True)
+    _draw_rows(pdf, layout_rows(pdf, textos, widths, 8), widths, ["L"] * 4, 8, 10,
+               progreso=progreso, paso=paso)
+
+    pdf.ln(5)
+    pdf.cell(0, 6, "Resumen", ln=True)
+    for label, valor in (("Total Fondo Entregado", fondo), ("Total Gastos Realizados", total),
+                         ("Saldo disponible", fondo - total)):
+        pdf.cell(60, 8, label, border=1)
+        pdf.cell(40, 8, money(valor), border=1, ln=True)
+    pdf.ln(15)
+    pdf.cell(0, 6, "_____________________________", ln=True, align="L")
+    for label in ("Nombre:", "RUT:", "Cargo:"):
+        pdf.cell(0, 6, label, ln=True)
+
+    data = _output(pdf)
+    if progreso is not None:
+        progreso(len(rows), len(rows))
+    return data
@@ -0,0 +1,187 @@
+"""Maquetación de filas de tabla para los PDF: cada celda se ajusta una sola vez.
+
+El ajuste de texto (``wrap_text_lines``) se memoiza por fuente, tamaño, ancho y
+texto a nivel de proceso: proveedores, tipos de documento y fechas se repiten
+constantemente entre filas y entre exportaciones. Las medidas salen de una
+tabla de anchos de glifo por fuente (``GlyphWidths``) en vez de llamar a
+``pdf.get_string_width`` por cada prefijo candidato.
+"""
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+
+_WRAP_CACHE = {}
+_WRAP_CACHE_MAX = 50_000
+_WRAP_LOCK = threading.Lock()
+
+
+def _font_key(pdf):
+    return (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+
+
+class GlyphWidths:
+    """Avance de cada carácter de una fuente, en milésimas de em (unidades de fpdf).
+
+    Se construye una vez por fuente (TTF DejaVu o métricas core de Helvetica) a
+    partir de ``font.cw``; con enteros por carácter, el ancho de cualquier texto
+    es una suma y el punto de corte de una palabra larga se busca con ``bisect``
+    sobre los anchos acumulados.
+    """
+
+    def __init__(self, font):
+        cw = font.cw
+        if isinstance(next(iter(cw), ""), int):  # TTF: ord -> ancho
+            self.widths = {chr(code): w for code, w in cw.items()}
+        else:  # core: carácter -> ancho
+            self.widths = dict(cw)
+        factory = getattr(cw, "default_factory", None)
+        self.default = factory() if factory is not None else 0
+
+    def units(self, text: str) -> int:
+        get, default = self.widths.get, self.default
+        return sum(get(c, default) for c in text)
+
+    def prefix(self, text: str) -> list:
+        get, default = self.widths.get, self.default
+        return list(accumulate(get(c, default) for c in text))
+
+    def wrap(self, s: str, limit: float) -> list:
+        """Mismo corte que la versión medida con fpdf; ``limit`` en unidades de fuente."""
+        sp = self.units(" ")
+        lines, line, line_u = [], "", 0
+        for word in s.split(" "):
+            if not word:
+                continue
+            wu = self.units(word)
+            cand_u = wu if not line else line_u + sp + wu
+            if cand_u <= limit:
+                line = word if not line else f"{line} {word}"
+                line_u = cand_u
+                continue
+            if line:
+                lines.append(line)
+            if wu > limit:
+                pref = self.prefix(word)
+                start, base = 0, 0
+                while pref[-1] - base > limit:
+                    end = max(bisect_right(pref, base + limit, lo=start), start + 1)
+                    lines.append(word[start:end])
+                    base, start = pref[end - 1], end
+                word, wu = word[start:], pref[-1] - base
+            line, line_u = word, wu
+        if line: lines.append(line)
+        return lines or [""]
+
+
+_GLYPH_TABLES = {}
+
+
+def glyph_widths(pdf):
+    """Tabla de anchos de la fuente actual, o None si la medida no es una suma simple
+    (text shaping, espaciado o estiramiento de caracteres, fuentes de símbolos)."""
+    font = pdf.current_font
+    if (font is None or getattr(font, "is_symbol", False) or getattr(pdf, "text_shaping", None)
+            or pdf.char_spacing or pdf.font_stretching != 100):
+        return None
+    key = (font.fontkey, str(getattr(font, "ttffile", "")))
+    table = _GLYPH_TABLES.get(key)
+    if table is None:
+        table = _GLYPH_TABLES[key] = GlyphWidths(font)
+    return table
+
+
+def text_width(pdf, text: str) -> float:
+    """Ancho de ``text`` en unidades de ``pdf`` con la fuente actual, sumado desde la tabla
+    de glifos (``pdf.get_string_width`` si la fuente no admite la suma simple)."""
+    table = glyph_widths(pdf)
+    if table is None:
+        return pdf.get_string_width(text)
+    return table.units(text) * pdf.font_size_pt * 0.001 / pdf.k
+
+
+def _wrap(pdf, s: str, max_w: float) -> list:
+    table = glyph_widths(pdf)
+    if table is None:
+        return _wrap_measured(pdf, s, max_w)
+    return table.wrap(s, max_w * pdf.k / (pdf.font_size_pt * 0.001))
+
+
+def _wrap_measured(pdf, s: str, max_w: float) -> list:
+    lines, line = [], ""
+
+    def fits(t: str) -> bool:
+        return pdf.get_string_width(t) <= max_w
+
+    for word in s.split(" "):
+        candidate = f"{line} {word}".strip()
+        if fits(candidate):
+            line = candidate
+            continue
+        if line:
+            lines.append(line); line = ""
+        w = word
+        while not fits(w) and w:
+            lo, hi, best = 1, len(w), 1
+            while lo <= hi:
+                mid = (lo + hi)//2
+                if fits(w[:mid]): best = mid; lo = mid+1
+                else: hi = mid-1
+            lines.append(w[:best]); w = w[best:]
+        line = w
+    if line: lines.append(line)
+    return lines or [""]
+
+
+def wrap_text_lines(pdf, text, width_mm: float, pad: float = 1.5) -> tuple:
+    """Divide ``text`` en líneas que caben en ``width_mm`` con la fuente actual de ``pdf``.
+
+    Devuelve una tupla compartida desde la caché: no modificarla.
+    """
+    if text is None: return ("",)
+    s = str(text)
+    max_w = max(1.0, width_mm - pad*2)
+    key = (_font_key(pdf), max_w, s)
+    lines = _WRAP_CACHE.get(key)
+    if lines is None:
+        lines = tuple(_wrap(pdf, s, max_w))
+        with _WRAP_LOCK:
+            if len(_WRAP_CACHE) >= _WRAP_CACHE_MAX:
+                _WRAP_CACHE.clear()
+            _WRAP_CACHE[key] = lines
+    return lines
+
+
+def clear_wrap_cache() -> None:
+    with _WRAP_LOCK:
+        _WRAP_CACHE.clear()
+
+
+def layout_rows(pdf, rows, widths, line_h: float = 5.2) -> list:
+    """Etapa de maquetación: ``[(lineas_por_celda, alto_fila), ...]`` con la fuente actual.
+
+    Se evalúa completa antes de dibujar, porque el dibujo cambia de fuente al
+    reimprimir encabezados tras un salto de página.
+    """
+    out = []
+    for values in rows:
+        cells = [wrap_text_lines(pdf, v, w) for v, w in zip(values, widths)]
+        out.append((cells, max(len(c) for c in cells) * line_h))
+    return out
+
+
+def draw_wrapped_row(pdf, cell_lines, widths, aligns, line_h=5.2, row_h=None, font_size=9):
+    """Dibuja una fila ya maquetada sin permitir saltos internos; comprobar el espacio antes."""
+    pdf.set_font(pdf.font_family, size=font_size)
+    x0 = pdf.get_x(); y0 = pdf.get_y()
+    if row_h is None:
+        row_h = max(len(ls) for ls in cell_lines) * line_h
+    # Las líneas ya vienen cortadas: una celda simple por línea y el borde como
+    # rectángulo (mismo resultado que multi_cell, sin volver a partir el texto).
+    for txt_lines, w, a in zip(cell_lines, widths, aligns):
+        x = pdf.get_x(); y = pdf.get_y()
+        pdf.rect(x, y, w, len(txt_lines) * line_h)
+        for i, line in enumerate(txt_lines):
+            pdf.set_xy(x, y + i * line_h)
+            pdf.cell(w, line_h, line, border=0, align=a)
+        pdf.set_xy(x + w, y)
+    pdf.set_xy(x0, y0 + row_h)
@@ -0,0 +1,151 @@
+"""Recursos de PDF compartidos por todo el proceso: fuentes TTF ya analizadas e imágenes decodificadas.
+
+Cada exportación creaba su propio ``FPDF``, volvía a buscar DejaVuSans en disco,
+la analizaba con ``add_font`` (dos veces, "" y "B") y decodificaba de nuevo el
+logo y las firmas. Aquí cada recurso se prepara una sola vez por proceso (es
+decir, para todas las sesiones de Streamlit) y cada documento recibe una copia
+con su propio estado por documento (índice, subconjunto de glifos, usos).
+
+Ambas cachés arman a mano objetos internos de fpdf2 (``TTFFont``, la info de
+imagen de ``preload_image``), validados con fpdf2 2.8; ``requirements.txt``
+fija ese tope y ``tests/test_resources.py`` comprueba que una exportación con
+caché sea idéntica byte a byte a una sin ella. Si otra versión no expone lo
+esperado (módulo, atributo o firma distintos) se vuelve al camino normal
+(``add_font`` / ``image`` con los bytes).
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+UNICODE_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/local/share/fonts/DejaVuSans.ttf",
+    "fonts/DejaVuSans.ttf",
+)
+
+_LOCK = threading.Lock()
+_FONT_PATH = []          # [ruta o None] una vez resuelta
+_FONT_PROTOS = {}        # (ruta, estilo) -> (TTFFont de referencia, bytes del archivo)
+_IMAGES = OrderedDict()  # sha256 -> (info de imagen de fpdf sin estado por documento, perfil ICC)
+_IMAGES_MAX = 64
+
+# Lo que lanza una versión de fpdf2 cuyos internos no son los esperados
+_FPDF_MISMATCH = (ImportError, AttributeError, TypeError, KeyError)
+
+# Atributos de TTFFont que son propios de cada documento
+_PER_DOCUMENT = {"i", "ttfont", "subset", "missing_glyphs", "biggest_size_pt", "_hbfont"}
+
+
+def unicode_font_path():
+    """Primera DejaVuSans disponible, buscada una sola vez por proceso (None si no hay)."""
+    if not _FONT_PATH:
+        found = next((p for p in UNICODE_FONT_CANDIDATES if os.path.exists(p)), None)
+        _FONT_PATH.append(found)
+    return _FONT_PATH[0]
+
+
+def _font_proto(path: str, style: str):
+    key = (path, style)
+    proto = _FONT_PROTOS.get(key)
+    if proto is None:
+        from fpdf import FPDF
+        with _LOCK:
+            proto = _FONT_PROTOS.get(key)
+            if proto is None:
+                scratch = FPDF()
+                scratch.add_font("proto", style, path)
+                with open(path, "rb") as f:
+                    data = f.read()
+                proto = _FONT_PROTOS[key] = (scratch.fonts["proto" + style], data)
+    return proto
+
+
+def add_cached_font(pdf, family: str, style: str, path: str) -> None:
+    """Equivalente a ``pdf.add_font(family, style, path)`` reutilizando el análisis del TTF.
+
+    Las métricas (anchos, cmap, descriptor) se comparten; el ``TTFFont`` de
+    fontTools se vuelve a abrir (en modo perezoso, desde memoria) porque fpdf lo
+    recorta en sitio al generar el subconjunto de glifos del documento.
+    """
+    fontkey = f"{family.lower()}{style}"
+    if fontkey in pdf.fonts:
+        return
+    try:
+        from fontTools import ttLib
+        from fpdf.fonts import SubsetMap, TTFFont
+
+        proto, data = _font_proto(path, style)
+        font = TTFFont.__new__(TTFFont)
+        for attr in TTFFont.__slots__:
+            if attr not in _PER_DOCUMENT and hasattr(proto, attr):
+                setattr(font, attr, getattr(proto, attr))
+        font.fontkey = fontkey
+        font.i = len(pdf.fonts) + 1
+        font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+        font.missing_glyphs = []
+        font.biggest_size_pt = 0
+        font._hbfont = None
+        font.subset = SubsetMap(font)
+    except _FPDF_MISMATCH:
+        pdf.add_font(family, style, path)
+        return
+    pdf.fonts[fontkey] = font
+
+
+def set_unicode_font(pdf, size: float = 11) -> bool:
+    """Registra DejaVu ("" y "B") desde la caché y la deja activa; Helvetica si no está instalada."""
+    path = unicode_font_path()
+    if path is None:
+        pdf.set_font("Helvetica", size=size)  # fallback sin Unicode
+        return False
+    add_cached_font(pdf, "DejaVu", "", path)
+    add_cached_font(pdf, "DejaVu", "B", path)
+    pdf.set_font("DejaVu", size=size)
+    return True
+
+
+def _image_template(img_bytes: bytes, digest: str):
+    with _LOCK:
+        hit = _IMAGES.get(digest)
+        if hit is not None:
+            _IMAGES.move_to_end(digest)
+            return hit
+    from fpdf.image_datastructures import ImageCache
+    from fpdf.image_parsing import preload_image
+
+    scratch = ImageCache()
+    _, _, info = preload_image(scratch, io.BytesIO(img_bytes))
+    info = type(info)(info)
+    for k in ("i", "usages", "iccp_i"):
+        info.pop(k, None)
+    icc = next(iter(scratch.icc_profiles), None)
+    with _LOCK:
+        _IMAGES[digest] = (info, icc)
+        while len(_IMAGES) > _IMAGES_MAX:
+            _IMAGES.popitem(last=False)
+    return info, icc
+
+
+def image_source(pdf, img_bytes: bytes):
+    """Lo que hay que pasar a ``pdf.image``: el nombre de una imagen ya decodificada
+    e inscrita en el documento, o los bytes tal cual si no se pudo usar la caché."""
+    digest = "img-" + hashlib.sha256(img_bytes).hexdigest()
+    cache = pdf.image_cache
+    if digest in cache.images:
+        return digest
+    try:
+        template, icc = _image_template(img_bytes, digest)
+        if "data" not in template:  # imágenes vectoriales: camino normal
+            return io.BytesIO(img_bytes)
+        info = type(template)(template)
+        info["i"] = len(cache.images) + 1
+        info["usages"] = 0
+        info["iccp_i"] = None
+        if icc is not None:
+            info["iccp_i"] = cache.icc_profiles.setdefault(icc, len(cache.icc_profiles))
+        cache.images[digest] = info
+        return digest
+    except _FPDF_MISMATCH:
+        return io.BytesIO(img_bytes)
@@ -0,0 +1,289 @@
+"""Piezas comunes de las dos apps Streamlit (``app.py`` y ``streamlit_app.py``).
+
+Estado de la sesión enlazado a la base compartida (abrir / sincronizar la
+rendición activa, totales y duplicados incrementales, la tabla de gastos en
+caché), las exportaciones bajo demanda y la lista de documentos adjuntos.
+Cada app conserva solo lo propio: sus columnas, sus informes y su interfaz.
+
+Importa Streamlit y pandas, así que solo lo cargan las apps, nunca la línea de
+comandos ni la app Kivy (por eso tampoco se reexporta en ``rendicion``).
+"""
+import hashlib
+import json
+import os
+from typing import Callable, List, Optional
+
+import pandas as pd
+import streamlit as st
+
+from . import attachments, storage
+from .columnar import GastosTable
+from .duplicates import DuplicateIndex
+from .ledger import GastosLedger
+from .model import parse_float
+
+DOCS_POR_PAGINA = 10
+
+
+# ---------- Rendición activa ----------
+def repo() -> storage.Repository:
+    """Base SQLite compartida por todas las sesiones (fuente de verdad de los datos)."""
+    return storage.default_repository()
+
+
+def abrir_rendicion(rid: int, frame_builder: Callable) -> dict:
+    """Carga en la sesión solo los gastos de la rendición ``rid``; las demás quedan en la base.
+    Devuelve lo leído (``{"fondo_inicial", "meta", "gastos"}``) para que la app tome lo suyo."""
+    st.session_state.revision = repo().revision(rid)  # antes de leer: una escritura intermedia fuerza otra lectura
+    data = repo().load(rid)
+    gastos = GastosTable(data["gastos"])  # por columnas: mucho menos memoria por sesión
+    st.session_state.data = {"fondo_inicial": float(data["fondo_inicial"]), "gastos": gastos}
+    st.session_state.rendicion_id = rid
+    set_frame(frame_builder(gastos))
+    st.session_state.ledger = None
+    st.session_state.dup_index = None
+    st.session_state.exports = {}
+    return data
+
+
+def sincronizar(reabrir: Callable[[Optional[int]], None]) -> None:
+    """Si otra sesión (u otra app, o la CLI) escribió en la rendición activa, llama
+    ``reabrir(rid)`` para volver a leerla; ``reabrir(None)`` si ya no existe."""
+    rid = st.session_state.rendicion_id
+    rev = repo().revision(rid)
+    if rev is None:
+        reabrir(None)
+    elif rev != st.session_state.get("revision"):
+        reabrir(rid)
+
+
+def escrito() -> None:
+    """Tras una escritura propia (que sube la revisión en 1): la copia de la sesión sigue al
+    día solo si nadie más escribió entre medio; si no, se relee en el próximo rerun."""
+    esperada = (st.session_state.get("revision") or 0) + 1
+    st.session_state.revision = esperada if repo().revision(st.session_state.rendicion_id) == esperada else None
+
+
+# ---------- Tabla de gastos ----------
+def frame_from_gastos(gastos, columnas, start: Optional[int] = None) -> pd.DataFrame:
+    """Tabla para mostrar los gastos. ``columnas`` es ``[(título, clave, vacío)]``: "fecha" pasa
+    a fecha, "monto" a número y las demás se rellenan con ``vacío``. Con ``start`` se antepone
+    la columna "N", numerada desde ahí."""
+    claves = [clave for _, clave, _ in columnas]
+    df = gastos.to_frame(claves) if isinstance(gastos, GastosTable) else pd.DataFrame(gastos)
+    if df.empty:
+        return df
+    df = df.reindex(columns=claves)  # las filas leídas de la base omiten las columnas vacías
+    nuevas = {} if start is None else {"N": pd.RangeIndex(start, start + len(df))}
+    for titulo, clave, vacio in columnas:
+        if clave == "fecha":
+            nuevas[titulo] = pd.to_datetime(df[clave]).dt.date
+        elif clave == "monto":
+            nuevas[titulo] = pd.to_numeric(df[clave], errors="coerce").fillna(0.0)
+        else:
+            nuevas[titulo] = df[clave].fillna(vacio)
+    return df.assign(**nuevas)[list(nuevas)]
+
+
+def set_frame(df: pd.DataFrame) -> None:
+    st.session_state.gastos_version = st.session_state.get("gastos_version", 0) + 1
+    st.session_state.gastos_frame = (st.session_state.gastos_version, df)
+
+
+def current_frame() -> Optional[pd.DataFrame]:
+    """Tabla en caché si sigue al día con la lista de gastos; None si hay que reconstruirla."""
+    cache = st.session_state.get("gastos_frame")
+    if cache is None or cache[0] != st.session_state.get("gastos_version"):
+        return None
+    if len(cache[1]) != len(st.session_state.data["gastos"]):
+        return None
+    return cache[1]
+
+
+def gastos_df(frame_builder: Callable) -> pd.DataFrame:
+    """Tabla de gastos compartida por todos los consumidores del rerun (no modificarla en sitio)."""
+    df = current_frame()
+    if df is None:
+        df = frame_builder(st.session_state.data["gastos"])
+        set_frame(df)
+    return df
+
+
+def ledger() -> GastosLedger:
+    """Totales acumulados de la sesión; se reconstruyen solo si la lista cambió por fuera."""
+    lg = st.session_state.get("ledger")
+    gastos = st.session_state.data["gastos"]
+    if lg is None or lg.cantidad != len(gastos):
+        lg = GastosLedger(parse_float(st.session_state.data.get("fondo_inicial")), gastos,
+                          source=lambda: st.session_state.data["gastos"])
+        st.session_state.ledger = lg
+    return lg
+
+
+def dup_index() -> DuplicateIndex:
+    """Claves de documento de los gastos de la sesión, para avisar duplicados al registrar."""
+    idx = st.session_state.get("dup_index")
+    if idx is None or idx.cantidad != len(st.session_state.data["gastos"]):
+        idx = DuplicateIndex(st.session_state.data["gastos"])
+        st.session_state.dup_index = idx
+    return idx
+
+
+def totals():
+    lg = ledger()
+    lg.set_fondo(parse_float(st.session_state.data.get("fondo_inicial")))
+    return lg.totals()
+
+
+def agregar_gasto(g: dict, frame_builder: Callable) -> list:
+    """Guarda ``g`` en la rendición activa y lo suma a la copia de la sesión (lista, totales,
+    duplicados y tabla). Devuelve sus coincidencias con gastos ya registrados."""
+    g["id"] = repo().add_gasto(st.session_state.rendicion_id, g)
+    escrito()
+    df = current_frame()
+    lg = ledger()
+    dups = dup_index()
+    st.session_state.data["gastos"].append(g)
+    lg.add(g)
+    avisos = dups.add(g)
+    if df is not None:
+        row = frame_builder([g], start=len(df) + 1)
+        set_frame(row if df.empty else pd.concat([df, row], ignore_index=True))
+    return avisos
+
+
+def quitar_gastos(indices: List[int]) -> None:
+    """Borra de la base y de la sesión los gastos en esas posiciones de la lista."""
+    df = current_frame()
+    lg = ledger()
+    dups = dup_index()
+    gastos = st.session_state.data["gastos"]
+    valid = sorted({idx for idx in indices if 0 <= idx < len(gastos)}, reverse=True)  # de atrás hacia adelante
+    if valid:
+        repo().delete_gastos([gastos[idx]["id"] for idx in valid])
+        escrito()
+    for idx in valid:
+        g = gastos.pop(idx)
+        lg.remove(g)
+        dups.remove(g)
+    if df is not None and valid:
+        df = df.drop(index=valid).reset_index(drop=True)
+        if "N" in df.columns:
+            df["N"] = pd.RangeIndex(1, len(df) + 1)
+        set_frame(df)
+
+
+# ---------- Exportaciones bajo demanda ----------
+def export_fingerprint(kind: str, opts=(), images: bool = True) -> str:
+    """Huella del contenido que alimenta una exportación (datos, meta, opciones y, si aplica,
+    logo y firmas); cambia solo si cambia el contenido."""
+    data = st.session_state.data
+    h = hashlib.sha256()
+    h.update(json.dumps([kind, list(opts), data.get("fondo_inicial"), data.get("meta", {})],
+                        sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    gastos = data["gastos"]
+    # columna a columna, todas: las filas de otra app traen las suyas (p. ej. "descripcion" de Kivy)
+    for k in sorted(gastos.keys()):
+        h.update(json.dumps([k, gastos.column(k)], ensure_ascii=False, default=str).encode("utf-8"))
+    if images:
+        for b in [st.session_state.logo_bytes, *st.session_state.get("firmas", {}).values()]:
+            h.update(hashlib.sha256(b).digest() if b else b"-")
+    return h.hexdigest()
+
+
+def cached_export(kind: str, fingerprint: str):
+    hit = st.session_state.exports.get(kind)
+    if hit is not None and hit[0] == fingerprint:
+        return hit[1]
+    return None
+
+
+def export_button(label: str, kind: str, builder, opts=(), *, file_name: str, mime: str, images: bool = True):
+    """Muestra "Generar" y solo construye el archivo (``builder(*opts)``) al pedirlo; con datos
+    sin cambios reutiliza los bytes ya generados."""
+    fp = export_fingerprint(kind, opts, images)
+    data = cached_export(kind, fp)
+    if data is None and st.button(f"Generar {label}", key=f"gen_{kind}"):
+        data = builder(*opts)
+        st.session_state.exports[kind] = (fp, data)
+    if data is not None:
+        st.download_button(f"Descargar {label}", data=data, file_name=file_name, mime=mime, key=f"dl_{kind}")
+    elif kind in st.session_state.exports:
+        st.caption(f"Los datos cambiaron: vuelve a generar el {label}.")
+
+
+# ---------- Documentos adjuntos ----------
+def file_size(n: int) -> str:
+    if n < 1024:
+        return f"{n} B"
+    if n < 1024**2:
+        return f"{n/1024:.1f} KB"
+    return f"{n/1024**2:.1f} MB"
+
+
+def _preparar_doc(i: int, ref: str):
+    st.session_state.doc_listo = (i, ref)
+
+
+def _doc_entregado():
+    st.session_state.pop("doc_listo", None)
+
+
+def _preparar_zip(items):
+    st.session_state.docs_zip = attachments.default_store().build_zip(items)
+
+
+def _zip_entregado():
+    st.session_state.pop("docs_zip", None)
+
+
+def documentos_adjuntos():
+    """Lista paginada y filtrable; los bytes de un documento se leen del almacén solo
+    cuando se pide esa descarga (o el ZIP con todos)."""
+    store = attachments.default_store()
+    docs = [(i, g) for i, g in enumerate(st.session_state.data["gastos"]) if g.get("nombre_doc")]
+    if not docs:
+        st.caption("No hay documentos adjuntos aún.")
+        return
+
+    zip_items = [(f"{i+1:03d}_{g['nombre_doc']}", g["ref_doc"]) for i, g in docs if store.exists(g.get("ref_doc"))]
+    if zip_items:
+        zip_path = store.zip_path(zip_items)
+        if st.session_state.get("docs_zip") == zip_path and os.path.exists(zip_path):
+            with open(zip_path, "rb") as f:
+                st.download_button(f"Descargar ZIP ({len(zip_items)} documentos)", data=f,
+                                   file_name="documentos_adjuntos.zip", mime="application/zip",
+                                   key="dl_docs_zip", on_click=_zip_entregado)
+        else:
+            st.button(f"Preparar ZIP con todos los adjuntos ({len(zip_items)})", key="gen_docs_zip",
+                      on_click=_preparar_zip, args=(zip_items,))
+
+    colf, colp = st.columns([3, 1])
+    with colf:
+        filtro = st.text_input("Filtrar por nombre, detalle o proveedor", key="docs_filtro").strip().lower()
+    if filtro:
+        docs = [(i, g) for i, g in docs
+                if filtro in " ".join(str(g.get(k) or "") for k in ("nombre_doc", "detalle", "proveedor")).lower()]
+    paginas = max(1, -(-len(docs) // DOCS_POR_PAGINA))
+    if st.session_state.get("docs_pagina", 1) > paginas:
+        st.session_state.docs_pagina = paginas
+    with colp:
+        pagina = int(st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key="docs_pagina"))
+    if not docs:
+        st.caption("Ningún documento coincide con el filtro.")
+        return
+
+    listo = st.session_state.get("doc_listo")
+    for i, g in docs[(pagina - 1) * DOCS_POR_PAGINA: pagina * DOCS_POR_PAGINA]:
+        ref = g.get("ref_doc")
+        c1, c2 = st.columns([4, 1])
+        if not store.exists(ref):
+            c1.caption(f"{i+1}. {g['nombre_doc']} (no embebido)")
+            continue
+        c1.write(f"{i+1}. {g['nombre_doc']} — {g.get('proveedor') or g.get('detalle', '')} ({file_size(store.size(ref))})")
+        with c2:
+            if listo == (i, ref):
+                st.download_button("Descargar", data=store.read(ref), file_name=g["nombre_doc"],
+                                   key=f"dl_doc_{i}", on_click=_doc_entregado)
+            else:
+                st.button("Preparar", key=f"prep_doc_{i}", on_click=_preparar_doc, args=(i, ref))
@@ -0,0 +1,446 @@
+"""Almacenamiento SQLite compartido por las tres interfaces (Kivy y las dos apps Streamlit).
+
+Una base guarda muchas rendiciones (tabla ``rendiciones``, identificadas por
+una ``clave``) y sus gastos (tabla ``gastos``), con índices por rendición +
+fecha, tipo de documento, proveedor y N° de documento, de modo que listar,
+filtrar y totalizar son consultas indexadas y no hace falta cargar todo en
+memoria. La base usa WAL: las lecturas no bloquean a la escritura.
+
+Los gastos se devuelven como los diccionarios que ya usan las apps: las
+columnas conocidas (``GASTO_COLUMNS``) más cualquier otra clave (p. ej.
+``descripcion``/``documento`` de la app Kivy), guardada como JSON en ``extra``.
+Una columna en NULL significa que la clave no estaba en el diccionario. Cada
+gasto leído trae además su ``id``.
+
+Cada rendición guarda además su resumen (``total`` y ``cantidad`` de gastos),
+mantenido por triggers en cada alta, edición o baja: el panel de todas las
+rendiciones lee solo la tabla ``rendiciones``, sin recorrer los gastos. Su
+``revision`` sube en 1 con cada escritura del repositorio (gastos, fondo o
+meta): una sesión que guarda una copia en memoria la compara para saber si
+otra sesión, otra app o la línea de comandos la cambió.
+
+La ruta por defecto se toma de ``RENDICION_DB`` (o ``rendicion.db``).
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .journal import JournalStore
+
+ENV_DB = "RENDICION_DB"
+DB_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+GASTO_COLUMNS = ("fecha", "monto", "tipo_doc", "n_doc", "detalle", "proveedor", "nombre_doc", "ref_doc")
+# Datos de la meta copiados a columnas propias para listar rendiciones sin decodificar JSON
+META_COLUMNS = ("n_rendicion", "mes_que_rinde", "responsable")
+
+SCHEMA_VERSION = 3
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rendiciones (
+    id            INTEGER PRIMARY KEY,
+    clave         TEXT NOT NULL UNIQUE,
+    fondo_inicial REAL NOT NULL DEFAULT 0,
+    meta          TEXT NOT NULL DEFAULT '{}',
+    n_rendicion   TEXT,
+    mes_que_rinde TEXT,
+    responsable   TEXT,
+    actualizada   TEXT,
+    total         REAL NOT NULL DEFAULT 0,
+    cantidad      INTEGER NOT NULL DEFAULT 0,
+    revision      INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS gastos (
+    id           INTEGER PRIMARY KEY,
+    rendicion_id INTEGER NOT NULL REFERENCES rendiciones(id) ON DELETE CASCADE,
+    fecha        TEXT,
+    monto        REAL,
+    tipo_doc     TEXT,
+    n_doc        TEXT,
+    detalle      TEXT,
+    proveedor    TEXT,
+    nombre_doc   TEXT,
+    ref_doc      TEXT,
+    extra        TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_gastos_rendicion_fecha ON gastos(rendicion_id, fecha);
+CREATE INDEX IF NOT EXISTS ix_gastos_rendicion_tipo ON gastos(rendicion_id, tipo_doc);
+CREATE INDEX IF NOT EXISTS ix_gastos_rendicion_proveedor ON gastos(rendicion_id, proveedor);
+CREATE INDEX IF NOT EXISTS ix_gastos_rendicion_ndoc ON gastos(rendicion_id, n_doc);
+CREATE INDEX IF NOT EXISTS ix_rendiciones_n ON rendiciones(n_rendicion);
+CREATE INDEX IF NOT EXISTS ix_rendiciones_mes ON rendiciones(mes_que_rinde);
+CREATE INDEX IF NOT EXISTS ix_rendiciones_responsable ON rendiciones(responsable);
+"""
+# Resumen por rendición al día con cada cambio en gastos
+TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS tr_gastos_alta AFTER INSERT ON gastos BEGIN
+    UPDATE rendiciones SET total = total + COALESCE(NEW.monto, 0), cantidad = cantidad + 1
+    WHERE id = NEW.rendicion_id;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_gastos_baja AFTER DELETE ON gastos BEGIN
+    UPDATE rendiciones SET total = total - COALESCE(OLD.monto, 0), cantidad = cantidad - 1
+    WHERE id = OLD.rendicion_id;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_gastos_edicion AFTER UPDATE OF monto, rendicion_id ON gastos BEGIN
+    UPDATE rendiciones SET total = total - COALESCE(OLD.monto, 0), cantidad = cantidad - 1
+    WHERE id = OLD.rendicion_id;
+    UPDATE rendiciones SET total = total + COALESCE(NEW.monto, 0), cantidad = cantidad + 1
+    WHERE id = NEW.rendicion_id;
+END;
+"""
+RESUMEN_COLUMNS = ("total", "cantidad")
+
+
+def clave_rendicion(n_rendicion="", mes_que_rinde="", responsable="") -> str:
+    """Clave única de una rendición a partir de su N°, mes y responsable."""
+    return " / ".join(str(x or "").strip() for x in (n_rendicion, mes_que_rinde, responsable))
+
+
+def default_path() -> str:
+    return os.environ.get(ENV_DB) or "rendicion.db"
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _gasto_params(gasto: dict) -> tuple:
+    extra = {k: v for k, v in gasto.items() if k not in GASTO_COLUMNS and k != "id"}
+    values = []
+    for col in GASTO_COLUMNS:
+        v = gasto.get(col)
+        if col == "fecha" and v is not None and not isinstance(v, str):
+            v = v.isoformat()
+        values.append(v)
+    return (*values, json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _gasto_from_row(row) -> dict:
+    g = {col: row[col] for col in GASTO_COLUMNS if row[col] is not None}
+    if row["extra"]:
+        g.update(json.loads(row["extra"]))
+    g["id"] = row["id"]
+    return g
+
+
+class Repository:
+    """Acceso a rendiciones y gastos; una conexión por repositorio, protegida con un lock."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = str(path or default_path())
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            self._conn.executescript(SCHEMA)
+            self._migrate(version)
+            self._conn.executescript(TRIGGERS)
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def _migrate(self, version: int) -> None:
+        if version >= SCHEMA_VERSION:
+            return
+        cols = {r["name"] for r in self._conn.execute("PRAGMA table_info(rendiciones)")}
+        with self._conn:
+            if "total" not in cols:  # base de la versión 1: se agregan y calculan los resúmenes
+                self._conn.execute("ALTER TABLE rendiciones ADD COLUMN total REAL NOT NULL DEFAULT 0")
+                self._conn.execute("ALTER TABLE rendiciones ADD COLUMN cantidad INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE rendiciones SET "
+                                   "total = (SELECT COALESCE(SUM(monto), 0) FROM gastos WHERE rendicion_id = rendiciones.id), "
+                                   "cantidad = (SELECT COUNT(*) FROM gastos WHERE rendicion_id = rendiciones.id)")
+            if "revision" not in cols:  # versión 2: contador de escrituras por rendición
+                self._conn.execute("ALTER TABLE rendiciones ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _touch(self, rid: int) -> None:
+        """Marca la escritura en la rendición: fecha de actualización y ``revision`` + 1."""
+        self._conn.execute("UPDATE rendiciones SET actualizada=?, revision=revision+1 WHERE id=?", (_now(), rid))
+
+    def _touch_gasto(self, gid: int) -> None:
+        self._conn.execute("UPDATE rendiciones SET actualizada=?, revision=revision+1 "
+                           "WHERE id=(SELECT rendicion_id FROM gastos WHERE id=?)", (_now(), gid))
+
+    # ---------- rendiciones ----------
+    def rendicion_id(self, clave: str, create: bool = True) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM rendiciones WHERE clave=?", (clave,)).fetchone()
+            if row is not None:
+                return row["id"]
+            if not create:
+                return None
+            with self._conn:
+                cur = self._conn.execute("INSERT INTO rendiciones (clave, actualizada) VALUES (?, ?)", (clave, _now()))
+            return cur.lastrowid
+
+    def rendicion_por_meta(self, meta: dict, create: bool = True) -> Optional[int]:
+        """Id de la rendición con ese N°, mes y responsable, buscados en las columnas que
+        ``set_meta`` mantiene al día (la clave no cambia al editar la meta). Si no hay y
+        ``create``, la crea con esa meta y una clave libre."""
+        valores = [str(meta.get(k) or "").strip() for k in META_COLUMNS]
+        where = " AND ".join(f"TRIM(COALESCE({k}, ''))=?" for k in META_COLUMNS)
+        with self._lock:
+            row = self._conn.execute(f"SELECT id FROM rendiciones WHERE {where} ORDER BY id LIMIT 1", valores).fetchone()
+            if row is not None:
+                return row["id"]
+            if not create:
+                return None
+            # la clave natural puede estar tomada por una rendición cuya meta se editó después
+            base = clave = clave_rendicion(*valores)
+            n = 2
+            while self.rendicion_id(clave, create=False) is not None:
+                clave, n = f"{base} ({n})", n + 1
+            rid = self.rendicion_id(clave)
+            self.set_meta(rid, meta)
+            return rid
+
+    def rendiciones(self) -> list:
+        """Rendiciones guardadas con su resumen precalculado (``total``, ``cantidad``,
+        ``saldo``), sin leer sus gastos; las más recientes primero."""
+        rows = self._query("SELECT id, clave, n_rendicion, mes_que_rinde, responsable, fondo_inicial, "
+                           "total, cantidad, fondo_inicial - total AS saldo, actualizada "
+                           "FROM rendiciones ORDER BY actualizada DESC, id DESC")
+        return [dict(r) for r in rows]
+
+    def revision(self, rid: int) -> Optional[int]:
+        """Contador de escrituras de la rendición (None si ya no existe). Cada llamada
+        que escribe en ella (``add_gasto``, ``delete_gastos``, ``set_fondo``, ...) lo sube en 1."""
+        row = self._query("SELECT revision FROM rendiciones WHERE id=?", (rid,))
+        return row[0][0] if row else None
+
+    def load(self, rid: int) -> dict:
+        """``{"fondo_inicial", "meta", "gastos"}`` de la rendición, gastos en orden de alta."""
+        row = self._query("SELECT fondo_inicial, meta FROM rendiciones WHERE id=?", (rid,))
+        if not row:
+            raise KeyError(f"No existe la rendición {rid}")
+        return {"fondo_inicial": row[0]["fondo_inicial"], "meta": json.loads(row[0]["meta"] or "{}"),
+                "gastos": self.gastos(rid)}
+
+    def set_fondo(self, rid: int, monto: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE rendiciones SET fondo_inicial=? WHERE id=?", (float(monto or 0), rid))
+            self._touch(rid)
+
+    def set_meta(self, rid: int, meta: dict) -> None:
+        """Guarda la meta y copia N°, mes y responsable a sus columnas; la clave se mantiene
+        (con ella abren la rendición las otras apps), así que para buscar una rendición por
+        esos datos está ``rendicion_por_meta``."""
+        cols = [str(meta.get(k) or "") for k in META_COLUMNS]
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE rendiciones SET meta=?, n_rendicion=?, mes_que_rinde=?, responsable=? WHERE id=?",
+                               (json.dumps(meta, ensure_ascii=False, default=str), *cols, rid))
+            self._touch(rid)
+
+    def delete_rendicion(self, rid: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rendiciones WHERE id=?", (rid,))
+
+    # ---------- gastos ----------
+    _INSERT = (f"INSERT INTO gastos (rendicion_id, {', '.join(GASTO_COLUMNS)}, extra) "
+               f"VALUES (?, {', '.join('?' * len(GASTO_COLUMNS))}, ?)")
+
+    def add_gasto(self, rid: int, gasto: dict) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(self._INSERT, (rid, *_gasto_params(gasto)))
+            self._touch(rid)
+        return cur.lastrowid
+
+    def _insert_many(self, rid: int, gastos) -> list:
+        ids = [self._conn.execute(self._INSERT, (rid, *_gasto_params(g))).lastrowid for g in gastos]
+        self._touch(rid)
+        return ids
+
+    def add_gastos(self, rid: int, gastos) -> list:
+        with self._lock, self._conn:
+            return self._insert_many(rid, gastos)
+
+    def replace_gastos(self, rid: int, gastos) -> list:
+        """Reemplaza todos los gastos de la rendición (importaciones); devuelve los ids nuevos."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM gastos WHERE rendicion_id=?", (rid,))
+            return self._insert_many(rid, gastos)
+
+    def import_gastos(self, rid: int, gastos, replace: bool = True) -> int:
+        """Inserta los gastos de un iterable (p. ej. ``importer.StreamImport``) sin armar una
+        lista, en una sola transacción: si el iterable falla, la rendición queda como estaba."""
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute("DELETE FROM gastos WHERE rendicion_id=?", (rid,))
+            cur = self._conn.executemany(self._INSERT, ((rid, *_gasto_params(g)) for g in gastos))
+            self._touch(rid)
+        return max(cur.rowcount, 0)
+
+    def update_gasto(self, gid: int, gasto: dict) -> None:
+        sets = ", ".join(f"{c}=?" for c in GASTO_COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE gastos SET {sets}, extra=? WHERE id=?", (*_gasto_params(gasto), gid))
+            self._touch_gasto(gid)
+
+    def delete_gastos(self, ids) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._touch_gasto(ids[0])
+            self._conn.executemany("DELETE FROM gastos WHERE id=?", [(i,) for i in ids])
+
+    # ---------- consultas ----------
+    @staticmethod
+    def _where(rid: int, texto=None, tipo_doc=None, proveedor=None, desde=None, hasta=None):
+        sql, params = ["rendicion_id=?"], [rid]
+        if tipo_doc:
+            sql.append("tipo_doc=?"); params.append(tipo_doc)
+        if proveedor:
+            sql.append("proveedor=?"); params.append(proveedor)
+        if desde:
+            sql.append("fecha>=?"); params.append(str(desde))
+        if hasta:
+            sql.append("fecha<=?"); params.append(str(hasta))
+        if texto:
+            like = f"%{texto}%"
+            sql.append("(detalle LIKE ? OR proveedor LIKE ? OR n_doc LIKE ? OR nombre_doc LIKE ?)")
+            params += [like] * 4
+        return " AND ".join(sql), params
+
+    def gastos(self, rid: int, limit: Optional[int] = None, offset: int = 0, **filtros) -> list:
+        """Gastos de la rendición en orden de alta, con filtros opcionales
+        (``texto``, ``tipo_doc``, ``proveedor``, ``desde``, ``hasta``) y paginación."""
+        where, params = self._where(rid, **filtros)
+        sql = f"SELECT * FROM gastos WHERE {where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"; params += [int(limit), int(offset)]
+        return [_gasto_from_row(r) for r in self._query(sql, params)]
+
+    def count(self, rid: int, **filtros) -> int:
+        where, params = self._where(rid, **filtros)
+        return self._query(f"SELECT COUNT(*) FROM gastos WHERE {where}", params)[0][0]
+
+    def totals(self, rid: int) -> tuple:
+        """``(fondo, total, saldo, cantidad)``, como ``GastosLedger.totals()``."""
+        row = self._query("SELECT r.fondo_inicial, COALESCE(SUM(g.monto), 0), COUNT(g.id) "
+                          "FROM rendiciones r LEFT JOIN gastos g ON g.rendicion_id = r.id "
+                          "WHERE r.id=? GROUP BY r.id", (rid,))[0]
+        fondo, total, cantidad = float(row[0]), float(row[1]), int(row[2])
+        return fondo, total, fondo - total, cantidad
+
+    def metas(self, rids=None) -> list:
+        """``[(id, clave, fondo_inicial, meta), ...]`` de las rendiciones ``rids`` (todas si es None)."""
+        sql, params = "SELECT id, clave, fondo_inicial, meta FROM rendiciones", []
+        if rids is not None:
+            rids = list(rids)
+            sql += f" WHERE id IN ({', '.join('?' * len(rids))})"; params = rids
+        return [(r["id"], r["clave"], r["fondo_inicial"], json.loads(r["meta"] or "{}"))
+                for r in self._query(sql + " ORDER BY id", params)]
+
+    def gastos_columnas(self, columns=("fecha", "monto", "tipo_doc", "proveedor"), rids=None) -> list:
+        """Tuplas ``(rendicion_id, *columns)`` de los gastos de varias rendiciones en una
+        sola consulta (para consolidar sin armar un diccionario por gasto)."""
+        cols = [c for c in columns if c in GASTO_COLUMNS]
+        sql, params = f"SELECT rendicion_id, {', '.join(cols)} FROM gastos", []
+        if rids is not None:
+            rids = list(rids)
+            sql += f" WHERE rendicion_id IN ({', '.join('?' * len(rids))})"; params = rids
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.row_factory = None  # tuplas simples
+            return cur.execute(sql + " ORDER BY rendicion_id, id", params).fetchall()
+
+    def subtotales(self, rid: int, por: str = "tipo_doc") -> dict:
+        """``{clave: (monto, cantidad)}`` agrupado por ``tipo_doc``, ``proveedor`` o ``mes``."""
+        expr = {"tipo_doc": "COALESCE(tipo_doc, '')", "proveedor": "COALESCE(proveedor, '')",
+                "mes": "substr(COALESCE(fecha, ''), 1, 7)"}[por]
+        rows = self._query(f"SELECT {expr} AS k, COALESCE(SUM(monto), 0), COUNT(*) FROM gastos "
+                           f"WHERE rendicion_id=? GROUP BY k ORDER BY k", (rid,))
+        return {r[0]: (float(r[1]), int(r[2])) for r in rows}
+
+
+class RepositoryStore:
+    """Misma interfaz que ``JournalStore`` (``load`` / ``append`` / ``compact``) sobre una
+    rendición del repositorio, para ``GastosManager``. Las operaciones por índice se
+    traducen a ids con una lista paralela a ``data["gastos"]``."""
+
+    def __init__(self, repo: Repository, clave: str):
+        self.repo = repo
+        # True si la rendición se crea al abrirla (p. ej. para migrar datos una sola vez)
+        self.nueva = repo.rendicion_id(clave, create=False) is None
+        self.rid = repo.rendicion_id(clave)
+        self.ids = []
+
+    def load(self) -> dict:
+        data = self.repo.load(self.rid)
+        self.ids = [g.pop("id") for g in data["gastos"]]
+        return data
+
+    def is_empty(self) -> bool:
+        return self.repo.count(self.rid) == 0
+
+    def append(self, op: dict, data: dict) -> None:
+        kind = op["op"]
+        if kind == "add":
+            self.ids.append(self.repo.add_gasto(self.rid, op["gasto"]))
+        elif kind == "edit":
+            self.repo.update_gasto(self.ids[op["idx"]], op["gasto"])
+        elif kind == "delete":
+            indices = sorted(set(op["indices"]), reverse=True)
+            self.repo.delete_gastos([self.ids[i] for i in indices])
+            for i in indices:
+                self.ids.pop(i)
+        elif kind == "set_fondo":
+            self.repo.set_fondo(self.rid, op["monto"])
+        else:
+            raise ValueError(f"Operación desconocida: {kind!r}")
+
+    def compact(self, data: dict) -> None:
+        """Cada operación ya quedó confirmada en la base; solo se guarda el fondo."""
+        self.repo.set_fondo(self.rid, data.get("fondo_inicial", 0))
+
+    def import_data(self, data: dict) -> None:
+        self.repo.set_fondo(self.rid, data.get("fondo_inicial", 0))
+        self.ids = self.repo.replace_gastos(self.rid, data.get("gastos", []))
+
+    def import_stream(self, stream) -> None:
+        """Reemplaza los gastos por los de un ``importer.StreamImport`` (volver a ``load``
+        después para tener los datos en memoria)."""
+        self.repo.import_gastos(self.rid, stream)
+        self.repo.set_fondo(self.rid, stream.fondo_inicial or 0)
+        self.ids = []
+
+    def close(self) -> None:
+        pass
+
+
+_DEFAULT = {}
+_LOCK = threading.Lock()
+
+
+def default_repository() -> Repository:
+    """Repositorio compartido por el proceso (todas las sesiones) para ``RENDICION_DB``."""
+    path = os.path.abspath(default_path())
+    repo = _DEFAULT.get(path)
+    if repo is None:
+        with _LOCK:
+            repo = _DEFAULT.get(path)
+            if repo is None:
+                repo = _DEFAULT[path] = Repository(path)
+    return repo
+
+
+def open_store(path, clave: str = "principal"):
+    """``RepositoryStore`` si ``path`` es una base SQLite; ``JournalStore`` para un JSON."""
+    path = Path(path)
+    if path.suffix.lower() in DB_SUFFIXES:
+        return RepositoryStore(Repository(str(path)), clave)
+    return JournalStore(path)
@@ -1,41 +1,61 @@
 # streamlit_app.py — PDF sin cortes + encabezado de tabla repetido + pie con páginas
-import io, os, json
-from datetime import date, datetime
-from typing import List
+import os, json, hashlib
+from datetime import date
 
 import streamlit as st
 import pandas as pd
-from fpdf import FPDF
-import matplotlib.pyplot as plt
+
+from rendicion import attachments, bundle, charts, excel_export, importer, model, pdf_export, st_common, storage
+from rendicion.model import default_meta, money, parse_float
+from rendicion.st_common import (cached_export, documentos_adjuntos, escrito, export_button, export_fingerprint,
+                                 quitar_gastos as remove_gastos, repo, totals)
 
 # ---------------------------- Config ----------------------------
 st.set_page_config(page_title="Rendición de Fondos Fijos P01 – SLEP Petorca", layout="wide")
 
 # ---------------------------- Helpers & State ----------------------------
+def open_rendicion(rid: int) -> None:
+    """Abre la rendición en la sesión, con su meta completa; el selector se alinea antes de
+    dibujarse (ver la barra lateral)."""
+    data = st_common.abrir_rendicion(rid, _frame_from_gastos)
+    meta = default_meta()
+    meta.update(data["meta"])
+    st.session_state.data["meta"] = meta
+    st.session_state.meta_guardada = dict(meta)
+
+def sincronizar() -> None:
+    """Vuelve a leer la rendición activa si otra sesión (u otra app, o la CLI) escribió en ella;
+    si ya no existe, abre la "principal"."""
+    st_common.sincronizar(lambda rid: open_rendicion(repo().rendicion_id("principal") if rid is None else rid))
+
+def save_meta() -> None:
+    """Guarda la meta en la base solo si cambió desde la última escritura."""
+    meta = st.session_state.data["meta"]
+    if meta != st.session_state.get("meta_guardada"):
+        repo().set_meta(st.session_state.rendicion_id, meta)
+        escrito()
+        st.session_state.meta_guardada = dict(meta)
+
+def etiqueta_rendicion(r: dict) -> str:
+    partes = [f"N° {r['n_rendicion']}" if r.get("n_rendicion") else "", r.get("mes_que_rinde") or "", r.get("responsable") or ""]
+    return " – ".join(p for p in partes if p) or r["clave"]
+
+def _cambiar_rendicion():
+    if st.session_state.rendicion_sel != st.session_state.rendicion_id:
+        open_rendicion(st.session_state.rendicion_sel)
+
+def _crear_rendicion():
+    campos = {k: st.session_state[f"nueva_{k}"].strip() for k in storage.META_COLUMNS}
+    if not any(campos.values()):
+        return
+    # por la meta guardada, no por la clave: la meta pudo editarse después de crearla
+    open_rendicion(repo().rendicion_por_meta({**default_meta(), **campos}))
+
 def init_state():
-    if "data" not in st.session_state:
-        st.session_state.data = {
-            "fondo_inicial": 0.0,
-            "gastos": [],
-            "meta": {
-                "tipo_fondo": "",
-                "responsable": "",
-                "rut": "",
-                "cargo": "",
-                "institucion": "",
-                "mes_que_rinde": "",
-                "fecha_rendicion": "",
-                "n_rendicion": "",
-                "n_rex": "",
-                "fecha_rex": "",
-                "observaciones": "",
-                "n_egreso_inicial": "",
-                "fecha_egreso_inicial": "",
-                "saldo_mes_anterior": 0.0,
-                "monto_recibido_mes_anterior": 0.0,
-                "monto_gasto_transporte": 0.0,
-            }
-        }
+    if "rendicion_id" not in st.session_state:
+        open_rendicion(repo().rendicion_id("principal"))
+    else:
+        sincronizar()
     if "logo_bytes" not in st.session_state:
         st.session_state.logo_bytes = None
         st.session_state.logo_name = None
@@ -49,614 +69,178 @@ def init_state():
             "contab_finanzas": None,
             "jefe_adm_fin": None,
         }
+    if "exports" not in st.session_state:
+        st.session_state.exports = {}  # kind -> (huella, bytes)
 
-def money(x: float) -> str:
-    try:
-        s = f"{int(round(float(x))):,}".replace(",", ".")
-        return f"${s}"
-    except Exception:
-        return f"${x}"
+def load_data_from_upload(file) -> list:
+    """Importa por flujo un JSON / JSON Lines de datos o un paquete .zip (este último también
+    restaura los adjuntos) directo a la rendición activa en la base y la vuelve a abrir.
+    Devuelve los avisos para el usuario: ``[(tipo, mensaje)]``, tipo "success" / "warning" / "error"."""
+    es_paquete = str(getattr(file, "name", "")).lower().endswith(".zip")
+    store = attachments.default_store()
+    barra = st.progress(0.0, text="Importando...")
 
-def parse_float(x) -> float:
-    try:
-        return float(x)
-    except Exception:
-        return 0.0
+    def avance(leidos, total, n):
+        barra.progress(min(leidos / total, 1.0) if total else 0.0, text=f"Importando... {n} gastos")
 
-def load_data_from_json(file) -> None:
+    rid = st.session_state.rendicion_id
     try:
-        obj = json.load(file)
-        fi = parse_float(obj.get("fondo_inicial", 0))
-        gastos = obj.get("gastos", [])
-        fixed = []
-        for g in gastos:
-            fixed.append({
-                "fecha": g.get("fecha"),
-                "monto": parse_float(g.get("monto", 0)),
-                "detalle": g.get("detalle") or g.get("descripcion") or "",
-                "tipo_doc": g.get("tipo_doc", ""),
-                "n_doc": g.get("n_doc", ""),
-                "proveedor": g.get("proveedor", ""),
-                "nombre_doc": g.get("nombre_doc"),
-                "bytes_doc": None,
-            })
-        meta = st.session_state.data.get("meta", {}).copy()
-        meta.update(obj.get("meta", {}))
-        st.session_state.data = {"fondo_inicial": fi, "gastos": fixed, "meta": meta}
-        st.success("Datos cargados desde JSON.")
-    except Exception as e:
-        st.error(f"Error al leer JSON: {e}")
+        file.seek(0)
+        if es_paquete:
+            with bundle.open_import(file, store, progress=avance) as imp:
+                repo().import_gastos(rid, imp)
+        else:
+            # el adjunto se recupera si sigue en el almacén de este servidor
+            imp = importer.StreamImport(file, normalize=lambda g: importer.normalize_gasto(g, store), progress=avance)
+            repo().import_gastos(rid, imp)
+        repo().set_fondo(rid, imp.fondo_inicial or 0.0)
+        repo().set_meta(rid, {**st.session_state.data.get("meta", {}), **imp.meta})
+    except Exception as e:  # la importación es una transacción: la rendición quedó como estaba
+        return [("error", f"Error al leer {'el paquete' if es_paquete else 'JSON'}: {e}")]
+    finally:
+        barra.empty()
+    open_rendicion(rid)
+    avisos = [("success", f"{'Paquete cargado con sus adjuntos' if es_paquete else 'Datos cargados'}: {imp.cantidad} gastos.")]
+    if imp.errores:
+        detalle = "; ".join(f"registro {n}: {msg}" for n, msg in imp.errores[:5])
+        avisos.append(("warning", f"Se omitieron {len(imp.errores)} registros inválidos ({detalle}{'; ...' if len(imp.errores) > 5 else ''})."))
+    return avisos
+
+def _cargar_datos():
+    """Callback de "Cargar datos": corre antes del script, así la rendición importada (totales,
+    tabla, selector) se dibuja ya al día en este mismo rerun."""
+    up = st.session_state.get("json_up")
+    if up is not None:
+        st.session_state.avisos_importacion = load_data_from_upload(up)
+
+def export_data() -> dict:
+    return model.export_data(st.session_state.data)
 
 def export_data_json() -> bytes:
-    data = {
-        "fondo_inicial": st.session_state.data["fondo_inicial"],
-        "meta": st.session_state.data["meta"],
-        "gastos": [
-            {
-                "fecha": g.get("fecha"),
-                "tipo_doc": g.get("tipo_doc",""),
-                "n_doc": g.get("n_doc",""),
-                "detalle": g.get("detalle",""),
-                "proveedor": g.get("proveedor",""),
-                "monto": g.get("monto",0),
-                "nombre_doc": g.get("nombre_doc")
-            }
-            for g in st.session_state.data["gastos"]
-        ],
-    }
-    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return model.export_json(st.session_state.data)
+
+# (título, clave del gasto, relleno de las celdas vacías) de la tabla, tras la columna "N"
+COLUMNAS = [("Fecha", "fecha", None), ("TipoDocumento", "tipo_doc", ""), ("NDocumento", "n_doc", ""),
+            ("Detalle", "detalle", ""), ("Proveedor", "proveedor", ""), ("Monto", "monto", None)]
+
+def _frame_from_gastos(gastos, start: int = 1) -> pd.DataFrame:
+    return st_common.frame_from_gastos(gastos, COLUMNAS, start=start)
 
 def gastos_df() -> pd.DataFrame:
-    df = pd.DataFrame(st.session_state.data["gastos"])
-    if not df.empty:
-        df = df.assign(
-            N=pd.RangeIndex(1, len(df) + 1),
-            Fecha=pd.to_datetime(df["fecha"]).dt.date,
-            TipoDocumento=df["tipo_doc"].fillna(""),
-            NDocumento=df["n_doc"].fillna(""),
-            Detalle=df["detalle"].fillna(""),
-            Proveedor=df["proveedor"].fillna(""),
-            Monto=pd.to_numeric(df["monto"], errors="coerce").fillna(0.0),
-        )[["N","Fecha","TipoDocumento","NDocumento","Detalle","Proveedor","Monto"]]
-    return df
-
-def totals():
-    df = gastos_df()
-    if df.empty:
-        total = 0.0; cantidad = 0
-    else:
-        total = float(pd.to_numeric(df["Monto"], errors="coerce").fillna(0).sum())
-        cantidad = int(df.shape[0])
-    fondo = float(st.session_state.data.get("fondo_inicial") or 0.0)
-    saldo = fondo - total
-    return fondo, total, saldo, cantidad
+    return st_common.gastos_df(_frame_from_gastos)
 
 def add_gasto(fecha: date, tipo_doc: str, n_doc: str, detalle: str, proveedor: str, monto: float, doc_file):
-    nombre_doc = None; bytes_doc = None
+    """Registra el gasto y devuelve sus coincidencias con gastos ya registrados (duplicados)."""
+    nombre_doc = None; ref_doc = None
     if doc_file is not None:
         nombre_doc = doc_file.name
-        bytes_doc = doc_file.read()
-    st.session_state.data["gastos"].append({
+        doc_file.seek(0)
+        ref_doc = attachments.default_store().put_stream(doc_file)
+    g = {
         "fecha": fecha.strftime("%Y-%m-%d"),
         "tipo_doc": tipo_doc,
         "n_doc": n_doc,
         "detalle": detalle,
         "proveedor": proveedor,
         "monto": float(monto),
-        "nombre_doc": nombre_doc, "bytes_doc": bytes_doc
-    })
-
-def remove_gastos(indices: List[int]):
-    for idx in sorted(indices, reverse=True):
-        if 0 <= idx < len(st.session_state.data["gastos"]):
-            st.session_state.data["gastos"].pop(idx)
-
-# ---------- PDF helpers (Unicode) ----------
-def set_unicode_font(pdf: FPDF) -> bool:
-    candidates = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/usr/local/share/fonts/DejaVuSans.ttf",
-        "fonts/DejaVuSans.ttf",
-    ]
-    for path in candidates:
-        if os.path.exists(path):
-            pdf.add_font("DejaVu", "", path)
-            pdf.add_font("DejaVu", "B", path)
-            pdf.set_font("DejaVu", size=11)
-            return True
-    pdf.set_font("Helvetica", size=11)  # fallback sin Unicode
-    return False
-
-def safe_text(txt: str, unicode_ok: bool) -> str:
-    return txt if unicode_ok else txt.replace("–", "-").encode("latin-1","ignore").decode("latin-1")
-
-def wrap_text_lines(pdf: FPDF, text: str, width_mm: float, pad: float = 1.5) -> list:
-    if text is None: return [""]
-    s = str(text)
-    max_w = max(1.0, width_mm - pad*2)
-    lines, line = [], ""
-
-    def fits(t: str) -> bool:
-        return pdf.get_string_width(t) <= max_w
-
-    for word in s.split(" "):
-        candidate = f"{line} {word}".strip()
-        if fits(candidate):
-            line = candidate
-            continue
-        if line:
-            lines.append(line); line = ""
-        w = word
-        while not fits(w) and w:
-            lo, hi, best = 1, len(w), 1
-            while lo <= hi:
-                mid = (lo + hi)//2
-                if fits(w[:mid]): best = mid; lo = mid+1
-                else: hi = mid-1
-            lines.append(w[:best]); w = w[best:]
-        line = w
-    if line: lines.append(line)
-    return lines or [""]
-
-def draw_wrapped_row(pdf: FPDF, values, widths, aligns, line_h=5.2, unicode_ok=True, prechecked_height=None):
-    """Dibuja una fila sin permitir saltos internos; usar ensure_row_space antes."""
-    pdf.set_font(pdf.font_family, size=9)
-    x0 = pdf.get_x(); y0 = pdf.get_y()
-
-    if prechecked_height is None:
-        all_lines = [wrap_text_lines(pdf, safe_text(v if v is not None else "", unicode_ok), w) for v, w in zip(values, widths)]
-        max_lines = max((len(ls) for ls in all_lines), default=1)
-        row_h = max_lines * line_h
-    else:
-        row_h = prechecked_height
-        all_lines = [wrap_text_lines(pdf, safe_text(v if v is not None else "", unicode_ok), w) for v, w in zip(values, widths)]
-
-    for txt_lines, w, a in zip(all_lines, widths, aligns):
-        x = pdf.get_x(); y = pdf.get_y()
-        pdf.multi_cell(w, line_h, "\n".join(txt_lines), border=1, align=a)
-        pdf.set_xy(x + w, y)
-    pdf.set_xy(x0, y0 + row_h)
-
-# --- ajusta una lista de anchos al ancho total disponible (corrección del corte) ---
-def normalize_widths(widths, total):
-    s = sum(widths)
-    if s <= 0:
-        return [total]
-    scale = total / s
-    scaled = [w * scale for w in widths]
-    if len(scaled) > 1:
-        scaled[-1] = total - sum(scaled[:-1])  # evita acumulación de redondeo
-    return scaled
+        "nombre_doc": nombre_doc, "ref_doc": ref_doc
+    }
+    return st_common.agregar_gasto(g, _frame_from_gastos)
 
 # ---------- PDF Export ----------
 def export_pdf(landscape: bool, logo_mm: int) -> bytes:
-    df = gastos_df()
-    fondo, total, saldo, cantidad = totals()
-    meta = st.session_state.data.get("meta", {})
-
-    # --- Subclase con pie de página ---
-    class MyPDF(FPDF):
-        def footer(self):
-            self.set_y(-12)
-            self.set_font(self.font_family, size=8)
-            self.cell(0, 8, f"Página {self.page_no()} de {{nb}}", 0, 0, "C")
-
-    pdf = MyPDF(orientation="L" if landscape else "P", unit="mm", format="A4")
-    pdf.alias_nb_pages()
-    pdf.set_auto_page_break(auto=True, margin=14)  # margen inferior claro
-    pdf.add_page()
-    unicode_ok = set_unicode_font(pdf)
-
-    # Márgenes y ancho útil
-    left = 10
-    page_w = 297 if landscape else 210
-    usable_w = page_w - 2 * left
-
-    # Logo
-    if st.session_state.logo_bytes:
-        try:
-            bio_logo = io.BytesIO(st.session_state.logo_bytes)
-            pdf.image(bio_logo, x=left, y=10, w=max(16, min(logo_mm, 40)))
-        except Exception:
-            pass
-
-    # Título
-    pdf.set_xy(left + 45, 10)
-    pdf.set_font(pdf.font_family, "B", 12)
-    pdf.cell(0, 6, safe_text("SERVICIO LOCAL DE EDUCACIÓN PÚBLICA DE PETORCA", unicode_ok), ln=True)
-    pdf.set_x(left + 45); pdf.set_font(pdf.font_family, size=10)
-    pdf.cell(0, 5, safe_text("Rendición de Fondos Fijos P01 – SLEP Petorca", unicode_ok), ln=True)
-    pdf.set_x(left + 45)
-    pdf.cell(0, 5, safe_text(f"Fecha de emisión: {datetime.now():%Y-%m-%d %H:%M}", unicode_ok), ln=True)
-    pdf.ln(2)
-
-    def header_row(labels, widths, align="C"):
-        pdf.set_font(pdf.font_family, "B", 10)
-        for h, w in zip(labels, widths):
-            pdf.cell(w, 7, safe_text(h, unicode_ok), 1, 0, align)
-        pdf.ln(7)
-
-    def value_row(values, widths, align="L", h=8, font=""):
-        pdf.set_font(pdf.font_family, font, 10)
-        for v, w in zip(values, widths):
-            pdf.cell(w, h, safe_text("" if v is None else str(v), unicode_ok), 1, 0, align)
-        pdf.ln(h)
-
-    def ensure_space(h_needed: float):
-        available = (pdf.h - pdf.b_margin) - pdf.get_y()
-        if h_needed > available:
-            pdf.add_page()
-            # reimprimir cabecera superior (logo/título) no es imprescindible; dejamos limpio
-
-    # Primera grilla (usa ancho útil)
-    w1 = [usable_w * i for i in ([0.17, 0.20, 0.18, 0.20, 0.15, 0.10] if landscape else [0.20,0.23,0.19,0.20,0.13,0.05])]
-    pdf.set_x(left); header_row(["Tipo de Fondo","Responsable del fondo","Institución","Fecha Rendición","N° Rendición",""], w1)
-    vals1 = [meta.get("tipo_fondo",""), meta.get("responsable",""), meta.get("institucion",""),
-             meta.get("fecha_rendicion",""), meta.get("n_rendicion",""), ""]
-    pdf.set_x(left); value_row(vals1, w1)
-
-    # Fila REX
-    w2 = [usable_w * 0.5, usable_w * 0.5]
-    pdf.set_x(left); header_row(["N° REX", "Fecha REX"], w2)
-    pdf.set_x(left); value_row([meta.get("n_rex",""), meta.get("fecha_rex","")], w2, "L", 8)
-
-    # Tabla de gastos: normalizada al ancho útil + control de salto por fila
-    if landscape:
-        col_w_raw = [12, 24, 34, 36, 102, 56, 33]
-    else:
-        col_w_raw = [10, 24, 30, 30, 84, 42, 30]
-    col_w = normalize_widths(col_w_raw, usable_w)
-
-    table_headers = ["N°", "Fecha gasto", "Tipo documento", "N° Documento",
-                     "Detalle del gasto", "Nombre Proveedor", "Monto"]
-
-    def print_table_header():
-        pdf.set_x(left)
-        header_row(table_headers, col_w)
-
-    print_table_header()
-
-    if df.empty:
-        pdf.set_x(left)
-        pdf.cell(sum(col_w), 7, safe_text("Sin registros", unicode_ok), 1, 0, "C"); pdf.ln(7)
-    else:
-        pdf.set_font(pdf.font_family, size=9)
-        line_h = 5.2
-        for _, r in df.iterrows():
-            # calcular altura de la fila
-            sample_lines = [
-                wrap_text_lines(pdf, safe_text(str(r["N"]), unicode_ok),         col_w[0]),
-                wrap_text_lines(pdf, safe_text(r["Fecha"].strftime("%Y-%m-%d"), unicode_ok), col_w[1]),
-                wrap_text_lines(pdf, safe_text(r["TipoDocumento"], unicode_ok),  col_w[2]),
-                wrap_text_lines(pdf, safe_text(str(r["NDocumento"]), unicode_ok),col_w[3]),
-                wrap_text_lines(pdf, safe_text(str(r["Detalle"]), unicode_ok),   col_w[4]),
-                wrap_text_lines(pdf, safe_text(str(r["Proveedor"]), unicode_ok), col_w[5]),
-                wrap_text_lines(pdf, safe_text(money(float(r["Monto"])), unicode_ok), col_w[6]),
-            ]
-            max_lines = max(len(x) for x in sample_lines)
-            row_h = max_lines * line_h
-
-            # si no cabe la fila completa, salto de página y reimprimo encabezado
-            available = (pdf.h - pdf.b_margin) - pdf.get_y()
-            if row_h > available:
-                pdf.add_page()
-                print_table_header()
-
-            pdf.set_x(left)
-            draw_wrapped_row(
-                pdf,
-                [
-                    str(r["N"]),
-                    r["Fecha"].strftime("%Y-%m-%d"),
-                    r["TipoDocumento"],
-                    str(r["NDocumento"]),
-                    str(r["Detalle"]),
-                    str(r["Proveedor"]),
-                    money(float(r["Monto"])),
-                ],
-                col_w,
-                ["C","L","L","L","L","L","R"],
-                line_h=line_h,
-                unicode_ok=unicode_ok,
-                prechecked_height=row_h
-            )
-
-    # Total (protegido)
-    total_h = 9
-    ensure_space(total_h + 2)
-    pdf.set_font(pdf.font_family, "B", 10)
-    pdf.set_x(left); pdf.cell(sum(col_w[:-1]), 7, safe_text("Monto Total del Gasto", unicode_ok), 1, 0, "R")
-    pdf.cell(col_w[-1], 7, money(total), 1, 0, "R")
-    pdf.ln(9)
-
-    # Egreso inicial (protegido)
-    ensure_space(18)
-    pdf.set_x(left)
-    header_row(["N° Egreso Contable Inicial del Fondo", "Fecha de Egreso Inicial del Fondo"], [usable_w*0.5, usable_w*0.5])
-    pdf.set_x(left)
-    value_row([meta.get("n_egreso_inicial",""), meta.get("fecha_egreso_inicial","")], [usable_w*0.5, usable_w*0.5], "L", 8)
-
-    # Cuadro resumen (protegido)
-    rows = [
-        ("Saldo Inicial/Rendición Mes Anterior", parse_float(meta.get("saldo_mes_anterior", 0))),
-        ("Monto Recibido Mes anterior", parse_float(meta.get("monto_recibido_mes_anterior", 0))),
-        ("Monto Gasto del mes", total),
-        ("Monto del gasto del mes Transporte", parse_float(meta.get("monto_gasto_transporte", 0))),
-    ]
-    saldo_final = rows[0][1] + rows[1][1] - rows[2][1] - rows[3][1]
-    w_label, w_val = usable_w * 0.79, usable_w * 0.21
-    needed = 7 + len(rows)*8 + 8 + 6  # título + filas + saldo final + respiro
-    ensure_space(needed)
-
-    pdf.set_x(left); pdf.set_font(pdf.font_family, "B", 10)
-    pdf.cell(usable_w, 7, safe_text("CUADRO RESUMEN RENDICION", unicode_ok), 1, 0, "C"); pdf.ln(7)
-    pdf.set_font(pdf.font_family, size=10)
-    for label, val in rows:
-        pdf.set_x(left); pdf.cell(w_label, 8, safe_text(label, unicode_ok), 1, 0, "L")
-        pdf.cell(w_val, 8, money(float(val)), 1, 0, "R")
-        pdf.ln(8)
-    pdf.set_font(pdf.font_family, "B", 10)
-    pdf.set_x(left); pdf.cell(w_label, 8, safe_text("Saldo Final", unicode_ok), 1, 0, "L")
-    pdf.cell(w_val, 8, money(saldo_final), 1, 0, "R")
-    pdf.ln(10)
-
-    # ---------------- Firmas (bloque con control de salto) ----------------
-    def draw_signature_box(pdf: FPDF, x: float, y: float, w: float, title: str, key: str):
-        SIG_IMG_W = 40
-        PAD_LR = 10
-        line_y = y + 12
-        img_bytes = st.session_state.firmas.get(key)
-        if img_bytes:
-            try:
-                img = io.BytesIO(img_bytes)
-                img_x = x + (w - SIG_IMG_W) / 2
-                pdf.image(img, x=img_x, y=y, w=SIG_IMG_W)
-                line_y = y + 22
-            except Exception:
-                pass
-        left_x = x + PAD_LR
-        right_x = x + w - PAD_LR
-        pdf.line(left_x, line_y, right_x, line_y)
-        pdf.set_xy(x, line_y + 2)
-        pdf.set_font(pdf.font_family, size=9)
-        pdf.cell(w, 5, safe_text(title, unicode_ok), 0, 0, "C")
-        return max(28.0, (line_y - y) + 9)
-
-    def ensure_space_for_block(h_needed: float):
-        available = (pdf.h - pdf.b_margin) - pdf.get_y()
-        if h_needed > available:
-            pdf.add_page()
-
-    row_h_est = 32.0
-    exclus_h = 9.0
-    gap = 6.0
-    block_h = exclus_h + gap + row_h_est*4 + gap*3  # 4 filas (la última Jefe Adm/Fin)
-
-    ensure_space_for_block(block_h)
-
-    pdf.set_font(pdf.font_family, "B", 10)
-    pdf.set_x(left)
-    pdf.cell(usable_w, 7, safe_text("USO EXCLUSIVO SERVICIO LOCAL DE EDUCACIÓN PÚBLICA DE PETORCA", unicode_ok), 1, 0, "C")
-    pdf.ln(gap)
-
-    x_left = left
-    box_w = (usable_w - 10) / 2
-    x_right = x_left + box_w + 10
-    y = pdf.get_y()
-
-    h1 = draw_signature_box(pdf, x_left,  y, box_w, "Encargado/a del Fondo", "encargado")
-    h2 = draw_signature_box(pdf, x_right, y, box_w, "Director/a Ejecutiva", "directora")
-    y += max(h1, h2) + gap
-
-    ensure_space_for_block(row_h_est + gap)
-    h1 = draw_signature_box(pdf, x_left,  y, box_w, "Nombre/Firma Revisor/a 1", "revisor1")
-    h2 = draw_signature_box(pdf, x_right, y, box_w, "V°B° JEFE UNIDAD", "jefe_unidad")
-    y += max(h1, h2) + gap
-
-    ensure_space_for_block(row_h_est + gap)
-    h1 = draw_signature_box(pdf, x_left,  y, box_w, "V°B° UNIDAD DE FINANZAS", "u_finanzas")
-    h2 = draw_signature_box(pdf, x_right, y, box_w, "CONTABILIDAD Y FINANZAS", "contab_finanzas")
-    y += max(h1, h2) + gap
-
-    ensure_space_for_block(row_h_est)
-    _ = draw_signature_box(pdf, x_left, y, box_w, "V°B° JEFE/(A) ADMINISTRACIÓN Y FINANZAS", "jefe_adm_fin")
-    pdf.set_y(y + row_h_est)
-
-    out = io.BytesIO()
-    pdf.output(out)
-    return out.getvalue()
+    return pdf_export.export_pdf(st.session_state.data, landscape, logo_mm,
+                                 st.session_state.logo_bytes, st.session_state.firmas)
 
 # ---------- Excel Export ----------
 def export_excel(logo_px: int) -> bytes:
-    from openpyxl import Workbook
-    from openpyxl.utils.dataframe import dataframe_to_rows
-    from openpyxl.styles import Alignment, Font, Border, Side
-    from openpyxl.worksheet.page import PageMargins
-    from openpyxl.drawing.image import Image as XLImage
-
-    thin = Side(style="thin", color="000000")
-    border = Border(top=thin, left=thin, right=thin, bottom=thin)
-
-    def set_border_range(ws, rng: str):
-        for row in ws[rng]:
-            for c in row:
-                c.border = border
-
-    wb = Workbook()
-    # ---------- Hoja Gastos ----------
-    ws = wb.active
-    ws.title = "Gastos"
-    ws.page_setup.orientation = "landscape"
-    ws.page_setup.fitToWidth = 1
-    ws.page_margins = PageMargins(left=0.3, right=0.3, top=0.5, bottom=0.5)
-
-    if st.session_state.logo_bytes:
-        try:
-            lf = "/tmp/logo_tmp.png"
-            with open(lf, "wb") as f: f.write(st.session_state.logo_bytes)
-            img = XLImage(lf)
-            img.width = max(80, min(logo_px, 220))
-            img.height = int(img.width * 0.35)
-            img.anchor = "A1"
-            ws.add_image(img)
-        except Exception:
-            pass
-
-    headers = ["N°","Fecha del gasto","Tipo documento","N° Documento","Detalle del gasto","Nombre Proveedor","Monto"]
-    widths = [6,14,18,20,50,28,14]
-    for i, w in enumerate(widths, start=1):
-        ws.column_dimensions[chr(64+i)].width = w
-
-    def merge_set(sheet, cell1, cell2, value="", bold=False, align="center"):
-        sheet.merge_cells(f"{cell1}:{cell2}")
-        c = sheet[cell1]
-        c.value = value
-        c.alignment = Alignment(horizontal=align, vertical="center", wrap_text=True)
-        c.font = Font(bold=bold)
-
-    merge_set(ws, "A4", "B4", "Tipo de Fondo", True)
-    merge_set(ws, "C4", "D4", "Responsable del fondo", True)
-    merge_set(ws, "E4", "G4", "Institución", True)
-    merge_set(ws, "A5", "B5", st.session_state.data["meta"].get("tipo_fondo",""), False, "left")
-    merge_set(ws, "C5", "D5", st.session_state.data["meta"].get("responsable",""), False, "left")
-    merge_set(ws, "E5", "G5", st.session_state.data["meta"].get("institucion",""), False, "left")
-
-    merge_set(ws, "A6", "D6", "Fecha Rendición", True)
-    merge_set(ws, "E6", "G6", "N° Rendición", True)
-    merge_set(ws, "A7", "D7", st.session_state.data["meta"].get("fecha_rendicion",""), False, "left")
-    merge_set(ws, "E7", "G7", st.session_state.data["meta"].get("n_rendicion",""), False, "left")
-
-    merge_set(ws, "A9", "D9", "N° REX", True)
-    merge_set(ws, "E9", "G9", "Fecha REX", True)
-    merge_set(ws, "A10", "D10", st.session_state.data["meta"].get("n_rex",""), False, "left")
-    merge_set(ws, "E10", "G10", st.session_state.data["meta"].get("fecha_rex",""), False, "left")
-    set_border_range(ws, "A4:G10")
-    for r in range(4, 11): ws.row_dimensions[r].height = 18
-
-    start_row = 12
-    for j, h in enumerate(headers, start=1):
-        c = ws.cell(row=start_row, column=j, value=h)
-        c.font = Font(bold=True); c.alignment = Alignment(horizontal="center"); c.border=border
-
-    df = gastos_df()
-    if df.empty:
-        for j in range(1, 8):
-            c = ws.cell(row=start_row+1, column=j, value="" if j != 1 else "Sin registros")
-            c.border = border
-            if j==1: c.alignment = Alignment(horizontal="center")
-        last_row = start_row + 1
-    else:
-        from openpyxl.utils.dataframe import dataframe_to_rows
-        for i, row in enumerate(dataframe_to_rows(df, index=False, header=False), start=1):
-            for j, val in enumerate(row, start=1):
-                c = ws.cell(row=start_row+i, column=j, value=val)
-                c.border = border
-                if j in (4,5,6):
-                    c.alignment = Alignment(horizontal="left", wrap_text=True, vertical="top")
-                if j==2 and isinstance(val, date):
-                    c.number_format = "yyyy-mm-dd"
-                if j==7:
-                    c.number_format = '"$"#,##0'; c.alignment = Alignment(horizontal="right")
-        last_row = start_row + len(df)
-
-    ws.merge_cells(start_row=last_row+1, start_column=1, end_row=last_row+1, end_column=6)
-    c = ws.cell(row=last_row+1, column=1, value="Monto Total del Gasto"); c.border=border; c.alignment=Alignment(horizontal="right"); c.font=Font(bold=True)
-    c = ws.cell(row=last_row+1, column=7, value=float(df["Monto"].sum() if not df.empty else 0))
-    c.border=border; c.alignment=Alignment(horizontal="right"); c.number_format = '"$"#,##0'; c.font = Font(bold=True)
-
-    # ---------- Hoja Resumen ----------
-    ws2 = wb.create_sheet("Resumen")
-    ws2.page_setup.orientation = "landscape"; ws2.page_setup.fitToWidth = 1
-    ws2.page_margins = PageMargins(left=0.3, right=0.3, top=0.5, bottom=0.5)
-
-    if st.session_state.logo_bytes:
-        try:
-            lf = "/tmp/logo_tmp2.png"
-            with open(lf, "wb") as f: f.write(st.session_state.logo_bytes)
-            img = XLImage(lf)
-            img.width = max(80, min(logo_px, 220))
-            img.height = int(img.width * 0.35)
-            img.anchor = "A1"
-            ws2.add_image(img)
-        except Exception:
-            pass
-
-    def set_border_range2(rng: str):
-        for row in ws2[rng]:
-            for c in row:
-                c.border = border
-
-    def m(cell1, cell2, txt="", bold=False, align="center"):
-        ws2.merge_cells(f"{cell1}:{cell2}")
-        c = ws2[cell1]; c.value = txt
-        c.font = Font(bold=bold); c.alignment = Alignment(horizontal=align, vertical="center", wrap_text=True)
-        return c
-
-    for col, w in zip("ABCDEFGH", [22,28,10,22,10,22,10,12]):
-        ws2.column_dimensions[col].width = w
-
-    row = 5
-    m("A"+str(row), "B"+str(row), "Tipo de Fondo", True);     m("C"+str(row), "E"+str(row), "Nombre Responsable del Fondo", True); m("F"+str(row), "H"+str(row), "N° RUT", True); row+=1
-    m("A"+str(row), "B"+str(row), st.session_state.data["meta"].get("tipo_fondo",""), False, "left")
-    m("C"+str(row), "E"+str(row), st.session_state.data["meta"].get("responsable",""), False, "left")
-    m("F"+str(row), "H"+str(row), st.session_state.data["meta"].get("rut",""), False, "left"); row+=1
-
-    m("A"+str(row), "B"+str(row), "Institución", True);       m("C"+str(row), "E"+str(row), "Cargo", True);                           m("F"+str(row), "H"+str(row), "N° Rendición", True); row+=1
-    m("A"+str(row), "B"+str(row), st.session_state.data["meta"].get("institucion",""), False, "left")
-    m("C"+str(row), "E"+str(row), st.session_state.data["meta"].get("cargo",""), False, "left")
-    m("F"+str(row), "H"+str(row), st.session_state.data["meta"].get("n_rendicion",""), False, "left"); row+=1
-
-    m("A"+str(row), "B"+str(row), "Mes que Rinde", True);     m("C"+str(row), "E"+str(row), "N° REX", True);                          m("F"+str(row), "H"+str(row), "Fecha REX", True); row+=1
-    m("A"+str(row), "B"+str(row), st.session_state.data["meta"].get("mes_que_rinde",""), False, "left")
-    m("C"+str(row), "E"+str(row), st.session_state.data["meta"].get("n_rex",""), False, "left")
-    m("F"+str(row), "H"+str(row), st.session_state.data["meta"].get("fecha_rex",""), False, "left"); row+=1
-
-    m("A"+str(row), "E"+str(row), "Observaciones", True);     m("F"+str(row), "H"+str(row), "Monto Inicial Fondo", True); row+=1
-    m("A"+str(row), "E"+str(row), st.session_state.data["meta"].get("observaciones",""), False, "left")
-    c = m("F"+str(row), "H"+str(row), st.session_state.data["fondo_inicial"], False, "right"); c.number_format = '"$"#,##0'; row+=1
-
-    m("A"+str(row), "C"+str(row), "N° Egreso Contable Inicial del Fondo", True); m("D"+str(row), "E"+str(row), "", True)
-    m("F"+str(row), "G"+str(row), "Fecha de Egreso Inicial del Fondo", True);    m("H"+str(row), "H"+str(row), "", True); row+=1
-    m("A"+str(row), "C"+str(row), st.session_state.data["meta"].get("n_egreso_inicial",""), False, "left")
-    m("F"+str(row), "G"+str(row), st.session_state.data["meta"].get("fecha_egreso_inicial",""), False, "left"); row+=2
-    set_border_range2(f"A5:H{row-1}")
-
-    m("A"+str(row), "H"+str(row), "CUADRO RESUMEN RENDICION", True); row+=1
-    labels_vals = [
-        ("Saldo Inicial/Rendición Mes Anterior", parse_float(st.session_state.data["meta"].get("saldo_mes_anterior", 0))),
-        ("Monto Recibido Mes anterior", parse_float(st.session_state.data["meta"].get("monto_recibido_mes_anterior", 0))),
-        ("Monto Gasto del mes", float(df["Monto"].sum() if not df.empty else 0.0)),
-        ("Monto del gasto del mes Transporte", parse_float(st.session_state.data["meta"].get("monto_gasto_transporte", 0))),
-    ]
-    for label, val in labels_vals:
-        m("A"+str(row), "E"+str(row), label, False, "left")
-        c = m("F"+str(row), "H"+str(row), val, False, "right"); c.number_format = '"$"#,##0'
-        row+=1
-    saldo_final = labels_vals[0][1] + labels_vals[1][1] - labels_vals[2][1] - labels_vals[3][1]
-    c1 = m("A"+str(row), "E"+str(row), "Saldo Final", True, "left")
-    c2 = m("F"+str(row), "H"+str(row), saldo_final, True, "right"); c2.number_format = '"$"#,##0'
-    set_border_range2(f"A{row-len(labels_vals)-1}:H{row}")
-    row+=3
-
-    def linea_firma(r, c1_, c2_, titulo):
-        m(c1_+str(r), c2_+str(r), "_"*40, False, "center")
-        m(c1_+str(r+1), c2_+str(r+1), titulo, False, "center")
-
-    linea_firma(row, "B", "D", "Encargado/a del Fondo")
-    linea_firma(row, "F", "H", "Director/a Ejecutiva")
-
-    bio = io.BytesIO(); wb.save(bio); return bio.getvalue()
+    return excel_export.export_rendicion(st.session_state.data, st.session_state.logo_bytes, logo_px)
+
+# ---------- Exportaciones bajo demanda ----------
+def export_report(kind: str, builder, opts) -> bytes:
+    """Bytes de una exportación, reutilizando la ya generada si los datos no cambiaron."""
+    fp = export_fingerprint(kind, opts)
+    data = cached_export(kind, fp)
+    if data is None:
+        data = builder(*opts)
+        st.session_state.exports[kind] = (fp, data)
+    return data
+
+def _paquete_entregado():
+    st.session_state.pop("paquete_listo", None)
+
+def bundle_button(logo_px: int, opt_landscape: bool, logo_mm: int):
+    """Paquete ZIP (PDF + Excel + JSON + adjuntos) escrito a disco; se descarga desde el archivo."""
+    store = attachments.default_store()
+    dest = bundle.bundle_path(store, export_fingerprint("paquete", (logo_px, opt_landscape, logo_mm)))
+    listo = st.session_state.get("paquete_listo") == dest and os.path.exists(dest)
+    if not listo and st.button("Generar paquete de rendición (PDF + Excel + JSON + adjuntos)", key="gen_paquete"):
+        reports = {}
+        if not os.path.exists(dest):
+            reports = {
+                "rendicion_gastos.pdf": export_report("pdf", export_pdf, (opt_landscape, logo_mm)),
+                "rendicion_gastos.xlsx": export_report("excel", export_excel, (logo_px,)),
+            }
+        st.session_state.paquete_listo = bundle.build_bundle(dest, export_data(), reports, store)
+        listo = True
+    if listo:
+        with open(dest, "rb") as f:
+            st.download_button("Descargar paquete (.zip)", data=f, file_name="paquete_rendicion.zip",
+                               mime="application/zip", key="dl_paquete", on_click=_paquete_entregado)
+
+def consolidado_button(resumenes: list):
+    """Informe consolidado de todas las rendiciones guardadas (agregados, continuidad de saldos
+    y documentos duplicados)."""
+    fp = hashlib.sha256(json.dumps(resumenes, default=str).encode("utf-8")).hexdigest()
+    cached = cached_export("consolidado", fp)
+    if cached is None and st.button("Generar consolidado de todas las rendiciones", key="gen_consolidado"):
+        from rendicion import consolidation  # solo al generarlo: fuera del arranque en frío
+        c = consolidation.Consolidado.from_repository(repo())
+        cached = (c.to_excel(), c.problemas(), c.duplicados())
+        st.session_state.exports["consolidado"] = (fp, cached)
+    if cached is not None:
+        data, problemas, duplicados = cached
+        if problemas.empty:
+            st.success("Los saldos de todas las rendiciones encadenan mes a mes.")
+        else:
+            st.warning(f"{len(problemas)} rendiciones con problemas de continuidad de saldos.")
+            st.dataframe(problemas, hide_index=True, use_container_width=True)
+        if duplicados.empty:
+            st.success("No se encontraron documentos duplicados.")
+        else:
+            exactos = duplicados.loc[duplicados["tipo"] == "exacto", "grupo"].nunique()
+            st.warning(f"{duplicados['grupo'].nunique()} grupos de gastos duplicados "
+                       f"({exactos} con el mismo documento o adjunto).")
+            st.dataframe(duplicados, hide_index=True, use_container_width=True)
+        st.download_button("Descargar consolidado (Excel)", data=data, file_name="consolidado_rendiciones.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="dl_consolidado")
 
 # ---------------------------- UI ----------------------------
 init_state()
 st.title("Rendición de Fondos Fijos P01 – SLEP Petorca")
 
 with st.sidebar:
+    st.header("Rendiciones")
+    rendiciones = {r["id"]: r for r in repo().rendiciones()}
+    if st.session_state.get("rendicion_sel") != st.session_state.rendicion_id:
+        st.session_state.rendicion_sel = st.session_state.rendicion_id  # solo antes de crear el widget
+    st.selectbox("Rendición activa", list(rendiciones), key="rendicion_sel",
+                 format_func=lambda rid: etiqueta_rendicion(rendiciones[rid]), on_change=_cambiar_rendicion)
+    with st.expander("Nueva rendición"):
+        with st.form("nueva_rendicion", clear_on_submit=True):
+            st.text_input("N° Rendición", key="nueva_n_rendicion")
+            st.text_input("Mes que rinde", key="nueva_mes_que_rinde")
+            st.text_input("Responsable del fondo", key="nueva_responsable")
+            st.form_submit_button("Crear / abrir", on_click=_crear_rendicion)
+
+    st.divider()
     st.header("Configuración general")
     fondo_inicial = st.number_input("Monto inicial del fondo", min_value=0.0, step=1000.0,
                                     value=float(st.session_state.data["fondo_inicial"]))
     if st.button("Guardar fondo"):
         st.session_state.data["fondo_inicial"] = float(fondo_inicial)
+        repo().set_fondo(st.session_state.rendicion_id, fondo_inicial)
+        escrito()
         st.success("Fondo inicial actualizado.")
 
     st.divider()
@@ -691,11 +275,13 @@ with st.sidebar:
 
     st.divider()
     st.caption("Importar / Exportar datos")
-    up = st.file_uploader("Importar datos JSON", type=["json"], key="json_up")
-    if up is not None and st.button("Cargar JSON"):
-        load_data_from_json(up)
-    st.download_button("Exportar datos a JSON", data=export_data_json(),
-                       file_name="rendicion_datos.json", mime="application/json")
+    up = st.file_uploader("Importar datos (JSON, JSON Lines o paquete .zip)", type=["json", "jsonl", "zip"], key="json_up")
+    if up is not None:
+        st.button("Cargar datos", on_click=_cargar_datos)
+    for tipo, msg in st.session_state.pop("avisos_importacion", []):
+        getattr(st, tipo)(msg)
+    export_button("JSON", "json", export_data_json, (),
+                  file_name="rendicion_datos.json", mime="application/json", images=False)
 
 st.subheader("Metadatos de la rendición")
 m = st.session_state.data["meta"]
@@ -726,6 +312,7 @@ with c2:
     m["monto_recibido_mes_anterior"] = st.number_input("Monto Recibido Mes anterior", value=parse_float(m.get("monto_recibido_mes_anterior",0.0)), step=1000.0)
 with c3:
     m["monto_gasto_transporte"] = st.number_input("Monto del gasto del mes Transporte", value=parse_float(m.get("monto_gasto_transporte",0.0)), step=1000.0)
+save_meta()
 
 st.subheader("Registrar gasto")
 with st.form("form_gasto", clear_on_submit=True):
@@ -741,7 +328,9 @@ with st.form("form_gasto", clear_on_submit=True):
         if d.strip() == "":
             st.error("El detalle es obligatorio.")
         else:
-            add_gasto(f, tipo, ndoc, d, prov, mnt, doc); st.success("Gasto agregado.")
+            avisos = add_gasto(f, tipo, ndoc, d, prov, mnt, doc); st.success("Gasto agregado.")
+            for c in avisos:
+                st.warning(c.mensaje())
 
 st.subheader("Gastos registrados")
 df = gastos_df()
@@ -764,35 +353,44 @@ c3.metric("Saldo", money(saldo))
 c4.metric("Cantidad", f"{cantidad}")
 
 st.subheader("Distribución")
-labels = ["Gastos", "Saldo"]
-vals = [max(total,0.0), max(saldo,0.0)]
-if sum(vals) <= 0:
-    st.info("Aún no hay datos para graficar. Configura el fondo inicial o registra gastos.")
+# PNG en caché por (total, saldo): si los números no cambian no se dibuja nada
+if charts.renderer() == "vega":
+    grafico = charts.pie_spec(total, saldo)
+    if grafico is not None: st.vega_lite_chart(grafico, use_container_width=True)
 else:
-    fig, ax = plt.subplots()
-    ax.pie(vals, labels=labels, autopct="%1.1f%%"); ax.axis("equal")
-    st.pyplot(fig)
+    grafico = charts.pie_png(total, saldo)
+    if grafico is not None: st.image(grafico)
+if grafico is None:
+    st.info("Aún no hay datos para graficar. Configura el fondo inicial o registra gastos.")
 
 st.subheader("Exportaciones")
 opt_landscape = st.toggle("Generar PDF en orientación horizontal (recomendado)", value=True)
 colx, colp = st.columns(2)
 with colx:
-    st.download_button("Descargar Excel", data=export_excel(logo_px),
+    export_button("Excel", "excel", export_excel, (logo_px,),
         file_name="rendicion_gastos.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 with colp:
-    st.download_button("Descargar PDF", data=export_pdf(opt_landscape, logo_mm),
+    export_button("PDF", "pdf", export_pdf, (opt_landscape, logo_mm),
         file_name="rendicion_gastos.pdf", mime="application/pdf")
+bundle_button(logo_px, opt_landscape, logo_mm)
 
 st.subheader("Documentos adjuntos")
-if len(st.session_state.data["gastos"]) == 0:
-    st.caption("No hay documentos adjuntos aún.")
-else:
-    for i, g in enumerate(st.session_state.data["gastos"]):
-        if g.get("bytes_doc"):
-            st.download_button(f"Descargar '{g.get('nombre_doc','documento')}'",
-                               data=g["bytes_doc"], file_name=g.get("nombre_doc","documento"))
-        else:
-            if g.get("nombre_doc"):
-                st.caption(f"{i+1}. {g.get('nombre_doc')} (no embebido)")
-st.caption("⚠️ Nota: Los archivos subidos viven en la sesión. Usa Exportar/Importar JSON para volver a cargar los datos.")
+documentos_adjuntos()
+st.caption("⚠️ Nota: Los archivos subidos se guardan en el almacén de adjuntos del servidor. Usa el paquete de rendición (o Exportar/Importar JSON) para volver a cargar los datos.")
+
+st.subheader("Panel de rendiciones")
+resumenes = repo().rendiciones()
+panel = pd.DataFrame(resumenes).assign(Rendición=[etiqueta_rendicion(r) for r in resumenes])
+panel = panel.rename(columns={"fondo_inicial": "Fondo", "total": "Gastos", "saldo": "Saldo",
+                              "cantidad": "Cantidad", "actualizada": "Actualizada"})
+c1,c2,c3,c4 = st.columns(4)
+c1.metric("Rendiciones", len(panel))
+c2.metric("Fondos", money(panel["Fondo"].sum()))
+c3.metric("Gastos", money(panel["Gastos"].sum()))
+c4.metric("Saldo", money(panel["Saldo"].sum()))
+for col in ("Fondo", "Gastos", "Saldo"):
+    panel[col] = panel[col].apply(money)
+st.dataframe(panel[["Rendición", "Fondo", "Gastos", "Saldo", "Cantidad", "Actualizada"]],
+             hide_index=True, use_container_width=True)
+consolidado_button(resumenes)
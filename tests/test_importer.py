@@ -0,0 +1,21 @@
+import io
+import json
+
+import pytest
+
+from rendicion import importer
+
+DOC = json.dumps({"fondo_inicial": 150000.75, "gastos": [
+    {"fecha": "2024-01-01", "monto": 1.5e3, "detalle": "a"},
+    {"fecha": "2024-01-02", "monto": 12345.678, "detalle": "b"},
+]}).replace("1500.0", "15E+2")
+
+
+@pytest.mark.parametrize("chunk_size", range(1, len(DOC) + 2))
+def test_numbers_split_across_chunks(chunk_size):
+    """Un número cortado por el borde del bloque (en ".", "e", "+", ...) se lee completo."""
+    imp = importer.StreamImport(io.BytesIO(DOC.encode("utf-8")), normalize=None, chunk_size=chunk_size)
+    montos = [g["monto"] for g in imp]
+    assert imp.fondo_inicial == 150000.75
+    assert montos == [1500.0, 12345.678]
+    assert imp.errores == []
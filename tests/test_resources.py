@@ -0,0 +1,63 @@
+"""Las cachés de ``rendicion.resources`` arman internos de fpdf2 a mano: una
+exportación con caché debe salir idéntica a una sin ella."""
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+fpdf = pytest.importorskip("fpdf")
+Image = pytest.importorskip("PIL.Image")
+
+from rendicion import GastosTable, pdf_export, resources  # noqa: E402
+
+FECHA = datetime(2024, 3, 31, 12, 0, tzinfo=timezone.utc)
+
+
+def _png(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 20), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+LOGO = _png((200, 30, 30))
+FIRMA = _png((20, 20, 120))
+DATA = {
+    "fondo_inicial": 100000.0,
+    "meta": {"responsable": "Ñandú Pérez", "mes_que_rinde": "Marzo"},
+    "gastos": GastosTable([
+        {"fecha": "2024-03-01", "tipo_doc": "Boleta", "n_doc": "12", "detalle": "Café – señal ñ",
+         "proveedor": "Pérez", "monto": 1500.0, "nombre_doc": "boleta.pdf"},
+        {"fecha": "2024-03-02", "monto": 2500.0, "descripcion": "fila de Kivy"},
+    ]),
+}
+
+EXPORTS = {
+    "export_pdf": lambda: pdf_export.export_pdf(DATA, True, 24, LOGO, {"encargado": FIRMA}),
+    "export_tabla": lambda: pdf_export.export_tabla(DATA, logo_bytes=LOGO),
+    "export_listado": lambda: pdf_export.export_listado(DATA, logo_bytes=LOGO),
+}
+
+
+@pytest.fixture(autouse=True)
+def fecha_fija(monkeypatch):
+    """La fecha de creación (y el /ID que se deriva de ella) es lo único que cambia entre corridas."""
+    init = fpdf.FPDF.__init__
+
+    def __init__(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self.set_creation_date(FECHA)
+
+    monkeypatch.setattr(fpdf.FPDF, "__init__", __init__)
+
+
+@pytest.mark.parametrize("export", list(EXPORTS))
+def test_cached_export_matches_uncached(export, monkeypatch):
+    if resources.unicode_font_path() is None:
+        pytest.skip("DejaVuSans no está instalada")
+    build = EXPORTS[export]
+    cached = [build(), build()]  # la primera llena las cachés, la segunda las reutiliza
+    monkeypatch.setattr(resources, "add_cached_font", lambda pdf, family, style, path: pdf.add_font(family, style, path))
+    monkeypatch.setattr(resources, "image_source", lambda pdf, img_bytes: io.BytesIO(img_bytes))
+    uncached = build()
+    assert cached[0] == uncached
+    assert cached[1] == uncached
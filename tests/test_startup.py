@@ -0,0 +1,19 @@
+"""El presupuesto de arranque de ``benchmarks/bench_startup.py`` como prueba: falla si
+una app carga al arrancar un módulo prohibido o se pasa de los milisegundos fijados."""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+# las apps se miden en procesos aparte: aquí basta con que estén instaladas (importar kivy lo inicializa)
+pytestmark = pytest.mark.skipif(any(importlib.util.find_spec(m) is None for m in ("streamlit", "kivy")),
+                                reason="faltan streamlit o kivy")
+
+BENCH = Path(__file__).resolve().parents[1] / "benchmarks" / "bench_startup.py"
+
+
+def test_startup_budget():
+    spec = importlib.util.spec_from_file_location("bench_startup", BENCH)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+    assert bench.main(reruns=2) == 0
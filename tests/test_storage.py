@@ -0,0 +1,17 @@
+from rendicion.storage import Repository
+
+
+def test_rendicion_por_meta_follows_edited_meta(tmp_path):
+    """Tras editar la meta, crear otra vez el N°/mes original da una rendición nueva, no la editada."""
+    repo = Repository(str(tmp_path / "r.db"))
+    marzo = {"n_rendicion": "3", "mes_que_rinde": "Marzo", "responsable": "Ana"}
+    rid = repo.rendicion_por_meta(marzo)
+    assert repo.rendicion_por_meta({**marzo, "n_rendicion": " 3 "}, create=False) == rid
+
+    repo.set_meta(rid, {**marzo, "n_rendicion": "4"})
+    assert repo.rendicion_por_meta({**marzo, "n_rendicion": "4"}, create=False) == rid
+    assert repo.rendicion_por_meta(marzo, create=False) is None
+    otra = repo.rendicion_por_meta(marzo)
+    assert otra != rid
+    assert repo.load(otra)["meta"] == marzo
+    repo.close()